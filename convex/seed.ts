@@ -1,4 +1,5 @@
-import { mutation } from "./_generated/server";
+import { internalMutation, mutation, MutationCtx } from "./_generated/server";
+import { Id } from "./_generated/dataModel";
 import { v } from "convex/values";
 
 // TODO(human): Choose image replacement strategy for broken Unsplash URLs
@@ -1697,123 +1698,166 @@ export const seedAll90Walks = mutation({
   },
 });
 
+// Find or create the user that imported walks are attributed to
+async function getImportUser(ctx: MutationCtx) {
+  let user = await ctx.db
+    .query("users")
+    .withIndex("byExternalId", (q) => q.eq("externalId", "system-import"))
+    .first();
+
+  if (!user) {
+    const userId = await ctx.db.insert("users", {
+      name: "System Import User",
+      externalId: "system-import",
+      imageUrl: undefined,
+      subscriptionTier: "free",
+      joinedAt: Date.now(),
+      lastActive: Date.now(),
+    });
+    user = await ctx.db.get(userId);
+  }
+
+  if (!user) {
+    throw new Error("Failed to create user for import");
+  }
+  return user;
+}
+
+async function getRegionMap(ctx: MutationCtx) {
+  const regions = await ctx.db.query("regions").collect();
+  const regionMap: Record<string, Id<"regions">> = {};
+  regions.forEach((region) => {
+    regionMap[region.slug] = region._id;
+  });
+  return regionMap;
+}
+
+// Insert one converted walk and its stages, skipping walks that already exist
+async function importWalk(
+  ctx: MutationCtx,
+  walkData: any,
+  authorId: Id<"users">,
+  regionMap: Record<string, Id<"regions">>
+) {
+  // Check if walk already exists
+  const existing = await ctx.db
+    .query("walks")
+    .withIndex("bySlug", (q) => q.eq("slug", walkData.slug))
+    .first();
+
+  if (existing) {
+    return { created: false, skipped: true, message: `Walk already exists: ${walkData.title}` };
+  }
+
+  // Get region ID
+  const regionId = regionMap[walkData.regionSlug];
+  if (!regionId) {
+    return { created: false, error: true, message: `Region not found: ${walkData.regionSlug}` };
+  }
+
+  try {
+    // Create walk
+    const walk = {
+      title: walkData.title,
+      slug: walkData.slug,
+      description: walkData.description,
+      shortDescription: walkData.shortDescription,
+      regionId: regionId,
+      distance: walkData.distance,
+      ascent: walkData.ascent,
+      difficulty: walkData.difficulty,
+      estimatedTime: walkData.estimatedTime,
+      latitude: walkData.latitude,
+      longitude: walkData.longitude,
+      maxElevation: walkData.maxElevation,
+      routeType: walkData.routeType,
+      authorId: authorId,
+      featuredImageUrl: walkData.featuredImageUrl,
+      tags: walkData.tags,
+      isPublished: walkData.isPublished,
+      publishedAt: Date.now(),
+      viewCount: walkData.viewCount || 0,
+      likeCount: walkData.likeCount || 0,
+      reportCount: walkData.reportCount || 0,
+      averageRating: walkData.averageRating || 4.0,
+    };
+
+    const walkId = await ctx.db.insert("walks", walk);
+
+    // Create stages if they exist
+    let stageCount = 0;
+    if (walkData.stages && walkData.stages.length > 0) {
+      for (const stageData of walkData.stages) {
+        const stage = {
+          walkId: walkId,
+          stageNumber: stageData.stage,
+          description: stageData.description,
+          createdAt: Date.now(),
+        };
+        await ctx.db.insert("walk_stages", stage);
+        stageCount++;
+      }
+    }
+
+    // Update region walk count
+    const region = await ctx.db.get(regionId);
+    if (region && 'walkCount' in region) {
+      await ctx.db.patch(regionId, {
+        walkCount: (region as any).walkCount + 1,
+      });
+    }
+
+    return { 
+      created: true, 
+      message: `Successfully imported ${walkData.title} with ${stageCount} stages`,
+      walkId: walkId,
+      stageCount: stageCount
+    };
+
+  } catch (error) {
+    return { 
+      created: false, 
+      error: true, 
+      message: `Failed to import ${walkData.title}: ${String(error)}`
+    };
+  }
+}
+
 // Simple function to import a single walk directly
 export const importSingleWalk = mutation({
   args: { walkData: v.string() }, // JSON string of walk data
   handler: async (ctx, args) => {
     // Allow unauthenticated access for seeding
-    let user = await ctx.db
-      .query("users")
-      .withIndex("byExternalId", (q) => q.eq("externalId", "system-import"))
-      .first();
-
-    if (!user) {
-      const userId = await ctx.db.insert("users", {
-        name: "System Import User",
-        externalId: "system-import",
-        imageUrl: undefined,
-        subscriptionTier: "free",
-        joinedAt: Date.now(),
-        lastActive: Date.now(),
-      });
-      user = await ctx.db.get(userId);
-    }
-
-    if (!user) {
-      throw new Error("Failed to create user for import");
-    }
+    const user = await getImportUser(ctx);
+    const regionMap = await getRegionMap(ctx);
 
     // Parse the walk data
     const walkData = JSON.parse(args.walkData);
 
-    // Get regions
-    const regions = await ctx.db.query("regions").collect();
-    const regionMap: Record<string, any> = {};
-    regions.forEach((region) => {
-      regionMap[region.slug] = region._id;
-    });
-
-    // Check if walk already exists
-    const existing = await ctx.db
-      .query("walks")
-      .withIndex("bySlug", (q) => q.eq("slug", walkData.slug))
-      .first();
+    return await importWalk(ctx, walkData, user._id, regionMap);
+  },
+});
 
-    if (existing) {
-      return { created: false, skipped: true, message: `Walk already exists: ${walkData.title}` };
-    }
+// Import a batch of walks in one transaction, looking up the user and regions once
+// (used by scripts/bulk_import_walks.py). Internal, so only callers holding the
+// deployment's admin/deploy key can reach it over the HTTP API
+export const importWalksBatch = internalMutation({
+  args: { walksData: v.string() }, // JSON string of an array of walks
+  handler: async (ctx, args) => {
+    const user = await getImportUser(ctx);
+    const regionMap = await getRegionMap(ctx);
 
-    // Get region ID
-    const regionId = regionMap[walkData.regionSlug];
-    if (!regionId) {
-      return { created: false, error: true, message: `Region not found: ${walkData.regionSlug}` };
+    const walks = JSON.parse(args.walksData);
+    const results = [];
+    for (const walkData of walks) {
+      results.push({ slug: walkData.slug, ...(await importWalk(ctx, walkData, user._id, regionMap)) });
     }
 
-    try {
-      // Create walk
-      const walk = {
-        title: walkData.title,
-        slug: walkData.slug,
-        description: walkData.description,
-        shortDescription: walkData.shortDescription,
-        regionId: regionId,
-        distance: walkData.distance,
-        ascent: walkData.ascent,
-        difficulty: walkData.difficulty,
-        estimatedTime: walkData.estimatedTime,
-        latitude: walkData.latitude,
-        longitude: walkData.longitude,
-        maxElevation: walkData.maxElevation,
-        routeType: walkData.routeType,
-        authorId: user._id,
-        featuredImageUrl: walkData.featuredImageUrl,
-        tags: walkData.tags,
-        isPublished: walkData.isPublished,
-        publishedAt: Date.now(),
-        viewCount: walkData.viewCount || 0,
-        likeCount: walkData.likeCount || 0,
-        reportCount: walkData.reportCount || 0,
-        averageRating: walkData.averageRating || 4.0,
-      };
-
-      const walkId = await ctx.db.insert("walks", walk);
-
-      // Create stages if they exist
-      let stageCount = 0;
-      if (walkData.stages && walkData.stages.length > 0) {
-        for (const stageData of walkData.stages) {
-          const stage = {
-            walkId: walkId,
-            stageNumber: stageData.stage,
-            description: stageData.description,
-            createdAt: Date.now(),
-          };
-          await ctx.db.insert("walk_stages", stage);
-          stageCount++;
-        }
-      }
-
-      // Update region walk count
-      const region = await ctx.db.get(regionId);
-      if (region && 'walkCount' in region) {
-        await ctx.db.patch(regionId, {
-          walkCount: (region as any).walkCount + 1,
-        });
-      }
-
-      return { 
-        created: true, 
-        message: `Successfully imported ${walkData.title} with ${stageCount} stages`,
-        walkId: walkId,
-        stageCount: stageCount
-      };
-
-    } catch (error) {
-      return { 
-        created: false, 
-        error: true, 
-        message: `Failed to import ${walkData.title}: ${String(error)}`
-      };
-    }
+    return {
+      created: results.filter((result) => result.created).length,
+      skipped: results.filter((result) => "skipped" in result && result.skipped).length,
+      errors: results.filter((result) => "error" in result && result.error).length,
+      results,
+    };
   },
-});
\ No newline at end of file
+});
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark HTML parser backends on a saved corpus of walk pages.
+Reports per-page parse and extract time for each backend and whether its
+extracted walk records are identical to the html.parser baseline.
+
+Usage: python benchmark_parsers.py [corpus_dir] [--repeat N]
+The corpus defaults to the scrapers' HTTP cache directory, which holds saved page bodies.
+"""
+
+import argparse
+import glob
+import os
+import time
+from typing import Dict, List
+
+from detailed_walk_scraper import DetailedWalkScraper
+from html_parsing import available_backends, parse_html
+from walk_records import DetailedWalk
+
+def load_corpus(corpus_dir: str) -> List[bytes]:
+    """Read every saved .html page in the corpus directory"""
+    pages = []
+    for path in sorted(glob.glob(os.path.join(corpus_dir, '*.html'))):
+        with open(path, 'rb') as f:
+            pages.append(f.read())
+    return pages
+
+def comparable(walk: DetailedWalk) -> Dict:
+    """Walk record without fields that differ between runs"""
+    return {key: value for key, value in walk.to_dict().items() if key != 'scraped_at'}
+
+def benchmark_backend(scraper: DetailedWalkScraper, backend: str, pages: List[bytes], repeat: int) -> Dict:
+    """Time parsing and extraction of every page with one backend"""
+    parse_seconds = 0.0
+    extract_seconds = 0.0
+    records = []
+
+    for run in range(repeat):
+        for i, content in enumerate(pages):
+            start = time.perf_counter()
+            soup = parse_html(content, backend)
+            parsed = time.perf_counter()
+            walk = scraper.extract_walk_details(soup, f"corpus://{i}")
+            extracted = time.perf_counter()
+
+            parse_seconds += parsed - start
+            extract_seconds += extracted - parsed
+            if run == 0:
+                records.append(comparable(walk))
+
+    page_count = len(pages) * repeat
+    return {
+        'backend': backend,
+        'parse_ms': parse_seconds / page_count * 1000,
+        'extract_ms': extract_seconds / page_count * 1000,
+        'records': records
+    }
+
+def benchmark_selectolax(pages: List[bytes], repeat: int) -> Dict:
+    """Parse-only timing for selectolax, as a lower bound for a non-BeautifulSoup fast path"""
+    from selectolax.lexbor import LexborHTMLParser
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for content in pages:
+            LexborHTMLParser(content)
+    elapsed = time.perf_counter() - start
+    return {'backend': 'selectolax (parse only)', 'parse_ms': elapsed / (len(pages) * repeat) * 1000}
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare HTML parser backends on saved walk pages")
+    parser.add_argument('corpus_dir', nargs='?', default='.http_cache', help="Directory of saved .html pages")
+    parser.add_argument('--repeat', type=int, default=3, help="Times to process the corpus per backend")
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus_dir)
+    if not pages:
+        print(f"No .html pages found in {args.corpus_dir}")
+        return
+
+    total_kb = sum(len(p) for p in pages) / 1024
+    print(f"Benchmarking {len(pages)} pages ({total_kb:.0f} KB) x {args.repeat} runs\n")
+
+    scraper = DetailedWalkScraper()
+    results = [benchmark_backend(scraper, backend, pages, args.repeat) for backend in available_backends()]
+    baseline = results[0]['records']
+
+    print(f"{'Backend':<26} {'Parse ms/page':>14} {'Extract ms/page':>16} {'Total ms/page':>14} {'Identical':>10}")
+    for result in results:
+        identical = sum(1 for a, b in zip(result['records'], baseline) if a == b)
+        total_ms = result['parse_ms'] + result['extract_ms']
+        print(f"{result['backend']:<26} {result['parse_ms']:>14.2f} {result['extract_ms']:>16.2f} "
+              f"{total_ms:>14.2f} {identical:>6}/{len(pages)}")
+
+    try:
+        result = benchmark_selectolax(pages, args.repeat)
+        print(f"{result['backend']:<26} {result['parse_ms']:>14.2f} {'n/a':>16} {'n/a':>14} {'n/a':>10}")
+    except ImportError:
+        pass
+
+    identical_backends = [
+        r for r in results
+        if all(a == b for a, b in zip(r['records'], baseline))
+    ]
+    fastest = min(identical_backends, key=lambda r: r['parse_ms'] + r['extract_ms'])
+    print(f"\nFastest backend with identical output: {fastest['backend']}")
+
+if __name__ == "__main__":
+    main()
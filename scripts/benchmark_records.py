@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark the slotted walk records against plain dicts on a walk file.
+Reports memory held per loaded record, load and dump time per record,
+and whether every record survives a round trip unchanged.
+
+Usage: python benchmark_records.py [walk_file] [--type detailed|scraped|converted] [--repeat N]
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+from record_io import read_records
+from walk_records import ConvertedWalk, DetailedWalk, ScrapedWalk
+
+RECORD_TYPES = {'detailed': DetailedWalk, 'scraped': ScrapedWalk, 'converted': ConvertedWalk}
+
+def measure_memory(build: Callable[[], List]) -> float:
+    """Bytes still allocated after build() returns, while its result is kept alive"""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        records = build()
+        held = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    return held / len(records)
+
+def measure_seconds(func: Callable[[], object], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def benchmark(lines: List[str], record_type: type, repeat: int) -> Dict[str, Dict[str, float]]:
+    count = len(lines)
+    dicts = [json.loads(line) for line in lines]
+    records = [record_type.from_dict(d) for d in dicts]
+    return {
+        'dict': {
+            'bytes': measure_memory(lambda: [json.loads(line) for line in lines]),
+            'load_us': measure_seconds(lambda: [json.loads(line) for line in lines], repeat) / count * 1e6,
+            'dump_us': measure_seconds(lambda: [json.dumps(d, ensure_ascii=False) for d in dicts], repeat) / count * 1e6
+        },
+        record_type.__name__: {
+            'bytes': measure_memory(lambda: [record_type.from_dict(json.loads(line)) for line in lines]),
+            'load_us': measure_seconds(lambda: [record_type.from_dict(json.loads(line)) for line in lines],
+                                       repeat) / count * 1e6,
+            'dump_us': measure_seconds(lambda: [json.dumps(r.to_dict(), ensure_ascii=False) for r in records],
+                                       repeat) / count * 1e6
+        }
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare walk records with plain dicts")
+    parser.add_argument('walk_file', nargs='?', default='detailed_walks_all.json', help="Walks (.json array or .jsonl)")
+    parser.add_argument('--type', choices=sorted(RECORD_TYPES), default='detailed', help="Record type the file holds")
+    parser.add_argument('--repeat', type=int, default=3, help="Timing runs, the best of which is reported")
+    args = parser.parse_args()
+
+    record_type = RECORD_TYPES[args.type]
+    lines = [json.dumps(walk, ensure_ascii=False) for walk in read_records(args.walk_file)]
+    if not lines:
+        print(f"No walks found in {args.walk_file}")
+        return
+
+    round_trips = sum(1 for line in lines if record_type.from_dict(json.loads(line)).to_dict() == json.loads(line))
+    print(f"Benchmarking {len(lines)} walks from {args.walk_file} as {record_type.__name__}\n")
+
+    results = benchmark(lines, record_type, args.repeat)
+    print(f"{'Representation':<16} {'Bytes/record':>13} {'Load us/record':>15} {'Dump us/record':>15}")
+    for name, result in results.items():
+        print(f"{name:<16} {result['bytes']:>13.0f} {result['load_us']:>15.1f} {result['dump_us']:>15.1f}")
+
+    saved = 1 - results[record_type.__name__]['bytes'] / results['dict']['bytes']
+    print(f"\n{record_type.__name__} records use {saved:.0%} less memory than dicts")
+    print(f"Identical after a round trip: {round_trips}/{len(lines)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+End-to-end scraper benchmark against a recorded page archive.
+Runs scrape_popular_walks and scrape_walks_batch offline through ReplaySession
+and reports pages/sec, CPU time per page and peak RSS for each stage.
+
+Record an archive first, e.g.:
+    python scrape_walkhighlands.py --record walkhighlands_archive.zip
+    python detailed_walk_scraper.py all --record walkhighlands_archive.zip
+Then: python benchmark_scrapers.py walkhighlands_archive.zip [--latency 0.05] [--error-rate 0.01]
+"""
+
+import argparse
+import contextlib
+import io
+import resource
+import sys
+import time
+from typing import Callable, Dict
+
+from crawl_journal import CrawlJournal
+from detailed_walk_scraper import DetailedWalkScraper
+from page_archive import PageArchive, ReplaySession
+from scrape_walkhighlands import WalkHighlandsScraper
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process and its largest child, in MB"""
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return max(own, children) / scale
+
+def cpu_seconds() -> float:
+    """CPU time used by this process and any finished worker processes"""
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+def measure(label: str, session: ReplaySession, run: Callable, quiet: bool = True) -> Dict:
+    """Run one stage and collect its throughput and resource figures"""
+    requests_before = session.requests_served
+    cpu_before = cpu_seconds()
+    start = time.perf_counter()
+
+    output = io.StringIO() if quiet else sys.stdout
+    with contextlib.redirect_stdout(output):
+        result = run()
+
+    wall = time.perf_counter() - start
+    pages = session.requests_served - requests_before
+    return {
+        'stage': label,
+        'result': result,
+        'pages': pages,
+        'wall': wall,
+        'pages_per_sec': pages / wall if wall else 0.0,
+        'cpu_ms_per_page': (cpu_seconds() - cpu_before) / pages * 1000 if pages else 0.0,
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scrapers against a recorded page archive")
+    parser.add_argument('archive', help="Zip archive written with --record")
+    parser.add_argument('--latency', type=float, default=0.0, help="Simulated seconds per request")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Uniform +/- variation on the latency")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests that fail")
+    parser.add_argument('--concurrency', type=int, default=4, help="Fetch threads for the detailed scraper")
+    parser.add_argument('--parse-workers', type=int, default=0, help="Parser processes for the detailed scraper")
+    parser.add_argument('--parser', default='html.parser', help="BeautifulSoup parser backend")
+    parser.add_argument('--seed', type=int, default=1, help="Seed for simulated latency and errors")
+    parser.add_argument('--verbose', action='store_true', help="Show the scrapers' own output")
+    args = parser.parse_args()
+
+    archive = PageArchive(args.archive)
+    print(f"Replaying {len(archive.urls())} archived pages from {args.archive}")
+    print(f"Latency {args.latency}s ± {args.jitter}s, error rate {args.error_rate:.1%}\n")
+
+    # Politeness limits are lifted: the simulated latency stands in for the server
+    listing_session = ReplaySession(archive, args.latency, args.jitter, args.error_rate, seed=args.seed)
+    listing_scraper = WalkHighlandsScraper(parser_backend=args.parser, requests_per_second=1000, burst=1000)
+    listing_scraper.session = listing_scraper.metrics.instrument(listing_session)
+    listing = measure('scrape_popular_walks', listing_session,
+                      lambda: listing_scraper.scrape_popular_walks(limit_per_region=15), quiet=not args.verbose)
+
+    walk_urls = [walk.source_url for walk in listing['result'] if walk.source_url in archive.entries]
+    if not walk_urls:
+        # Archive only holds walk pages, so benchmark the detailed scraper on all of them
+        walk_urls = archive.urls()
+
+    detail_session = ReplaySession(archive, args.latency, args.jitter, args.error_rate, seed=args.seed)
+    detail_scraper = DetailedWalkScraper(concurrency=args.concurrency, requests_per_second=1000, burst=1000,
+                                         parser_backend=args.parser, parse_workers=args.parse_workers,
+                                         journal=CrawlJournal(':memory:', retry_delay=0))
+    detail_scraper.session = detail_scraper.metrics.instrument(detail_session)
+    detailed = measure('scrape_walks_batch', detail_session,
+                       lambda: detail_scraper.scrape_walks_batch(walk_urls), quiet=not args.verbose)
+
+    print(f"{'Stage':<22} {'Pages':>6} {'Wall s':>8} {'Pages/sec':>10} {'CPU ms/page':>12} {'Peak RSS MB':>12}")
+    for stage in (listing, detailed):
+        print(f"{stage['stage']:<22} {stage['pages']:>6} {stage['wall']:>8.2f} {stage['pages_per_sec']:>10.1f} "
+              f"{stage['cpu_ms_per_page']:>12.2f} {stage['peak_rss_mb']:>12.1f}")
+    print(f"\nListing walks found: {len(listing['result'])}, detailed walks extracted: {len(detailed['result'])}")
+
+    archive.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark the precomputed search index against the linear scan searchWalks does today.
+Builds synthetic catalogues of 1k/10k/100k walks from a formatted walks file, then
+times the same queries through a replica of the substring scan and through SearchIndex.
+
+Usage: python benchmark_search.py [formatted_walks.json] [--sizes 1000 10000 100000]
+"""
+
+import argparse
+import random
+import time
+from typing import Dict, List
+
+from record_io import read_records
+from search_index import SearchIndex, TOKEN_RE
+
+QUERIES = ['fairy glen', 'waterfall', 'castle', 'skye beach', 'loch', 'ben nevis', 'forest trail', 'wildlife']
+
+def synthetic_catalogue(seed_walks: List[Dict], size: int, rng: random.Random) -> List[Dict]:
+    """Walks cloned from the seed data, each with extra words so no two are identical"""
+    vocabulary = sorted({
+        token for walk in seed_walks
+        for token in TOKEN_RE.findall(f"{walk.get('title', '')} {walk.get('description', '')}".lower())
+    })
+    walks = []
+    for i in range(size):
+        walk = dict(seed_walks[i % len(seed_walks)])
+        extra = ' '.join(rng.choice(vocabulary) for _ in range(12))
+        walk['slug'] = f"{walk.get('slug', 'walk')}-{i}"
+        walk['title'] = f"{walk.get('title', '')} {rng.choice(vocabulary).title()}"
+        walk['description'] = f"{walk.get('description', '')} {extra}"
+        walk['viewCount'] = rng.randint(0, 5000)
+        walks.append(walk)
+    return walks
+
+def linear_search(walks: List[Dict], search_term: str, limit: int = 10) -> List[Dict]:
+    """Python replica of convex/walks.ts searchWalks: substring match on every walk, then sort by views"""
+    search_lower = search_term.lower()
+    matches = [
+        walk for walk in walks
+        if search_lower in walk['title'].lower()
+        or search_lower in walk['description'].lower()
+        or search_lower in walk['shortDescription'].lower()
+        or any(search_lower in tag.lower() for tag in walk['tags'])
+    ]
+    matches.sort(key=lambda walk: walk['viewCount'], reverse=True)
+    return matches[:limit]
+
+def time_queries(search, repeat: int) -> float:
+    """Mean milliseconds per query over every benchmark query"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for query in QUERIES:
+            search(query)
+    return (time.perf_counter() - start) / (repeat * len(QUERIES)) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the search index with a linear scan")
+    parser.add_argument('seed_file', nargs='?', default='formatted_walks.json', help="Formatted walks to clone")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help="Catalogue sizes")
+    parser.add_argument('--repeat', type=int, default=5, help="Times to run each query")
+    args = parser.parse_args()
+
+    seed_walks = list(read_records(args.seed_file))
+    if not seed_walks:
+        print(f"No walks found in {args.seed_file}")
+        return
+    rng = random.Random(1)
+
+    print(f"Seeded from {len(seed_walks)} walks in {args.seed_file}, {len(QUERIES)} queries x {args.repeat} runs\n")
+    print(f"{'Walks':>8} {'Build s':>8} {'Scan ms/query':>14} {'Index ms/query':>15} {'Speed-up':>9}")
+    for size in args.sizes:
+        walks = synthetic_catalogue(seed_walks, size, rng)
+
+        start = time.perf_counter()
+        index = SearchIndex.from_walks(walks)
+        build_seconds = time.perf_counter() - start
+        # Posting arrays are created on first use, as in a long-running server
+        for query in QUERIES:
+            index.search(query)
+
+        scan_ms = time_queries(lambda query: linear_search(walks, query), args.repeat)
+        index_ms = time_queries(lambda query: index.search(query), args.repeat)
+        print(f"{size:>8} {build_seconds:>8.2f} {scan_ms:>14.3f} {index_ms:>15.3f} {scan_ms / index_ms:>8.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Bulk import converted walks into Convex over its HTTP API.
+Replaces the per-walk `npx convex run seed:importSingleWalk` loop in import-walks.js:
+walks are streamed from the converted file, grouped into batches for the
+seed:importWalksBatch mutation and sent over a pooled HTTP session with several
+batches in flight, reporting the outcome of every batch as it completes. The mutation
+is internal, so calls are authorised with the deployment's admin/deploy key.
+
+Usage: python bulk_import_walks.py converted_priority_walks.json [--url https://....convex.cloud] [--auth-token KEY]
+       python bulk_import_walks.py converted_priority_walks.json --stub   # against a local stub server
+"""
+
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from record_io import read_records
+
+BATCH_MUTATION = 'seed:importWalksBatch'
+
+def batched(records: Iterable[Dict], size: int) -> Iterator[List[Dict]]:
+    """Consecutive lists of up to size records"""
+    iterator = iter(records)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+class BulkWalkImporter:
+    def __init__(self, convex_url: str, batch_size: int = 50, concurrency: int = 4, timeout: float = 60,
+                 max_attempts: int = 3, retry_delay: float = 2.0, auth_token: Optional[str] = None):
+        self.mutation_url = f"{convex_url.rstrip('/')}/api/mutation"
+        self.batch_size = batch_size
+        self.concurrency = concurrency    # batches in flight at once
+        self.timeout = timeout
+        self.max_attempts = max_attempts  # per batch, for connection errors and 5xx responses
+        self.retry_delay = retry_delay
+
+        # One keep-alive connection per in-flight batch
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=concurrency))
+        self.session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=concurrency))
+        self.session.headers.update({'Content-Type': 'application/json'})
+        if auth_token:
+            self.session.headers['Authorization'] = f"Convex {auth_token}"
+
+    def call_mutation(self, walks: List[Dict]) -> Dict:
+        """Run the batch mutation once, returning its value or raising on failure"""
+        payload = {'path': BATCH_MUTATION, 'args': {'walksData': json.dumps(walks, ensure_ascii=False)}, 'format': 'json'}
+        response = self.session.post(self.mutation_url, data=json.dumps(payload), timeout=self.timeout)
+        if response.status_code >= 500 or response.status_code == 429:
+            raise requests.HTTPError(f"HTTP {response.status_code}", response=response)
+        body = response.json()
+        if body.get('status') != 'success':
+            raise ValueError(body.get('errorMessage', f"HTTP {response.status_code}"))
+        return body['value']
+
+    def send_batch(self, batch_number: int, walks: List[Dict]) -> Dict:
+        """Import one batch, retrying transient failures with backoff"""
+        start = time.perf_counter()
+        status = {'batch': batch_number, 'walks': len(walks), 'created': 0, 'skipped': 0, 'errors': 0,
+                  'failed': False, 'attempts': 0, 'messages': []}
+        for attempt in range(1, self.max_attempts + 1):
+            status['attempts'] = attempt
+            try:
+                value = self.call_mutation(walks)
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+                if attempt < self.max_attempts:
+                    time.sleep(self.retry_delay * 2 ** (attempt - 1))
+                    continue
+                status.update(failed=True, errors=len(walks), messages=[str(e)])
+                break
+            except ValueError as e:
+                # The mutation itself rejected the batch; retrying would not help
+                status.update(failed=True, errors=len(walks), messages=[str(e)])
+                break
+            status.update(created=value['created'], skipped=value['skipped'], errors=value['errors'])
+            status['messages'] = [r['message'] for r in value.get('results', []) if r.get('error')]
+            break
+        status['seconds'] = time.perf_counter() - start
+        return status
+
+    def report(self, status: Dict):
+        marker = '✗' if status['failed'] or status['errors'] else '✓'
+        print(f"  {marker} Batch {status['batch']}: {status['walks']} walks, {status['created']} created, "
+              f"{status['skipped']} skipped, {status['errors']} errors "
+              f"({status['seconds']:.2f}s, attempt {status['attempts']})")
+        for message in status['messages'][:5]:
+            print(f"      {message}")
+
+    def import_walks(self, walks: Iterable[Dict]) -> Dict:
+        """Send every walk in batches, keeping at most concurrency batches in flight"""
+        totals = {'batches': 0, 'failed_batches': 0, 'walks': 0, 'created': 0, 'skipped': 0, 'errors': 0}
+        start = time.perf_counter()
+
+        def collect(done):
+            for future in done:
+                status = future.result()
+                self.report(status)
+                totals['batches'] += 1
+                totals['failed_batches'] += status['failed']
+                for key in ('walks', 'created', 'skipped', 'errors'):
+                    totals[key] += status[key]
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            in_flight = set()
+            for batch_number, batch in enumerate(batched(walks, self.batch_size), 1):
+                # Only read ahead as far as the connections can send
+                if len(in_flight) >= self.concurrency:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(done)
+                in_flight.add(executor.submit(self.send_batch, batch_number, batch))
+            collect(wait(in_flight).done)
+
+        totals['seconds'] = time.perf_counter() - start
+        return totals
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Bulk import converted walks into Convex")
+    parser.add_argument('input_file', nargs='?', default='converted_priority_walks.json',
+                        help="Converted walks (.json array or .jsonl)")
+    parser.add_argument('--url', default=os.environ.get('CONVEX_URL') or os.environ.get('NEXT_PUBLIC_CONVEX_URL'),
+                        help="Convex deployment URL (default: $CONVEX_URL or $NEXT_PUBLIC_CONVEX_URL)")
+    parser.add_argument('--batch-size', type=int, default=50, help="Walks per mutation call")
+    parser.add_argument('--concurrency', type=int, default=4, help="Batches in flight at once")
+    parser.add_argument('--timeout', type=float, default=60, help="Seconds to wait for each batch")
+    parser.add_argument('--auth-token', default=os.environ.get('CONVEX_DEPLOY_KEY'),
+                        help="Convex admin/deploy key the internal mutation requires (default: $CONVEX_DEPLOY_KEY)")
+    parser.add_argument('--stub', action='store_true', help="Import into a local stub server instead of Convex")
+    parser.add_argument('--stub-latency', type=float, default=0.0, help="Simulated seconds per stub request")
+    args = parser.parse_args()
+
+    stub = None
+    if args.stub:
+        from convex_stub import StubConvexBackend, StubConvexServer
+        stub = StubConvexServer(StubConvexBackend(latency=args.stub_latency)).start()
+        args.url = stub.url
+        args.auth_token = stub.backend.admin_key
+        print(f"Using stub Convex server at {stub.url}")
+    elif not args.url:
+        parser.error("No Convex URL: pass --url or set CONVEX_URL / NEXT_PUBLIC_CONVEX_URL")
+    elif not args.auth_token:
+        parser.error(f"{BATCH_MUTATION} is internal: pass --auth-token or set CONVEX_DEPLOY_KEY")
+
+    importer = BulkWalkImporter(args.url, batch_size=args.batch_size, concurrency=args.concurrency,
+                                timeout=args.timeout, auth_token=args.auth_token)
+    print(f"Importing walks from {args.input_file} in batches of {args.batch_size}, {args.concurrency} in flight...")
+    try:
+        totals = importer.import_walks(read_records(args.input_file))
+    finally:
+        if stub:
+            stub.stop()
+
+    print(f"\nImport complete in {totals['seconds']:.1f}s")
+    print(f"✓ Imported: {totals['created']} walks")
+    print(f"- Skipped: {totals['skipped']} walks")
+    print(f"✗ Errors: {totals['errors']} walks ({totals['failed_batches']} of {totals['batches']} batches failed)")
+
+if __name__ == "__main__":
+    main()
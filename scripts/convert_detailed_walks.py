@@ -4,13 +4,40 @@ Convert scraped detailed walks data into format suitable for Convex database.
 Creates original content inspired by (not copied from) WalkHighlands data.
 """
 
-import json
+import math
+import os
 import re
 import unicodedata
-from typing import List, Dict, Any, Optional
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 from datetime import datetime, timedelta
 import random
 
+from osgb import grid_ref_to_wgs84, grid_refs_to_wgs84
+from record_io import RecordWriter, read_records
+from search_index import SearchIndexBuilder
+from walk_columns import ColumnBuilder, WalkColumns, catalogue_stats, print_catalogue_stats
+from walk_records import ConvertedWalk, DetailedWalk, Stage, read_walks
+from walk_tagging import STAGE_KEYWORDS, WALK_MATCHER, route_type
+
+def new_conversion_stats() -> Dict[str, Any]:
+    return {'regions': {}, 'difficulties': {}, 'total_stages': 0}
+
+def add_conversion_stats(stats: Dict[str, Any], walk: ConvertedWalk):
+    """Count a converted walk towards the region, difficulty and stage statistics"""
+    stats['regions'][walk.regionSlug] = stats['regions'].get(walk.regionSlug, 0) + 1
+    stats['difficulties'][walk.difficulty] = stats['difficulties'].get(walk.difficulty, 0) + 1
+    stats['total_stages'] += len(walk.stages or [])
+
+def merge_conversion_stats(stats: Dict[str, Any], partial: Dict[str, Any]):
+    """Add statistics gathered by a worker into the running totals"""
+    for key in ('regions', 'difficulties'):
+        for value, count in partial[key].items():
+            stats[key][value] = stats[key].get(value, 0) + count
+    stats['total_stages'] += partial['total_stages']
+
 class DetailedWalkConverter:
     def __init__(self):
         self.region_mapping = {
@@ -80,24 +107,15 @@ class DetailedWalkConverter:
                 
         return "Moderate"  # Default
         
-    def determine_route_type(self, title: str, stages: List[Dict]) -> str:
+    def determine_route_type(self, title: str, stages: List[Stage]) -> str:
         """Determine route type from title and stage descriptions"""
-        title_lower = title.lower()
-        all_text = title_lower + " " + " ".join([s.get('description', '') for s in stages]).lower()
-        
-        circular_keywords = ['circuit', 'circular', 'loop', 'round', 'return to start']
-        out_back_keywords = ['out and back', 'there and back', 'return same way', 'retrace']
-        
-        if any(keyword in all_text for keyword in circular_keywords):
-            return "Circular"
-        elif any(keyword in all_text for keyword in out_back_keywords):
-            return "Out and Back"
-        else:
-            return "Linear"
+        all_text = title + " " + " ".join([s.description or '' for s in stages])
+        return route_type(WALK_MATCHER.matches(all_text))
             
-    def extract_features_and_tags(self, title: str, summary: str, stages: List[Dict]) -> Dict[str, Any]:
+    def extract_features_and_tags(self, title: str, summary: str, stages: List[Stage]) -> Dict[str, Any]:
         """Extract key features and generate tags from walk content"""
-        all_text = f"{title} {summary} {' '.join([s.get('description', '') for s in stages])}".lower()
+        all_text = f"{title} {summary} {' '.join([s.description or '' for s in stages])}"
+        found = WALK_MATCHER.matches(all_text)
         
         features = {
             'type': 'general',
@@ -106,48 +124,22 @@ class DetailedWalkConverter:
             'tags': []
         }
         
-        # Identify walk type and main features
-        feature_patterns = {
-            'coastal': ['beach', 'bay', 'cliff', 'coast', 'lighthouse', 'headland', 'point'],
-            'mountain': ['ben', 'peak', 'summit', 'mountain', 'hill', 'ridge'],
-            'forest': ['forest', 'woods', 'woodland', 'trees', 'pine', 'oak'],
-            'historic': ['castle', 'fort', 'broch', 'dun', 'ruins', 'historic', 'ancient'],
-            'waterfall': ['falls', 'waterfall', 'cascade', 'gorge'],
-            'loch': ['loch', 'lake', 'reservoir']
-        }
-        
-        for walk_type, keywords in feature_patterns.items():
-            if any(keyword in all_text for keyword in keywords):
-                features['type'] = walk_type
-                break
+        # Identify walk type and main features; the first matching type wins
+        walk_types = WALK_MATCHER.labels(found, 'feature_type')
+        if walk_types:
+            features['type'] = walk_types[0]
                 
         # Extract specific features for tags
-        tag_patterns = {
-            'wildlife': ['wildlife', 'birds', 'deer', 'eagles', 'otter', 'seals'],
-            'photography': ['views', 'scenic', 'panoramic', 'spectacular', 'dramatic'],
-            'family-friendly': ['easy', 'gentle', 'accessible', 'family'],
-            'challenging': ['steep', 'strenuous', 'demanding', 'difficult'],
-            'historic': ['castle', 'ruins', 'ancient', 'heritage', 'historic'],
-            'coastal': ['beach', 'cliff', 'sea', 'ocean', 'lighthouse'],
-            'forest': ['woodland', 'forest', 'trees', 'nature'],
-            'waterfall': ['waterfall', 'falls', 'cascade'],
-            'viewpoint': ['views', 'viewpoint', 'panorama', 'vista'],
-            'bridge': ['bridge', 'crossing'],
-            'island': ['island', 'isle']
-        }
-        
-        for tag, keywords in tag_patterns.items():
-            if any(keyword in all_text for keyword in keywords):
-                features['tags'].append(tag)
+        features['tags'] = WALK_MATCHER.labels(found, 'feature_tags')
                 
         return features
         
-    def create_original_summary(self, walk_data: Dict, features: Dict) -> str:
+    def create_original_summary(self, walk_data: DetailedWalk, features: Dict) -> str:
         """Create original summary inspired by the scraped content"""
-        title = walk_data.get('title', '')
-        original_summary = walk_data.get('summary', '')
-        region = self.extract_region_from_url(walk_data.get('source_url', ''))
-        difficulty = self.map_difficulty(walk_data.get('difficulty_rating'))
+        title = walk_data.title or ''
+        original_summary = walk_data.summary or ''
+        region = self.extract_region_from_url(walk_data.source_url)
+        difficulty = self.map_difficulty(walk_data.difficulty_rating)
         
         # Extract key elements from original summary without copying
         feature_name = None
@@ -190,7 +182,7 @@ class DetailedWalkConverter:
             
         return summary
         
-    def create_original_stages(self, stages: List[Dict]) -> List[Dict]:
+    def create_original_stages(self, stages: List[Stage]) -> List[Stage]:
         """Create original stage descriptions inspired by the scraped content"""
         if not stages:
             return []
@@ -198,7 +190,7 @@ class DetailedWalkConverter:
         original_stages = []
         
         for i, stage in enumerate(stages):
-            original_desc = stage.get('description', '')
+            original_desc = stage.description or ''
             stage_num = stage.get('stage', i + 1)
             
             if not original_desc:
@@ -207,8 +199,9 @@ class DetailedWalkConverter:
             # Create original description inspired by but not copying the source
             # Extract key directions and landmarks without copying exact phrasing
             
-            direction_words = re.findall(r'\b(follow|head|turn|continue|cross|climb|descend|bear|take)\b', original_desc.lower())
-            landmarks = re.findall(r'\b(gate|bridge|path|track|road|car park|viewpoint|summit|loch|river|forest)\b', original_desc.lower())
+            found = WALK_MATCHER.matches(original_desc)
+            direction_words = [word for word in STAGE_KEYWORDS['direction'] if word in found]
+            landmarks = [word for word in STAGE_KEYWORDS['landmark'] if word in found]
             
             # Create new description using extracted elements
             if direction_words and landmarks:
@@ -217,11 +210,11 @@ class DetailedWalkConverter:
                 # Basic rephrasing for stages without clear direction patterns
                 new_desc = self.basic_rephrase(original_desc)
                 
-            original_stages.append({
-                'stage': stage_num,
-                'description': new_desc,
-                'original_length': len(original_desc)  # For reference
-            })
+            original_stages.append(Stage(
+                stage=stage_num,
+                description=new_desc,
+                original_length=len(original_desc)  # For reference
+            ))
             
         return original_stages
         
@@ -269,7 +262,11 @@ class DetailedWalkConverter:
             return "The path continues through typical Highland terrain, offering excellent walking and views of the surrounding landscape."
             
     def estimate_coordinates(self, source_url: str, grid_ref: str = None) -> Dict[str, float]:
-        """Estimate GPS coordinates based on URL region and grid reference"""
+        """GPS coordinates from the grid reference, or an estimate from the URL region"""
+        converted = grid_ref_to_wgs84(grid_ref)
+        if converted:
+            return {'latitude': converted[0], 'longitude': converted[1]}
+            
         coords = {'latitude': None, 'longitude': None}
         
         # Rough coordinate estimates by region (centers of regions)
@@ -293,137 +290,228 @@ class DetailedWalkConverter:
         
         return coords
         
-    def convert_walk(self, walk_data: Dict) -> Dict[str, Any]:
-        """Convert a single scraped walk to database format"""
+    def grid_ref_coordinates(self, input_file: str) -> List[Optional[Dict[str, float]]]:
+        """Coordinates for every walk in a file, converted from grid references in one batch"""
+        grid_refs = [walk.get('start_grid_ref') for walk in read_records(input_file)]
+        latitudes, longitudes = grid_refs_to_wgs84(grid_refs)
+        return [
+            None if math.isnan(lat) else {'latitude': round(float(lat), 6), 'longitude': round(float(lng), 6)}
+            for lat, lng in zip(latitudes, longitudes)
+        ]
+        
+    def convert_walk(self, walk_data: DetailedWalk, coords: Optional[Dict[str, float]] = None) -> ConvertedWalk:
+        """Convert a single scraped walk to database format.
+        coords can be passed in when grid references were converted for a whole file at once."""
         title = walk_data.get('title', 'Unknown Walk')
         slug = self.create_slug(title)
-        region_slug = self.extract_region_from_url(walk_data.get('source_url', ''))
+        region_slug = self.extract_region_from_url(walk_data.source_url)
         
         # Extract and analyze features
-        features = self.extract_features_and_tags(
-            title, 
-            walk_data.get('summary', ''), 
-            walk_data.get('stages', [])
-        )
+        features = self.extract_features_and_tags(title, walk_data.summary or '', walk_data.stages)
         
         # Create original content
         original_summary = self.create_original_summary(walk_data, features)
-        original_stages = self.create_original_stages(walk_data.get('stages', []))
+        original_stages = self.create_original_stages(walk_data.stages)
         
         # Map difficulty
-        difficulty = self.map_difficulty(
-            walk_data.get('difficulty_rating'),
-            walk_data.get('overall_rating')
-        )
+        difficulty = self.map_difficulty(walk_data.difficulty_rating, walk_data.overall_rating)
         
         # Estimate coordinates
-        coords = self.estimate_coordinates(walk_data.get('source_url'), walk_data.get('start_grid_ref'))
+        if coords is None:
+            coords = self.estimate_coordinates(walk_data.source_url, walk_data.start_grid_ref)
+        
+        # Measured from the GPX route where the scraper collected one, otherwise from the page text
+        ascent = walk_data.get('track_ascent_m', walk_data.get('ascent_m', 100))
+        max_elevation = walk_data.get('track_max_elevation_m', walk_data.get('ascent_m', 100) + 200)  # Rough estimate without a route
         
         # Create walk object
-        walk = {
-            'title': title,
-            'slug': slug,
-            'description': original_summary,
-            'shortDescription': original_summary.split('.')[0] + '.' if '.' in original_summary else original_summary[:150] + '...',
-            'regionSlug': region_slug,
-            'distance': walk_data.get('distance_km', 5.0),
-            'ascent': walk_data.get('ascent_m', 100),
-            'difficulty': difficulty,
-            'estimatedTime': walk_data.get('estimated_hours', 2.0),
-            'latitude': coords['latitude'],
-            'longitude': coords['longitude'], 
-            'maxElevation': (walk_data.get('ascent_m', 100) + 200),  # Rough estimate
-            'routeType': self.determine_route_type(title, walk_data.get('stages', [])),
-            'featuredImageUrl': 'https://images.unsplash.com/photo-1506905925346-21bda4d32df4?w=800&h=600&fit=crop',
-            'tags': features['tags'],
-            'isPublished': True,
-            'viewCount': random.randint(50, 200),
-            'likeCount': random.randint(5, 50),
-            'reportCount': random.randint(0, 5),
-            'averageRating': round(3.8 + random.uniform(0, 1.0), 1),
+        return ConvertedWalk(
+            title=title,
+            slug=slug,
+            description=original_summary,
+            shortDescription=original_summary.split('.')[0] + '.' if '.' in original_summary else original_summary[:150] + '...',
+            regionSlug=region_slug,
+            distance=walk_data.get('track_distance_km', walk_data.get('distance_km', 5.0)),
+            ascent=ascent,
+            difficulty=difficulty,
+            estimatedTime=walk_data.get('estimated_hours', 2.0),
+            latitude=coords['latitude'],
+            longitude=coords['longitude'],
+            maxElevation=max_elevation,
+            routeType=self.determine_route_type(title, walk_data.stages),
+            featuredImageUrl='https://images.unsplash.com/photo-1506905925346-21bda4d32df4?w=800&h=600&fit=crop',
+            tags=features['tags'],
+            isPublished=True,
+            viewCount=random.randint(50, 200),
+            likeCount=random.randint(5, 50),
+            reportCount=random.randint(0, 5),
+            averageRating=round(3.8 + random.uniform(0, 1.0), 1),
             # Enhanced fields
-            'terrain': walk_data.get('terrain'),
-            'startGridRef': walk_data.get('start_grid_ref'),
-            'bogFactor': walk_data.get('bog_factor'),
-            'detailedDescription': original_summary,
-            'sourceUrl': walk_data.get('source_url'),
+            terrain=walk_data.terrain,
+            startGridRef=walk_data.start_grid_ref,
+            bogFactor=walk_data.bog_factor,
+            detailedDescription=original_summary,
+            sourceUrl=walk_data.source_url,
             # Stages data
-            'stages': original_stages,
+            stages=original_stages,
             # Metadata
-            'scraped_at': walk_data.get('scraped_at'),
-            'converted_at': datetime.now().timestamp()
-        }
-        
-        return walk
+            scraped_at=walk_data.scraped_at,
+            converted_at=datetime.now().timestamp()
+        )
         
-    def convert_walks_file(self, input_file: str, output_file: str = None) -> List[Dict]:
-        """Convert a file of scraped walks to database format"""
+    def convert_parallel(self, records: Iterable[Tuple[int, DetailedWalk, Optional[Dict]]], workers: int,
+                         chunk_size: int) -> Iterator[Tuple[List[ConvertedWalk], List[str], Dict]]:
+        """Convert (index, walk, coords) records in chunks across a process pool, yielding
+        each chunk's results in input order"""
+        records = iter(records)
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_convert_worker) as executor:
+            # Only read ahead a couple of chunks per worker, so large inputs stay out of memory
+            pending = deque()
+            while True:
+                chunk = list(islice(records, chunk_size))
+                if chunk:
+                    pending.append(executor.submit(convert_chunk, chunk))
+                if pending and (len(pending) >= workers * 2 or not chunk):
+                    yield pending.popleft().result()
+                elif not chunk:
+                    return
+        
+    def convert_walks_file(self, input_file: str, output_file: str = None, follow: bool = False,
+                           search_index_file: Optional[str] = None, workers: int = 0,
+                           chunk_size: int = 200, columns_dir: Optional[str] = None) -> int:
+        """Convert a file of scraped walks to database format, one walk at a time.
+        
+        With follow=True a .jsonl input is converted while the scraper is still writing it.
+        With search_index_file, the full-text search index over the converted walks is written too.
+        With workers > 1, chunks of chunk_size walks are converted in that many processes.
+        With columns_dir, the columnar export is written there and the statistics are computed from it.
+        Returns the number of walks converted.
+        """
         if output_file is None:
-            output_file = input_file.replace('.json', '_converted.json')
+            base, ext = os.path.splitext(input_file)
+            output_file = f"{base}_converted{ext}"
             
         print(f"Converting walks from {input_file}...")
         
-        try:
-            with open(input_file, 'r', encoding='utf-8') as f:
-                scraped_walks = json.load(f)
-        except FileNotFoundError:
+        if not follow and not os.path.exists(input_file):
             print(f"Input file {input_file} not found")
-            return []
+            return 0
+            
+        # A followed file is still being written, so its walks are converted one at a time instead
+        try:
+            batch_coords = [] if follow else self.grid_ref_coordinates(input_file)
         except Exception as e:
             print(f"Error loading {input_file}: {e}")
-            return []
-            
-        converted_walks = []
+            return 0
         
-        for i, walk_data in enumerate(scraped_walks):
+        stats = new_conversion_stats()
+        search_index = SearchIndexBuilder() if search_index_file else None
+        columns = ColumnBuilder() if columns_dir else None
+        
+        with RecordWriter(output_file) as writer:
             try:
-                converted_walk = self.convert_walk(walk_data)
-                converted_walks.append(converted_walk)
-                print(f"  ✓ Converted: {converted_walk['title']}")
+                records = (
+                    (i, walk_data, batch_coords[i] if i < len(batch_coords) else None)
+                    for i, walk_data in enumerate(read_walks(input_file, DetailedWalk, follow=follow))
+                )
+                if workers > 1:
+                    # Chunks come back in input order, each with the statistics of its walks
+                    for converted, errors, partial_stats in self.convert_parallel(records, workers, chunk_size):
+                        for message in errors:
+                            print(message)
+                        for converted_walk in converted:
+                            writer.write(converted_walk)
+                            if search_index:
+                                search_index.add(converted_walk)
+                            if columns:
+                                columns.add(converted_walk)
+                        merge_conversion_stats(stats, partial_stats)
+                        print(f"  ✓ Converted {writer.count} walks")
+                else:
+                    for i, walk_data, coords in records:
+                        try:
+                            converted_walk = self.convert_walk(walk_data, coords)
+                        except Exception as e:
+                            print(f"  ✗ Error converting walk {i}: {e}")
+                            continue
+                            
+                        writer.write(converted_walk)
+                        if search_index:
+                            search_index.add(converted_walk)
+                        if columns:
+                            columns.add(converted_walk)
+                        print(f"  ✓ Converted: {converted_walk.title}")
+                        add_conversion_stats(stats, converted_walk)
             except Exception as e:
-                print(f"  ✗ Error converting walk {i}: {e}")
-                continue
+                print(f"Error loading {input_file}: {e}")
                 
-        print(f"\nConverted {len(converted_walks)} walks successfully")
-        
-        # Save converted walks
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(converted_walks, f, indent=2, ensure_ascii=False)
-            
+        converted_count = writer.count
+        print(f"\nConverted {converted_count} walks successfully")
         print(f"Saved converted walks to {output_file}")
+        if search_index:
+            search_index.save(search_index_file)
+        if columns:
+            columns.save(columns_dir)
+            print_catalogue_stats(catalogue_stats(WalkColumns(columns_dir)))
+            return converted_count
         
         # Show statistics
-        regions = {}
-        difficulties = {}
-        avg_stages = 0
-        
-        for walk in converted_walks:
-            region = walk['regionSlug']
-            regions[region] = regions.get(region, 0) + 1
-            
-            difficulty = walk['difficulty']
-            difficulties[difficulty] = difficulties.get(difficulty, 0) + 1
-            
-            avg_stages += len(walk.get('stages', []))
-            
-        avg_stages = avg_stages / len(converted_walks) if converted_walks else 0
+        avg_stages = stats['total_stages'] / converted_count if converted_count else 0
         
         print(f"\nStatistics:")
         print(f"- Average stages per walk: {avg_stages:.1f}")
-        print(f"- Regions: {dict(sorted(regions.items()))}")
-        print(f"- Difficulties: {dict(sorted(difficulties.items()))}")
+        print(f"- Regions: {dict(sorted(stats['regions'].items()))}")
+        print(f"- Difficulties: {dict(sorted(stats['difficulties'].items()))}")
         
-        return converted_walks
+        return converted_count
+
+# Per-process converter used by the conversion workers
+_worker_converter = None
+
+def init_convert_worker():
+    """Create the converter each worker process converts with"""
+    global _worker_converter
+    # Forked workers would otherwise all repeat the parent's random sequence
+    random.seed()
+    _worker_converter = DetailedWalkConverter()
+
+def convert_chunk(chunk: List[Tuple[int, DetailedWalk, Optional[Dict]]]) -> Tuple[List[ConvertedWalk], List[str], Dict]:
+    """Convert a chunk of (index, walk, coords) records (runs in a worker process), returning the
+    converted walks, error messages and the chunk's partial statistics"""
+    converted = []
+    errors = []
+    stats = new_conversion_stats()
+    for i, walk_data, coords in chunk:
+        try:
+            converted_walk = _worker_converter.convert_walk(walk_data, coords)
+        except Exception as e:
+            errors.append(f"  ✗ Error converting walk {i}: {e}")
+            continue
+        converted.append(converted_walk)
+        add_conversion_stats(stats, converted_walk)
+    return converted, errors, stats
 
 def main():
-    import sys
-    converter = DetailedWalkConverter()
+    import argparse
     
-    # Get input file from command line argument or use default
-    input_file = sys.argv[1] if len(sys.argv) > 1 else 'detailed_walks_priority.json'
-    output_file = sys.argv[2] if len(sys.argv) > 2 else 'converted_priority_walks.json'
+    parser = argparse.ArgumentParser(description="Convert scraped detailed walks into database format")
+    parser.add_argument('input_file', nargs='?', default='detailed_walks_priority.json',
+                        help="Scraped walks (.json array or .jsonl)")
+    parser.add_argument('output_file', nargs='?', default='converted_priority_walks.json',
+                        help="Converted walks; a .jsonl file is written one walk per line")
+    parser.add_argument('--follow', action='store_true',
+                        help="Convert a .jsonl input as it is written, until the scraper finishes")
+    parser.add_argument('--search-index', metavar='PATH', help="Also write the full-text search index to this file")
+    parser.add_argument('--workers', type=int, default=0,
+                        help="Convert in this many processes (0 converts in this process, walk by walk)")
+    parser.add_argument('--chunk-size', type=int, default=200, help="Walks sent to a worker at a time")
+    parser.add_argument('--columns', metavar='DIR', help="Also write the columnar export for analytics to this directory")
+    args = parser.parse_args()
     
-    converter.convert_walks_file(input_file, output_file)
+    converter = DetailedWalkConverter()
+    converter.convert_walks_file(args.input_file, args.output_file, follow=args.follow,
+                                 search_index_file=args.search_index, workers=args.workers,
+                                 chunk_size=args.chunk_size, columns_dir=args.columns)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,131 @@
+"""
+Local stand-in for the Convex HTTP API, for exercising bulk_import_walks.py offline.
+Implements POST /api/mutation for seed:importWalksBatch and seed:importSingleWalk
+against in-memory tables, with the same skip/region rules as convex/seed.ts and
+optional simulated latency and failures. Like Convex, it only runs the internal
+batch mutation for requests carrying the admin key.
+"""
+
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+DEFAULT_REGIONS = [
+    'isle-of-skye', 'fort-william', 'torridon-gairloch', 'cairngorms-aviemore',
+    'loch-lomond', 'argyll-oban', 'ullapool-assynt', 'perthshire', 'highlands'
+]
+
+# Functions that are internalMutation in convex/seed.ts
+INTERNAL_FUNCTIONS = {'seed:importWalksBatch'}
+
+class StubConvexBackend:
+    """In-memory walks and stages tables behind the stub server"""
+
+    def __init__(self, regions: Optional[List[str]] = None, latency: float = 0.0, error_rate: float = 0.0,
+                 seed: Optional[int] = None, fail_first: int = 0, admin_key: str = 'stub-admin-key'):
+        self.regions = set(regions or DEFAULT_REGIONS)
+        self.latency = latency        # seconds added to every request
+        self.error_rate = error_rate  # fraction of requests answered with a 500
+        self.fail_first = fail_first  # requests answered with a 500 before any succeed
+        self.admin_key = admin_key
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.walks: Dict[str, Dict] = {}
+        self.stage_count = 0
+        self.requests = 0
+
+    def import_walk(self, walk_data: Dict) -> Dict:
+        if walk_data.get('slug') in self.walks:
+            return {'created': False, 'skipped': True, 'message': f"Walk already exists: {walk_data.get('title')}"}
+        if walk_data.get('regionSlug') not in self.regions:
+            return {'created': False, 'error': True, 'message': f"Region not found: {walk_data.get('regionSlug')}"}
+        self.walks[walk_data['slug']] = walk_data
+        stages = len(walk_data.get('stages') or [])
+        self.stage_count += stages
+        return {'created': True, 'message': f"Successfully imported {walk_data.get('title')} with {stages} stages",
+                'stageCount': stages}
+
+    def run_mutation(self, path: str, args: Dict, authorization: Optional[str] = None):
+        if path in INTERNAL_FUNCTIONS and authorization != f"Convex {self.admin_key}":
+            # Convex answers as if internal functions did not exist for other callers
+            raise KeyError(f"Could not find public function for '{path}'")
+        if path == 'seed:importSingleWalk':
+            with self.lock:
+                return self.import_walk(json.loads(args['walkData']))
+        if path == 'seed:importWalksBatch':
+            with self.lock:
+                results = [dict(slug=walk.get('slug'), **self.import_walk(walk)) for walk in json.loads(args['walksData'])]
+            return {
+                'created': sum(1 for result in results if result.get('created')),
+                'skipped': sum(1 for result in results if result.get('skipped')),
+                'errors': sum(1 for result in results if result.get('error')),
+                'results': results
+            }
+        raise KeyError(f"Could not find public function for '{path}'")
+
+def make_handler(backend: StubConvexBackend):
+    class StubConvexHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive, so clients can pool connections
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            with backend.lock:
+                backend.requests += 1
+                failing = backend.requests <= backend.fail_first or backend.random.random() < backend.error_rate
+            if backend.latency:
+                time.sleep(backend.latency)
+
+            if self.path != '/api/mutation':
+                return self.respond(404, {'status': 'error', 'errorMessage': f"No route for {self.path}"})
+            if failing:
+                return self.respond(500, {'status': 'error', 'errorMessage': "Simulated server error"})
+            try:
+                request = json.loads(body)
+                value = backend.run_mutation(request['path'], request.get('args', {}), self.headers.get('Authorization'))
+            except Exception as e:
+                return self.respond(400, {'status': 'error', 'errorMessage': str(e)})
+            self.respond(200, {'status': 'success', 'value': value, 'logLines': []})
+
+        def respond(self, status: int, payload: Dict):
+            data = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubConvexHandler
+
+class StubConvexServer:
+    """Runs the stub on a background thread; use as a context manager"""
+
+    def __init__(self, backend: Optional[StubConvexBackend] = None, host: str = '127.0.0.1', port: int = 0):
+        self.backend = backend or StubConvexBackend()
+        self.server = ThreadingHTTPServer((host, port), make_handler(self.backend))
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'StubConvexServer':
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
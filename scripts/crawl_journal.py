@@ -0,0 +1,130 @@
+"""
+Transactional crawl journal for the detailed walk scraper.
+Tracks every URL as pending, done, failed or retry-after in SQLite so an
+interrupted crawl resumes where it stopped and its results merge into one output.
+"""
+
+import json
+import sqlite3
+import time
+from typing import Dict, List, Optional
+
+PENDING = 'pending'
+DONE = 'done'
+FAILED = 'failed'
+RETRY_AFTER = 'retry-after'
+
+class CrawlJournal:
+    def __init__(self, path: str = "crawl_journal.sqlite", max_attempts: int = 3, retry_delay: float = 60):
+        self.path = path
+        self.max_attempts = max_attempts  # attempts per URL within one run before it is marked failed
+        self.retry_delay = retry_delay    # seconds before the first retry, doubled for each further attempt
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS urls (
+                url TEXT PRIMARY KEY,
+                position INTEGER NOT NULL,
+                state TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                retry_after REAL,
+                last_error TEXT,
+                record TEXT,
+                updated_at REAL NOT NULL
+            )
+        ''')
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def reset(self):
+        """Forget all URLs so the next crawl starts from scratch"""
+        with self.conn:
+            self.conn.execute('DELETE FROM urls')
+
+    def enqueue(self, urls: List[str]):
+        """Add URLs as pending, keeping the state of any already in the journal"""
+        now = time.time()
+        with self.conn:
+            start = self.conn.execute('SELECT COALESCE(MAX(position) + 1, 0) FROM urls').fetchone()[0]
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO urls (url, position, state, updated_at) VALUES (?, ?, ?, ?)',
+                [(url, start + i, PENDING, now) for i, url in enumerate(urls)]
+            )
+
+    def requeue_failed(self) -> int:
+        """Give URLs that failed in a previous run a fresh set of attempts"""
+        with self.conn:
+            cursor = self.conn.execute(
+                'UPDATE urls SET state = ?, attempts = 0, retry_after = NULL, updated_at = ? WHERE state = ?',
+                (PENDING, time.time(), FAILED)
+            )
+        return cursor.rowcount
+
+    def states(self, urls: List[str]) -> Dict[str, Dict]:
+        """Current journal rows for the given URLs, keyed by URL"""
+        wanted = set(urls)
+        rows = self.conn.execute('SELECT url, state, attempts, retry_after FROM urls')
+        return {
+            url: {'state': state, 'attempts': attempts, 'retry_after': retry_after}
+            for url, state, attempts, retry_after in rows if url in wanted
+        }
+
+    def runnable_urls(self, urls: List[str], now: Optional[float] = None) -> List[str]:
+        """URLs that are pending or whose retry time has passed, in input order"""
+        now = now or time.time()
+        states = self.states(urls)
+        return [
+            url for url in urls
+            if states.get(url, {}).get('state') == PENDING
+            or (states.get(url, {}).get('state') == RETRY_AFTER and states[url]['retry_after'] <= now)
+        ]
+
+    def next_retry_in(self, urls: List[str]) -> Optional[float]:
+        """Seconds until the earliest scheduled retry, or None if nothing is waiting"""
+        retry_times = [s['retry_after'] for s in self.states(urls).values() if s['state'] == RETRY_AFTER]
+        if not retry_times:
+            return None
+        return max(0.0, min(retry_times) - time.time())
+
+    def mark_done(self, url: str, record: Optional[Dict]):
+        """Store a finished URL. record is None when there was nothing new to output"""
+        with self.conn:
+            self.conn.execute(
+                'UPDATE urls SET state = ?, attempts = attempts + 1, retry_after = NULL, last_error = NULL, '
+                'record = ?, updated_at = ? WHERE url = ?',
+                (DONE, json.dumps(record, ensure_ascii=False) if record is not None else None, time.time(), url)
+            )
+
+    def mark_failed(self, url: str, error: str) -> str:
+        """Record a failed attempt, scheduling a retry until max_attempts is reached. Returns the new state"""
+        attempts = self.conn.execute('SELECT attempts FROM urls WHERE url = ?', (url,)).fetchone()[0] + 1
+        now = time.time()
+        if attempts < self.max_attempts:
+            state, retry_after = RETRY_AFTER, now + self.retry_delay * 2 ** (attempts - 1)
+        else:
+            state, retry_after = FAILED, None
+        with self.conn:
+            self.conn.execute(
+                'UPDATE urls SET state = ?, attempts = ?, retry_after = ?, last_error = ?, updated_at = ? WHERE url = ?',
+                (state, attempts, retry_after, error, now, url)
+            )
+        return state
+
+    def is_complete(self) -> bool:
+        """True when the journal holds URLs and every one of them is done"""
+        counts = self.counts()
+        return bool(counts) and set(counts) == {DONE}
+
+    def counts(self) -> Dict[str, int]:
+        return dict(self.conn.execute('SELECT state, COUNT(*) FROM urls GROUP BY state'))
+
+    def record(self, url: str) -> Optional[Dict]:
+        """Stored walk record for a finished URL, or None"""
+        row = self.conn.execute('SELECT record FROM urls WHERE url = ? AND state = ?', (url, DONE)).fetchone()
+        return json.loads(row[0]) if row and row[0] is not None else None
+
+    def summary(self) -> str:
+        counts = self.counts()
+        return ", ".join(f"{counts.get(state, 0)} {state}" for state in (DONE, PENDING, RETRY_AFTER, FAILED))
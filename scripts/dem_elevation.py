@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Elevation from local DEM tiles (SRTM .hgt) in place of estimated ascent and elevation.
+Tiles are memory-mapped when first needed and kept in a small LRU cache, so only the
+parts of the tiles a run actually samples are read. Heights are interpolated
+bilinearly for a batch of points at a time, grouped by tile.
+
+Usage: python dem_elevation.py converted_priority_walks.json converted_walks_elevation.json --dem-dir dem [--gpx-dir gpx]
+"""
+
+import math
+import os
+import time
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from gpx_track import CLIMB_THRESHOLD_M, EARTH_RADIUS_KM, count_climb, gpx_path, track_segments
+from record_io import RecordWriter
+from walk_records import ConvertedWalk, read_walks
+
+# Height stored for missing data in SRTM tiles
+VOID = -32768
+
+# Route heights are sampled this far apart, which is finer than the 30-90 m tile spacing
+SAMPLE_SPACING_M = 25.0
+# Heights kept in a walk's elevation profile, evenly spaced along the route
+PROFILE_POINTS = 100
+
+def tile_name(latitude: int, longitude: int) -> str:
+    """SRTM file name of the tile whose south-west corner is at the given whole degrees, e.g. N56W005.hgt"""
+    return f"{'N' if latitude >= 0 else 'S'}{abs(latitude):02d}{'E' if longitude >= 0 else 'W'}{abs(longitude):03d}.hgt"
+
+class DemTile:
+    """One memory-mapped one-degree tile of big-endian 16-bit heights, rows from north to south"""
+
+    def __init__(self, path: str, latitude: int, longitude: int):
+        size = math.isqrt(os.path.getsize(path) // 2)
+        self.heights = np.memmap(path, dtype='>i2', mode='r', shape=(size, size))
+        self.latitude = latitude
+        self.longitude = longitude
+        self.intervals = size - 1  # 1200 for 3 arc-second tiles, 3600 for 1 arc-second
+
+    def sample(self, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+        """Bilinearly interpolated heights of points inside the tile, NaN next to voids"""
+        rows = (self.latitude + 1 - latitudes) * self.intervals
+        columns = (longitudes - self.longitude) * self.intervals
+        top = np.clip(np.floor(rows).astype(np.intp), 0, self.intervals - 1)
+        left = np.clip(np.floor(columns).astype(np.intp), 0, self.intervals - 1)
+        down = rows - top
+        right = columns - left
+
+        corners = np.stack([self.heights[top, left], self.heights[top, left + 1],
+                            self.heights[top + 1, left], self.heights[top + 1, left + 1]]).astype(float)
+        corners[corners == VOID] = np.nan
+        upper = corners[0] * (1 - right) + corners[1] * right
+        lower = corners[2] * (1 - right) + corners[3] * right
+        return upper * (1 - down) + lower * down
+
+class ElevationService:
+    """Heights from a directory of SRTM tiles, keeping at most max_tiles of them mapped"""
+
+    def __init__(self, dem_dir: str, max_tiles: int = 8):
+        self.dem_dir = dem_dir
+        self.max_tiles = max_tiles
+        self.tiles: 'OrderedDict[tuple, Optional[DemTile]]' = OrderedDict()
+        self.stats = {'tiles_opened': 0, 'tiles_evicted': 0, 'tiles_missing': 0, 'points': 0}
+
+    def tile(self, latitude: int, longitude: int) -> Optional[DemTile]:
+        """The tile with this south-west corner, or None when the directory does not have it"""
+        key = (latitude, longitude)
+        if key in self.tiles:
+            self.tiles.move_to_end(key)
+            return self.tiles[key]
+
+        path = os.path.join(self.dem_dir, tile_name(latitude, longitude))
+        if os.path.exists(path):
+            tile = DemTile(path, latitude, longitude)
+            self.stats['tiles_opened'] += 1
+        else:
+            tile = None
+            self.stats['tiles_missing'] += 1
+        self.tiles[key] = tile
+        if len(self.tiles) > self.max_tiles:
+            # Dropping the last reference to a tile unmaps it
+            self.tiles.popitem(last=False)
+            self.stats['tiles_evicted'] += 1
+        return tile
+
+    def heights(self, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+        """Heights in metres of a batch of points, NaN where there is no data"""
+        latitudes = np.asarray(latitudes, dtype=float)
+        longitudes = np.asarray(longitudes, dtype=float)
+        result = np.full(len(latitudes), np.nan)
+        corners = np.stack([np.floor(latitudes), np.floor(longitudes)], axis=1).astype(int)
+        keys, tile_of_point = np.unique(corners, axis=0, return_inverse=True)
+        tile_of_point = tile_of_point.ravel()
+        for index, (latitude, longitude) in enumerate(keys.tolist()):
+            tile = self.tile(latitude, longitude)
+            if tile is not None:
+                points = np.flatnonzero(tile_of_point == index)
+                result[points] = tile.sample(latitudes[points], longitudes[points])
+        self.stats['points'] += len(latitudes)
+        return result
+
+def resample_segment(segment: np.ndarray, spacing_m: float = SAMPLE_SPACING_M) -> np.ndarray:
+    """Points every spacing_m metres along a latitude/longitude segment, ends included"""
+    latitudes = np.radians(segment[:, 0])
+    longitudes = np.radians(segment[:, 1])
+    sin_lat = np.sin(np.diff(latitudes) / 2)
+    sin_lon = np.sin(np.diff(longitudes) / 2)
+    a = sin_lat ** 2 + np.cos(latitudes[:-1]) * np.cos(latitudes[1:]) * sin_lon ** 2
+    along = np.concatenate(([0.0], np.cumsum(2 * EARTH_RADIUS_KM * 1000 * np.arcsin(np.sqrt(np.minimum(a, 1.0))))))
+    stations = np.append(np.arange(0.0, along[-1], spacing_m), along[-1])
+    return np.stack([np.interp(stations, along, segment[:, 0]), np.interp(stations, along, segment[:, 1])], axis=1)
+
+def route_elevation(service: ElevationService, segments: List[np.ndarray],
+                    climb_threshold_m: float = CLIMB_THRESHOLD_M) -> Optional[Dict]:
+    """Elevation profile, ascent, descent and highest point of a route from the DEM,
+    or None when the tiles have no heights along it"""
+    samples = [resample_segment(segment) for segment in segments if len(segment)]
+    if not samples:
+        return None
+    points = np.concatenate(samples)
+    heights = service.heights(points[:, 0], points[:, 1])
+    if np.isnan(heights).all():
+        return None
+
+    ascent = descent = 0.0
+    start = 0
+    for segment in samples:
+        # Rises and falls are counted within each segment, between samples that have a height, by the
+        # same threshold as GPX ascent so DEM noise between samples is not summed into climbing
+        known = heights[start:start + len(segment)]
+        known = known[~np.isnan(known)]
+        if len(known):
+            rise, fall, _ = count_climb(known, float(known[0]), climb_threshold_m)
+            ascent += rise
+            descent += fall
+        start += len(segment)
+
+    known = heights[~np.isnan(heights)]
+    profile = np.interp(np.linspace(0, len(known) - 1, min(PROFILE_POINTS, len(known))), np.arange(len(known)), known)
+    return {
+        'profile': [round(height) for height in profile.tolist()],
+        'ascent_m': round(ascent),
+        'descent_m': round(descent),
+        'max_elevation_m': round(float(known.max()))
+    }
+
+def add_elevations(input_file: str, output_file: str, dem_dir: str, gpx_dir: Optional[str] = None,
+                   max_tiles: int = 8, batch_size: int = 1000, climb_threshold_m: float = CLIMB_THRESHOLD_M) -> Dict:
+    """Write the walks with ascent, maximum elevation and elevation profile from the DEM.
+    Walks with a route in the GPX store are profiled along it; the others get the height of their
+    start point under their ascent in place of the fixed offset. Returns counts and timings."""
+    service = ElevationService(dem_dir, max_tiles)
+    stats = {'walks': 0, 'routes': 0, 'start_points': 0, 'no_data': 0}
+    started = time.perf_counter()
+
+    def write_batch(batch: List[ConvertedWalk]):
+        # Start points of the whole batch are sampled together
+        located = [walk for walk in batch if walk.latitude is not None and walk.longitude is not None]
+        starts = service.heights([walk.latitude for walk in located], [walk.longitude for walk in located])
+        start_heights = {id(walk): height for walk, height in zip(located, starts.tolist())}
+
+        for walk in batch:
+            elevation = None
+            route_path = gpx_path(gpx_dir, walk.sourceUrl) if gpx_dir and walk.sourceUrl else None
+            if route_path and os.path.exists(route_path):
+                try:
+                    elevation = route_elevation(service, track_segments(route_path), climb_threshold_m)
+                except ET.ParseError as e:
+                    print(f"✗ Unreadable GPX route {route_path}: {e}")
+
+            start_height = start_heights.get(id(walk), math.nan)
+            if elevation:
+                walk.ascent = elevation['ascent_m']
+                walk.maxElevation = elevation['max_elevation_m']
+                walk.elevationProfile = elevation['profile']
+                stats['routes'] += 1
+            elif not math.isnan(start_height):
+                # The walk climbs its ascent from a start at a known height
+                walk.maxElevation = round(start_height + (walk.ascent or 0))
+                stats['start_points'] += 1
+            else:
+                stats['no_data'] += 1
+            writer.write(walk)
+
+    with RecordWriter(output_file) as writer:
+        batch = []
+        for walk in read_walks(input_file, ConvertedWalk):
+            stats['walks'] += 1
+            batch.append(walk)
+            if len(batch) >= batch_size:
+                write_batch(batch)
+                batch = []
+        if batch:
+            write_batch(batch)
+
+    stats['seconds'] = time.perf_counter() - started
+    stats.update(service.stats)
+    return stats
+
+def print_elevation_stats(stats: Dict):
+    print(f"\n✓ Elevations for {stats['walks']} walks in {stats['seconds']:.1f}s")
+    print(f"- Profiled along GPX routes: {stats['routes']}")
+    print(f"- From start point height: {stats['start_points']}")
+    print(f"- Outside the DEM tiles: {stats['no_data']}")
+    print(f"- Tiles opened {stats['tiles_opened']}, evicted {stats['tiles_evicted']}, missing {stats['tiles_missing']}; "
+          f"{stats['points']} points sampled")
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Ascent, maximum elevation and profiles of walks from local DEM tiles")
+    parser.add_argument('input_file', nargs='?', default='converted_priority_walks.json',
+                        help="Converted or formatted walks (.json array or .jsonl)")
+    parser.add_argument('output_file', nargs='?', default='converted_walks_elevation.json',
+                        help="Walks with DEM ascent, maxElevation and elevationProfile")
+    parser.add_argument('--dem-dir', metavar='DIR', default='dem', help="Directory of SRTM .hgt tiles")
+    parser.add_argument('--gpx-dir', metavar='DIR', help="Local GPX store (<region>/<walk>.gpx) to profile routes along")
+    parser.add_argument('--max-tiles', type=int, default=8, help="Tiles kept memory-mapped at once")
+    parser.add_argument('--climb-threshold', type=float, default=CLIMB_THRESHOLD_M,
+                        help="Metres of rise or fall ignored as elevation noise")
+    args = parser.parse_args()
+
+    print_elevation_stats(add_elevations(args.input_file, args.output_file, args.dem_dir, args.gpx_dir, args.max_tiles,
+                                         climb_threshold_m=args.climb_threshold))
+
+if __name__ == "__main__":
+    main()
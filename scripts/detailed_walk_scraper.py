@@ -5,42 +5,197 @@ from WalkHighlands.co.uk individual walk pages.
 """
 
 import requests
-from bs4 import BeautifulSoup
-import json
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup, Tag
+import io
+import os
 import time
 import re
-from typing import List, Dict, Optional
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Dict, Optional, Tuple
 from urllib.parse import urljoin
 
+from crawl_journal import DONE, FAILED, RETRY_AFTER, CrawlJournal
+from fingerprints import FingerprintStore, page_fingerprint
+from gpx_track import gpx_path, track_stats
+from html_parsing import PARSER_BACKENDS, check_backend, parse_html
+from osgb import grid_ref_to_wgs84
+from http_cache import HttpCache
+from page_archive import PageArchive, RecordingSession, ReplaySession
+from politeness import AdaptiveRateLimiter
+from record_io import RecordWriter, read_records
+from scrape_metrics import ScrapeMetrics
+from walk_pipeline import ScrapePipeline
+from walk_records import DetailedWalk, Stage
+
+# Patterns used by the extractors, compiled once
+GRADE_IMG_RE = re.compile(r'grade|boot|difficulty')
+BOG_IMG_RE = re.compile(r'bog')
+RATING_RE = re.compile(r'(\d+)/5')
+DISTANCE_RE = re.compile(r'Distance\s*(\d+(?:\.\d+)?)\s*km', re.IGNORECASE)
+KM_RE = re.compile(r'(\d+(?:\.\d+)?)\s*km')
+TIME_RE = re.compile(r'Time\s*(\d+(?:\.\d+)?)\s*-?\s*(\d+(?:\.\d+)?)?(?:\s*hours?)?', re.IGNORECASE)
+HOURS_RE = re.compile(r'(\d+(?:\.\d+)?)\s*(?:hours?|hrs?)', re.IGNORECASE)
+ASCENT_RE = re.compile(r'Ascent\s*(\d+)\s*m', re.IGNORECASE)
+GRID_REF_RE = re.compile(r'Grid Ref\s*([A-Z]{2}\d{6})', re.IGNORECASE)
+TERRAIN_RE = re.compile(r'Terrain', re.IGNORECASE)
+TERRAIN_TEXT_RE = re.compile(r'Terrain\s*[:\-]?\s*([^\.]+\.?)', re.IGNORECASE)
+STAGE_RE = re.compile(r'Stage\s+(\d+)', re.IGNORECASE)
+STAGE_LABEL_RE = re.compile(r'Stage\s+\d+\s*', re.IGNORECASE)
+COORDS_RE = re.compile(r'(\d+\.\d+),\s*(-?\d+\.\d+)')
+STAGE_WORDS = ['follow', 'path', 'track', 'head', 'continue', 'turn']
+GPX_LINK_RE = re.compile(r'gpx', re.IGNORECASE)
+
+# Cheap first check so most strings need only one regex search during the page walk
+STRING_HINT_RE = re.compile(r'/5|terrain|stage', re.IGNORECASE)
+
+class WalkPage:
+    """Parts of a walk page the extractors read, gathered in one pass over the tree"""
+    
+    def __init__(self, soup: BeautifulSoup):
+        self.soup = soup
+        self.h1 = None
+        self.walk_title = None
+        self.title = None
+        self.summary_div = None
+        self.paragraphs = []
+        self.image_sources = []
+        self.gpx_href = None
+        self.rating_string = None
+        self.terrain_string = None
+        self.stage_strings = []
+        self._paragraph_texts = None
+        
+        # The string types soup.get_text() includes, so the page text can be joined during the same walk
+        text_types = getattr(soup, 'interesting_string_types', None)
+        text_parts = []
+        hint = STRING_HINT_RE.search
+        
+        for node in soup.descendants:
+            if isinstance(node, Tag):
+                name = node.name
+                if name == 'p':
+                    self.paragraphs.append(node)
+                elif name == 'img':
+                    src = node.attrs.get('src')
+                    if isinstance(src, str):
+                        self.image_sources.append(src)
+                elif name == 'a':
+                    href = node.attrs.get('href')
+                    if self.gpx_href is None and isinstance(href, str) and GPX_LINK_RE.search(href):
+                        self.gpx_href = href
+                elif name == 'h1':
+                    self.h1 = self.h1 or node
+                elif name == 'title':
+                    self.title = self.title or node
+                    
+                classes = node.attrs.get('class')
+                if classes:
+                    if name == 'div' and self.summary_div is None and 'summary' in classes:
+                        self.summary_div = node
+                    if self.walk_title is None and 'walk-title' in classes:
+                        self.walk_title = node
+                continue
+                
+            if text_types and type(node) in text_types:
+                text_parts.append(node)
+                
+            # Every string type counts here (comments and scripts included), matching find_all(string=...)
+            if hint(node):
+                if self.rating_string is None and RATING_RE.search(node):
+                    self.rating_string = node
+                if self.terrain_string is None and TERRAIN_RE.search(node):
+                    self.terrain_string = node
+                if STAGE_RE.search(node):
+                    self.stage_strings.append(node)
+                    
+        self.text = ''.join(text_parts) if text_types else soup.get_text()
+        
+    def paragraph_texts(self) -> List[str]:
+        """Stripped text of every <p>, computed on first use"""
+        if self._paragraph_texts is None:
+            self._paragraph_texts = [p.get_text().strip() for p in self.paragraphs]
+        return self._paragraph_texts
+
 class DetailedWalkScraper:
-    def __init__(self):
+    def __init__(self, concurrency: int = 4, requests_per_second: float = 0.4, burst: int = 2,
+                 cache: Optional[HttpCache] = None, fingerprints: Optional[FingerprintStore] = None,
+                 journal: Optional[CrawlJournal] = None, parser_backend: str = 'html.parser',
+                 parse_workers: int = 0, queue_size: int = 32, metrics: Optional[ScrapeMetrics] = None,
+                 gpx_dir: Optional[str] = None, collect_gpx: bool = False, max_rate: Optional[float] = None):
         self.base_url = "https://www.walkhighlands.co.uk"
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
         
-    def get_page(self, url: str) -> Optional[BeautifulSoup]:
-        """Fetch and parse a webpage with error handling"""
-        try:
+        # Concurrent fetching is bounded by the per-host request budget, not by workers;
+        # the budget adapts to the server's health between an eighth and max_rate
+        self.concurrency = max(1, concurrency)
+        self.rate_limiter = AdaptiveRateLimiter(requests_per_second, burst, max_rate=max_rate)
+        adapter = HTTPAdapter(pool_maxsize=self.concurrency)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        
+        # Always-on instrumentation; every response is also timed by a session hook
+        self.metrics = metrics or ScrapeMetrics()
+        self.metrics.instrument(self.session)
+        
+        # Optional on-disk cache; unchanged pages are revalidated with conditional requests
+        self.cache = cache
+        
+        # Incremental mode: pages whose normalized body matches the last run are skipped
+        self.fingerprints = fingerprints
+        self.unchanged_urls = set()
+        
+        # Persistent crawl state so an interrupted run can resume and retry only failures
+        self.journal = journal
+        
+        self.parser_backend = check_backend(parser_backend)
+        
+        # Pipeline mode: parse in a process pool fed by a bounded queue of fetched pages
+        self.parse_workers = parse_workers
+        self.queue_size = queue_size
+        
+        # GPX routes are read from the local store when there, otherwise fetched when collect_gpx is on
+        self.gpx_dir = gpx_dir
+        self.collect_gpx = collect_gpx
+        
+    def download(self, url: str) -> bytes:
+        """One attempt at a page body, raising requests exceptions on failure"""
+        start = time.perf_counter()
+        if self.cache:
+            content = self.cache.fetch(self.session, url, timeout=15)
+        else:
             response = self.session.get(url, timeout=15)
             response.raise_for_status()
-            return BeautifulSoup(response.content, 'html.parser')
+            content = response.content
+        self.metrics.observe('fetch_seconds', time.perf_counter() - start)
+        return content
+        
+    def fetch_content(self, url: str) -> Optional[bytes]:
+        """Fetch the raw body of a webpage, retrying transient failures"""
+        try:
+            content = self.rate_limiter.fetch(url, lambda: self.download(url), self.metrics)
         except requests.RequestException as e:
+            self.metrics.count('errors_total', type=type(e).__name__)
             print(f"Error fetching {url}: {e}")
             return None
+        return content
+            
+    def get_page(self, url: str) -> Optional[BeautifulSoup]:
+        """Fetch and parse a webpage with error handling"""
+        content = self.fetch_content(url)
+        if content is None:
+            return None
+        with self.metrics.timer('parse_seconds'):
+            return parse_html(content, self.parser_backend)
             
-    def extract_walk_title(self, soup: BeautifulSoup) -> str:
+    def extract_walk_title(self, page: WalkPage) -> str:
         """Extract the walk title"""
         # Try different possible title locations
-        title_selectors = [
-            'h1',
-            '.walk-title',
-            'title'
-        ]
-        
-        for selector in title_selectors:
-            title_elem = soup.select_one(selector)
+        for title_elem in (page.h1, page.walk_title, page.title):
             if title_elem:
                 title = title_elem.get_text().strip()
                 # Clean up title (remove site name etc)
@@ -50,23 +205,20 @@ class DetailedWalkScraper:
                 
         return "Unknown Walk"
         
-    def extract_summary(self, soup: BeautifulSoup) -> str:
+    def extract_summary(self, page: WalkPage) -> str:
         """Extract the walk summary/description"""
         # Look for summary section
-        summary_elem = soup.find('div', class_='summary')
-        if summary_elem:
-            return summary_elem.get_text().strip()
+        if page.summary_div:
+            return page.summary_div.get_text().strip()
             
         # Alternative: look for first paragraph after title
-        paragraphs = soup.find_all('p')
-        for p in paragraphs:
-            text = p.get_text().strip()
+        for text in page.paragraph_texts():
             if len(text) > 100:  # Substantial paragraph
                 return text
                 
         return ""
         
-    def extract_grade_info(self, soup: BeautifulSoup) -> Dict[str, any]:
+    def extract_grade_info(self, page: WalkPage) -> Dict[str, any]:
         """Extract difficulty grade and bog factor"""
         grade_info = {
             'difficulty_rating': None,
@@ -75,25 +227,24 @@ class DetailedWalkScraper:
         }
         
         # Look for grade images or text
-        grade_imgs = soup.find_all('img', src=re.compile(r'grade|boot|difficulty'))
-        if grade_imgs:
-            grade_info['difficulty_rating'] = len(grade_imgs)
+        grade_count = sum(1 for src in page.image_sources if GRADE_IMG_RE.search(src))
+        if grade_count:
+            grade_info['difficulty_rating'] = grade_count
             
         # Look for bog factor
-        bog_imgs = soup.find_all('img', src=re.compile(r'bog'))
-        if bog_imgs:
-            grade_info['bog_factor'] = len(bog_imgs)
+        bog_count = sum(1 for src in page.image_sources if BOG_IMG_RE.search(src))
+        if bog_count:
+            grade_info['bog_factor'] = bog_count
             
         # Look for overall rating
-        rating_elem = soup.find(text=re.compile(r'\d+/5'))
-        if rating_elem:
-            rating_match = re.search(r'(\d+)/5', rating_elem)
+        if page.rating_string:
+            rating_match = RATING_RE.search(page.rating_string)
             if rating_match:
                 grade_info['overall_rating'] = int(rating_match.group(1))
                 
         return grade_info
         
-    def extract_walk_stats(self, soup: BeautifulSoup) -> Dict[str, any]:
+    def extract_walk_stats(self, page: WalkPage) -> Dict[str, any]:
         """Extract walk statistics (distance, time, ascent, etc.)"""
         stats = {
             'distance': None,
@@ -103,21 +254,20 @@ class DetailedWalkScraper:
             'terrain': None
         }
         
-        # Look for statistics table or section
-        stats_text = soup.get_text()
+        stats_text = page.text
         
         # Extract distance
-        distance_match = re.search(r'Distance\s*(\d+(?:\.\d+)?)\s*km', stats_text, re.IGNORECASE)
+        distance_match = DISTANCE_RE.search(stats_text)
         if distance_match:
             stats['distance'] = float(distance_match.group(1))
         else:
             # Try alternative format
-            distance_match = re.search(r'(\d+(?:\.\d+)?)\s*km', stats_text)
+            distance_match = KM_RE.search(stats_text)
             if distance_match:
                 stats['distance'] = float(distance_match.group(1))
                 
         # Extract time
-        time_match = re.search(r'Time\s*(\d+(?:\.\d+)?)\s*-?\s*(\d+(?:\.\d+)?)?(?:\s*hours?)?', stats_text, re.IGNORECASE)
+        time_match = TIME_RE.search(stats_text)
         if time_match:
             if time_match.group(2):
                 # Range given, take the higher value
@@ -126,45 +276,39 @@ class DetailedWalkScraper:
                 stats['time'] = float(time_match.group(1))
         else:
             # Try alternative format
-            time_match = re.search(r'(\d+(?:\.\d+)?)\s*(?:hours?|hrs?)', stats_text, re.IGNORECASE)
+            time_match = HOURS_RE.search(stats_text)
             if time_match:
                 stats['time'] = float(time_match.group(1))
                 
         # Extract ascent
-        ascent_match = re.search(r'Ascent\s*(\d+)\s*m', stats_text, re.IGNORECASE)
+        ascent_match = ASCENT_RE.search(stats_text)
         if ascent_match:
             stats['ascent'] = int(ascent_match.group(1))
             
         # Extract grid reference
-        grid_match = re.search(r'Grid Ref\s*([A-Z]{2}\d{6})', stats_text, re.IGNORECASE)
+        grid_match = GRID_REF_RE.search(stats_text)
         if grid_match:
             stats['start_grid_ref'] = grid_match.group(1)
             
         # Extract terrain description
-        terrain_elem = soup.find(text=re.compile(r'Terrain', re.IGNORECASE))
-        if terrain_elem:
+        if page.terrain_string:
             # Get the next few words/sentences after "Terrain"
-            parent = terrain_elem.parent
+            parent = page.terrain_string.parent
             if parent:
                 terrain_text = parent.get_text()
-                terrain_match = re.search(r'Terrain\s*[:\-]?\s*([^\.]+\.?)', terrain_text, re.IGNORECASE)
+                terrain_match = TERRAIN_TEXT_RE.search(terrain_text)
                 if terrain_match:
                     stats['terrain'] = terrain_match.group(1).strip()
                     
         return stats
         
-    def extract_stages(self, soup: BeautifulSoup) -> List[Dict[str, str]]:
+    def extract_stages(self, page: WalkPage) -> List[Stage]:
         """Extract the detailed stage-by-stage walk description"""
         stages = []
         
         # Look for stage headings and descriptions
-        stage_pattern = re.compile(r'Stage\s+(\d+)', re.IGNORECASE)
-        
-        # Find all elements that might contain stage information
-        all_text = soup.find_all(string=stage_pattern)
-        
-        for stage_text in all_text:
-            stage_match = stage_pattern.search(stage_text)
+        for stage_text in page.stage_strings:
+            stage_match = STAGE_RE.search(stage_text)
             if stage_match:
                 stage_num = int(stage_match.group(1))
                 
@@ -185,100 +329,151 @@ class DetailedWalkScraper:
                             description = next_elem.get_text().strip()
                             
                     # Clean up the description
-                    description = re.sub(r'Stage\s+\d+\s*', '', description, flags=re.IGNORECASE).strip()
+                    description = STAGE_LABEL_RE.sub('', description).strip()
                     
                     if description:
-                        stages.append({
-                            'stage': stage_num,
-                            'description': description
-                        })
+                        stages.append(Stage(stage=stage_num, description=description))
                         
         # Alternative approach: look for numbered paragraphs
         if not stages:
-            paragraphs = soup.find_all('p')
             stage_num = 1
-            for p in paragraphs:
-                text = p.get_text().strip()
+            for text in page.paragraph_texts():
                 if len(text) > 50:  # Substantial paragraph
                     # Check if it looks like a stage description
-                    if any(word in text.lower() for word in ['follow', 'path', 'track', 'head', 'continue', 'turn']):
-                        stages.append({
-                            'stage': stage_num,
-                            'description': text
-                        })
+                    if any(word in text.lower() for word in STAGE_WORDS):
+                        stages.append(Stage(stage=stage_num, description=text))
                         stage_num += 1
                         if stage_num > 10:  # Reasonable limit
                             break
                             
         return stages
         
-    def extract_coordinates(self, soup: BeautifulSoup, grid_ref: str = None) -> Dict[str, float]:
-        """Extract or estimate GPS coordinates"""
+    def extract_gpx_url(self, page: WalkPage, walk_url: str) -> Optional[str]:
+        """Link to the walk's GPX route download"""
+        return urljoin(walk_url, page.gpx_href) if page.gpx_href else None
+        
+    def extract_coordinates(self, page: WalkPage, grid_ref: str = None) -> Dict[str, float]:
+        """Extract GPS coordinates, or convert them from the grid reference"""
         coords = {'latitude': None, 'longitude': None}
         
         # Look for GPS coordinates in the page
-        coords_match = re.search(r'(\d+\.\d+),\s*(-?\d+\.\d+)', soup.get_text())
+        coords_match = COORDS_RE.search(page.text)
         if coords_match:
             coords['latitude'] = float(coords_match.group(1))
             coords['longitude'] = float(coords_match.group(2))
             
-        # If we have grid reference, we could convert it (simplified approximation)
+        # Otherwise convert the start grid reference from the OS National Grid
         elif grid_ref:
-            # This is a very rough approximation for Scottish grid refs
-            # In a real system, you'd use a proper grid reference conversion library
-            if grid_ref.startswith('NG'):  # Skye area
-                coords['latitude'] = 57.3  # Approximate
-                coords['longitude'] = -6.2
-            elif grid_ref.startswith('NN'):  # Central Highlands
-                coords['latitude'] = 56.8
-                coords['longitude'] = -4.5
+            converted = grid_ref_to_wgs84(grid_ref)
+            if converted:
+                coords['latitude'], coords['longitude'] = converted
                 
         return coords
         
-    def scrape_walk_details(self, walk_url: str) -> Dict:
+    def scrape_walk_details(self, walk_url: str) -> Optional[DetailedWalk]:
         """Scrape detailed information from a single walk page"""
         print(f"Scraping: {walk_url}")
         
-        soup = self.get_page(walk_url)
-        if not soup:
+        content = self.fetch_content(walk_url)
+        if not content:
             return None
             
-        # Extract all the information
-        title = self.extract_walk_title(soup)
-        summary = self.extract_summary(soup)
-        grade_info = self.extract_grade_info(soup)
-        stats = self.extract_walk_stats(soup)
-        stages = self.extract_stages(soup)
-        coords = self.extract_coordinates(soup, stats.get('start_grid_ref'))
-        
-        walk_data = {
-            'title': title,
-            'summary': summary,
-            'source_url': walk_url,
-            'difficulty_rating': grade_info.get('difficulty_rating'),
-            'bog_factor': grade_info.get('bog_factor'),
-            'overall_rating': grade_info.get('overall_rating'),
-            'distance_km': stats.get('distance'),
-            'estimated_hours': stats.get('time'),
-            'ascent_m': stats.get('ascent'),
-            'start_grid_ref': stats.get('start_grid_ref'),
-            'terrain': stats.get('terrain'),
-            'latitude': coords.get('latitude'),
-            'longitude': coords.get('longitude'),
-            'stages': stages,
-            'scraped_at': time.time()
-        }
+        # In incremental mode, skip extraction when the page is unchanged since the last run
+        changed, fingerprint = self.page_changed(walk_url, content)
+        if not changed:
+            return None
+            
+        with self.metrics.timer('parse_seconds'):
+            soup = parse_html(content, self.parser_backend)
+        walk_data = self.extract_walk_details(soup, walk_url)
         
+        if fingerprint:
+            self.fingerprints.update(walk_url, fingerprint, walk_data.scraped_at)
+            
         return walk_data
         
+    def page_changed(self, walk_url: str, content: bytes) -> Tuple[bool, Optional[str]]:
+        """Fingerprint a page in incremental mode and report whether it changed since the last run"""
+        if not self.fingerprints:
+            return True, None
+            
+        fingerprint = page_fingerprint(content)
+        if self.fingerprints.is_unchanged(walk_url, fingerprint):
+            self.unchanged_urls.add(walk_url)
+            return False, fingerprint
+        return True, fingerprint
+        
+    def extract_walk_details(self, soup: BeautifulSoup, walk_url: str) -> DetailedWalk:
+        """Build the walk record from a parsed walk page"""
+        # Gather everything the extractors need in a single pass over the tree
+        timed = self.metrics.timed
+        page = timed('extract_seconds', WalkPage, soup, extractor='page')
+        
+        title = timed('extract_seconds', self.extract_walk_title, page, extractor='title')
+        summary = timed('extract_seconds', self.extract_summary, page, extractor='summary')
+        grade_info = timed('extract_seconds', self.extract_grade_info, page, extractor='grade_info')
+        stats = timed('extract_seconds', self.extract_walk_stats, page, extractor='walk_stats')
+        stages = timed('extract_seconds', self.extract_stages, page, extractor='stages')
+        coords = timed('extract_seconds', self.extract_coordinates, page, stats.get('start_grid_ref'),
+                       extractor='coordinates')
+        gpx_url = timed('extract_seconds', self.extract_gpx_url, page, walk_url, extractor='gpx_url')
+        
+        return DetailedWalk(
+            title=title,
+            summary=summary,
+            source_url=walk_url,
+            difficulty_rating=grade_info.get('difficulty_rating'),
+            bog_factor=grade_info.get('bog_factor'),
+            overall_rating=grade_info.get('overall_rating'),
+            distance_km=stats.get('distance'),
+            estimated_hours=stats.get('time'),
+            ascent_m=stats.get('ascent'),
+            start_grid_ref=stats.get('start_grid_ref'),
+            terrain=stats.get('terrain'),
+            latitude=coords.get('latitude'),
+            longitude=coords.get('longitude'),
+            gpx_url=gpx_url,
+            stages=stages,
+            scraped_at=time.time()
+        )
+        
+    def attach_track(self, walk: DetailedWalk):
+        """Fill in the walk's track length, ascent, descent and high point from its GPX route"""
+        path = gpx_path(self.gpx_dir, walk.source_url) if self.gpx_dir and walk.source_url else None
+        if path and os.path.exists(path):
+            source = path
+        elif self.collect_gpx and walk.gpx_url:
+            # Fetched through the session, so a replay archive serves recorded routes
+            content = self.fetch_content(walk.gpx_url)
+            if not content:
+                return
+            if path:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(content)
+                os.replace(tmp_path, path)
+            source = io.BytesIO(content)
+        else:
+            return
+            
+        try:
+            stats = self.metrics.timed('extract_seconds', track_stats, source, extractor='gpx_track')
+        except (ET.ParseError, ValueError, TypeError) as e:
+            self.metrics.count('errors_total', type='GpxParseError')
+            print(f"    ✗ Unreadable GPX route for {walk.source_url}: {e}")
+            return
+        if stats:
+            walk.track_distance_km = stats['distance_km']
+            walk.track_ascent_m = stats['ascent_m']
+            walk.track_descent_m = stats['descent_m']
+            walk.track_max_elevation_m = stats['max_elevation_m']
+            
     def load_walk_urls(self, source_file: str = "popular_scottish_walks.json") -> List[str]:
         """Load walk URLs from our scraped data"""
         try:
-            with open(source_file, 'r', encoding='utf-8') as f:
-                walks_data = json.load(f)
-            
             urls = []
-            for walk in walks_data:
+            for walk in read_records(source_file):
                 if 'source_url' in walk and walk['source_url']:
                     urls.append(walk['source_url'])
                     
@@ -292,59 +487,124 @@ class DetailedWalkScraper:
             print(f"Error loading walk URLs: {e}")
             return []
 
-    def scrape_walks_batch(self, urls: List[str], batch_size: int = 15, start_index: int = 0) -> List[Dict]:
-        """Scrape walks in batches with progress tracking and error handling"""
-        detailed_walks = []
+    def scrape_walk_safely(self, url: str) -> Tuple[Optional[DetailedWalk], Optional[str]]:
+        """Scrape a single walk, returning (walk_data, error) instead of raising"""
+        try:
+            return self.scrape_walk_details(url), None
+        except Exception as e:
+            return None, str(e)
+
+    def scrape_in_batches(self, urls: List[str], batch_size: int, total_urls: int) -> Iterator[Tuple[str, Optional[DetailedWalk], Optional[str]]]:
+        """Fetch and extract walks on a thread pool, yielding (url, walk_data, error) in input order"""
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for i in range(0, len(urls), batch_size):
+                batch_urls = urls[i:i + batch_size]
+                
+                print(f"\n--- Batch {i//batch_size + 1}: {len(batch_urls)} URLs, {len(urls) - i} outstanding of {total_urls} ---")
+                
+                # Pacing is handled by the rate limiter in get_page, so results
+                # arrive as fast as the request budget allows, in input order
+                results = executor.map(self.scrape_walk_safely, batch_urls)
+                for url, (walk_data, error) in zip(batch_urls, results):
+                    yield url, walk_data, error
+                    
+    def scrape_walks_batch(self, urls: List[str], batch_size: int = 15, start_index: int = 0) -> List[DetailedWalk]:
+        """Scrape walks in batches with progress tracking, journaling and retries"""
+        return list(self.stream_walks(urls, batch_size, start_index))
+        
+    def stream_walks(self, urls: List[str], batch_size: int = 15, start_index: int = 0) -> Iterator[DetailedWalk]:
+        """Scrape walks like scrape_walks_batch, yielding each record in input order as soon as
+        every earlier URL has finished, so output can be written while the crawl is running"""
+        urls = urls[start_index:]
         total_urls = len(urls)
+        positions = {url: i + 1 for i, url in enumerate(urls)}
         
-        print(f"Starting batch scraping: {len(urls)} URLs, batch size {batch_size}")
-        print(f"Starting from index {start_index}")
+        # Without a persistent journal, track this run in memory so retries still apply
+        journal = self.journal or CrawlJournal(':memory:')
+        journal.enqueue(urls)
+        requeued = journal.requeue_failed()
         
-        for i in range(start_index, total_urls, batch_size):
-            batch_end = min(i + batch_size, total_urls)
-            batch_urls = urls[i:batch_end]
-            
-            print(f"\n--- Batch {i//batch_size + 1}: URLs {i+1}-{batch_end} of {total_urls} ---")
-            
-            batch_walks = []
-            for j, url in enumerate(batch_urls):
-                try:
-                    print(f"  [{i+j+1:3d}/{total_urls:3d}] {url}")
-                    
-                    walk_data = self.scrape_walk_details(url)
-                    if walk_data:
-                        batch_walks.append(walk_data)
-                        print(f"    ✓ Success: {walk_data['title'][:50]}...")
-                    else:
-                        print(f"    ✗ Failed to scrape walk data")
-                        
-                except Exception as e:
-                    print(f"    ✗ Error: {e}")
-                    continue
+        print(f"Starting batch scraping: {total_urls} URLs, batch size {batch_size}")
+        print(f"Starting from index {start_index}")
+        print(f"Concurrency {self.concurrency}, {self.rate_limiter.requests_per_second} requests/sec per host")
+        if self.parse_workers:
+            print(f"Pipeline mode: {self.parse_workers} parser processes, queue of {self.queue_size} pages")
+        print(f"Journal: {journal.summary()}" + (f" ({requeued} failed URLs requeued)" if requeued else ""))
+        
+        # Finished records wait in the journal, not in memory, until every earlier URL is settled
+        states = {url: row['state'] for url, row in journal.states(urls).items()}
+        next_position = 0
+        walk_count = 0
+        
+        def settled_records():
+            nonlocal next_position
+            while next_position < total_urls and states[urls[next_position]] in (DONE, FAILED):
+                record = journal.record(urls[next_position])
+                next_position += 1
+                if record is not None:
+                    yield DetailedWalk.from_dict(record)
                     
-                # Be respectful to the server
-                time.sleep(2.5)
+        while True:
+            for record in settled_records():
+                walk_count += 1
+                yield record
                 
-            detailed_walks.extend(batch_walks)
-            
-            # Save progress after each batch
-            if batch_walks:
-                batch_filename = f"detailed_walks_batch_{i//batch_size + 1}.json"
-                with open(batch_filename, 'w', encoding='utf-8') as f:
-                    json.dump(batch_walks, f, indent=2, ensure_ascii=False)
-                print(f"  Saved {len(batch_walks)} walks to {batch_filename}")
+            todo = journal.runnable_urls(urls)
+            if not todo:
+                retry_in = journal.next_retry_in(urls)
+                if retry_in is None:
+                    break
+                print(f"\n  Waiting {retry_in:.0f} seconds before retrying failed walks...")
+                time.sleep(retry_in)
+                continue
                 
-            # Longer pause between batches
-            if batch_end < total_urls:
-                print(f"  Waiting 10 seconds before next batch...")
-                time.sleep(10)
+            retries = sum(1 for url in todo if states[url] == RETRY_AFTER)
+            if retries:
+                self.metrics.count('retries_total', retries)
+                
+            if self.parse_workers:
+                results = ScrapePipeline(self, self.parse_workers, self.queue_size).run(todo)
+            else:
+                results = self.scrape_in_batches(todo, batch_size, total_urls)
                 
-        print(f"\nCompleted scraping {len(detailed_walks)} walks successfully")
-        return detailed_walks
+            for url, walk_data, error in results:
+                print(f"  [{positions[url]:3d}/{total_urls:3d}] {url}")
+                
+                # Each outcome is committed as it arrives, so a crash loses at most the in-flight walks
+                if error:
+                    states[url] = journal.mark_failed(url, error)
+                    self.metrics.page_done('error')
+                    print(f"    ✗ Error: {error} ({states[url]})")
+                elif url in self.unchanged_urls:
+                    journal.mark_done(url, None)
+                    states[url] = DONE
+                    self.metrics.page_done('unchanged')
+                    print("    = Unchanged since last run, skipped")
+                elif walk_data:
+                    self.attach_track(walk_data)
+                    journal.mark_done(url, walk_data.to_dict())
+                    states[url] = DONE
+                    self.metrics.page_done('success')
+                    print(f"    ✓ Success: {walk_data.title[:50]}...")
+                else:
+                    states[url] = journal.mark_failed(url, "Failed to scrape walk data")
+                    self.metrics.page_done('failed')
+                    print(f"    ✗ Failed to scrape walk data ({states[url]})")
+                    
+                for record in settled_records():
+                    walk_count += 1
+                    yield record
+                    
+        print(f"\nCompleted scraping {walk_count} walks successfully")
+        print(f"Journal: {journal.summary()}")
+        if self.fingerprints:
+            print(f"Skipped {len(self.unchanged_urls)} unchanged walks")
+        print(self.metrics.report())
+        print(f"Politeness: {self.rate_limiter.summary()}")
 
-    def scrape_priority_walks(self) -> List[Dict]:
+    def scrape_priority_walks(self, source_file: str = "popular_scottish_walks.json") -> Iterator[DetailedWalk]:
         """Scrape priority walks first (Skye, Ben Nevis area, Glen Coe, Cairngorms)"""
-        all_urls = self.load_walk_urls()
+        all_urls = self.load_walk_urls(source_file)
         
         # Priority keywords for first batch
         priority_keywords = [
@@ -372,9 +632,9 @@ class DetailedWalkScraper:
         print(f"Found {len(priority_urls)} priority walks")
         print(f"Remaining {len(remaining_urls)} walks")
         
-        return self.scrape_walks_batch(priority_urls, batch_size=10)
+        return self.stream_walks(priority_urls, batch_size=10)
 
-    def scrape_sample_walks(self) -> List[Dict]:
+    def scrape_sample_walks(self) -> Iterator[DetailedWalk]:
         """Scrape a sample of detailed walks for testing"""
         # Sample URLs for testing
         sample_urls = [
@@ -385,69 +645,154 @@ class DetailedWalkScraper:
             'https://www.walkhighlands.co.uk/cairngorms/loch-vaa.shtml'
         ]
         
-        return self.scrape_walks_batch(sample_urls, batch_size=5)
+        return self.stream_walks(sample_urls, batch_size=5)
 
 def main():
-    import sys
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Scrape detailed walk information from WalkHighlands")
+    parser.add_argument('mode', nargs='?', default='sample', choices=['sample', 'priority', 'all', 'batch'])
+    parser.add_argument('start_index', nargs='?', type=int, default=0, help="First URL index (batch mode)")
+    parser.add_argument('batch_size', nargs='?', type=int, default=20, help="URLs per batch (batch mode)")
+    parser.add_argument('--concurrency', type=int, default=4, help="Maximum in-flight requests")
+    parser.add_argument('--rate', type=float, default=0.4, help="Requests per second per host to start at")
+    parser.add_argument('--max-rate', type=float,
+                        help="Highest requests per second per host while the site responds well (default: 4x --rate)")
+    parser.add_argument('--burst', type=int, default=2, help="Requests allowed back-to-back before pacing")
+    parser.add_argument('--cache-dir', default='.http_cache', help="Directory for the on-disk HTTP cache")
+    parser.add_argument('--no-cache', action='store_true', help="Always download pages in full")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Only output walks that are new or changed since the last incremental run")
+    parser.add_argument('--fingerprints', default='walk_fingerprints.json', help="Fingerprint store for --incremental")
+    parser.add_argument('--parser', default='html.parser', choices=PARSER_BACKENDS,
+                        help="BeautifulSoup parser backend (see benchmark_parsers.py)")
+    parser.add_argument('--parse-workers', type=int, default=0,
+                        help="Parse pages in this many processes fed by the fetchers (0 parses in the fetch threads)")
+    parser.add_argument('--queue-size', type=int, default=32, help="Fetched pages allowed to wait for a parser")
+    parser.add_argument('--record', metavar='ARCHIVE', help="Save every fetched response to this zip archive")
+    parser.add_argument('--replay', metavar='ARCHIVE', help="Serve pages from this archive instead of the live site")
+    parser.add_argument('--replay-latency', type=float, default=0.0, help="Simulated seconds per replayed request")
+    parser.add_argument('--replay-error-rate', type=float, default=0.0, help="Fraction of replayed requests that fail")
+    parser.add_argument('--source', default='popular_scottish_walks.json',
+                        help="Walk listing to read URLs from (.json array or .jsonl)")
+    parser.add_argument('--jsonl', action='store_true',
+                        help="Write one walk per line as it is scraped, so conversion can follow the file")
+    parser.add_argument('--journal', help="Crawl journal database (default: crawl_journal_<mode>.sqlite)")
+    parser.add_argument('--fresh', action='store_true', help="Discard any unfinished crawl in the journal")
+    parser.add_argument('--metrics-file', metavar='PATH',
+                        help="Prometheus textfile to keep updated with scrape metrics (e.g. for node_exporter)")
+    parser.add_argument('--metrics-json', metavar='PATH', help="Write an end-of-run metrics summary to this file")
+    parser.add_argument('--gpx', action='store_true',
+                        help="Fetch each walk's GPX route for measured distance, ascent and elevation")
+    parser.add_argument('--gpx-dir', metavar='DIR',
+                        help="Local GPX store (<region>/<walk>.gpx), read first and filled with fetched routes")
+    args = parser.parse_args()
     
-    scraper = DetailedWalkScraper()
+    # Resume an interrupted crawl; a finished one is cleared so the next run starts over
+    journal = CrawlJournal(args.journal or f"crawl_journal_{args.mode}.sqlite")
+    if args.fresh or journal.is_complete():
+        journal.reset()
+    elif journal.counts():
+        print(f"Resuming crawl from {journal.path}: {journal.summary()}")
     
-    # Command line argument for different modes
-    mode = 'sample'  # default
-    if len(sys.argv) > 1:
-        mode = sys.argv[1]
+    # Recording needs full responses, so it bypasses the cache's 304s
+    cache = None if args.no_cache or args.record else HttpCache(args.cache_dir)
+    fingerprints = FingerprintStore(args.fingerprints) if args.incremental else None
+    scraper = DetailedWalkScraper(concurrency=args.concurrency, requests_per_second=args.rate, burst=args.burst,
+                                  cache=cache, fingerprints=fingerprints, journal=journal, parser_backend=args.parser,
+                                  parse_workers=args.parse_workers, queue_size=args.queue_size,
+                                  metrics=ScrapeMetrics(textfile=args.metrics_file),
+                                  gpx_dir=args.gpx_dir, collect_gpx=args.gpx, max_rate=args.max_rate)
+    mode = args.mode
+    
+    archive = None
+    if args.record:
+        archive = PageArchive(args.record, 'a')
+        scraper.session = RecordingSession(scraper.session, archive)
+    elif args.replay:
+        archive = PageArchive(args.replay)
+        scraper.session = scraper.metrics.instrument(
+            ReplaySession(archive, latency=args.replay_latency, error_rate=args.replay_error_rate))
+    
+    extension = 'jsonl' if args.jsonl else 'json'
     
     if mode == 'priority':
         print("Scraping PRIORITY walks (Skye, Ben Nevis, Glen Coe, Cairngorms)...")
-        walks = scraper.scrape_priority_walks()
-        output_file = 'detailed_walks_priority.json'
+        walks = scraper.scrape_priority_walks(args.source)
+        output_file = f'detailed_walks_priority.{extension}'
         
     elif mode == 'all':
         print("Scraping ALL 120 walks in batches...")
-        all_urls = scraper.load_walk_urls()
-        walks = scraper.scrape_walks_batch(all_urls, batch_size=15)
-        output_file = 'detailed_walks_all.json'
+        all_urls = scraper.load_walk_urls(args.source)
+        walks = scraper.stream_walks(all_urls, batch_size=15)
+        output_file = f'detailed_walks_all.{extension}'
         
     elif mode == 'batch':
-        # Get batch parameters from command line
-        start_idx = int(sys.argv[2]) if len(sys.argv) > 2 else 0
-        batch_size = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+        start_idx = args.start_index
+        batch_size = args.batch_size
         
         print(f"Scraping BATCH starting at {start_idx}, batch size {batch_size}...")
-        all_urls = scraper.load_walk_urls()
-        walks = scraper.scrape_walks_batch(all_urls, batch_size=batch_size, start_index=start_idx)
-        output_file = f'detailed_walks_batch_{start_idx}_{start_idx + batch_size}.json'
+        all_urls = scraper.load_walk_urls(args.source)
+        walks = scraper.stream_walks(all_urls, batch_size=batch_size, start_index=start_idx)
+        output_file = f'detailed_walks_batch_{start_idx}_{start_idx + batch_size}.{extension}'
         
     else:  # sample mode
         print("Scraping SAMPLE walks for testing...")
         walks = scraper.scrape_sample_walks()
-        output_file = 'detailed_walks_sample.json'
+        output_file = f'detailed_walks_sample.{extension}'
     
-    print(f"\nScraped {len(walks)} detailed walks")
+    # Walks are written as they are scraped; only summary figures are kept in memory
+    total_stages = 0
+    walks_with_stages = 0
+    first_walks = []
+    with RecordWriter(output_file) as writer:
+        for walk in walks:
+            writer.write(walk)
+            total_stages += len(walk.stages)
+            walks_with_stages += 1 if walk.stages else 0
+            if len(first_walks) < 3:
+                first_walks.append(walk)
     
-    if walks:
-        # Save to JSON
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(walks, f, indent=2, ensure_ascii=False)
-            
+    print(f"\nScraped {writer.count} detailed walks")
+    
+    if writer.count:
         print(f"Saved to {output_file}")
         
         # Show summary statistics
-        stages_count = [len(walk.get('stages', [])) for walk in walks]
-        avg_stages = sum(stages_count) / len(stages_count) if stages_count else 0
+        avg_stages = total_stages / writer.count
         
         print(f"\nSummary:")
-        print(f"- Total walks: {len(walks)}")
+        print(f"- Total walks: {writer.count}")
         print(f"- Average stages per walk: {avg_stages:.1f}")
-        print(f"- Walks with stages: {len([w for w in walks if w.get('stages')])}")
+        print(f"- Walks with stages: {walks_with_stages}")
         
         # Show sample walks
         print(f"\nFirst few walks:")
-        for i, walk in enumerate(walks[:3]):
-            print(f"{i+1}. {walk['title']} - {len(walk.get('stages', []))} stages")
+        for i, walk in enumerate(first_walks):
+            print(f"{i+1}. {walk.title} - {len(walk.stages)} stages")
             
+    elif fingerprints:
+        # The empty file tells downstream conversion there is nothing new to process
+        print(f"No new or changed walks, wrote empty {output_file}")
+        
     else:
+        os.remove(output_file)
         print("No walks were successfully scraped!")
+        
+    # Fingerprints are only persisted once the changed walks have been written out
+    if fingerprints:
+        fingerprints.save()
+        
+    if cache:
+        print(f"\n{cache.summary()}")
+    if archive:
+        archive.close()
+        
+    if args.metrics_file:
+        scraper.metrics.write_prometheus(args.metrics_file)
+    if args.metrics_json:
+        scraper.metrics.write_json(args.metrics_json)
+        print(f"Saved metrics summary to {args.metrics_json}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,61 @@
+"""
+Content fingerprints for incremental re-scraping.
+A walk page is only re-extracted when its normalized body differs from the last run.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Dict, Optional
+
+# Markup that changes between requests without the walk itself changing
+VOLATILE_MARKUP = re.compile(rb'<script\b.*?</script>|<style\b.*?</style>|<!--.*?-->', re.IGNORECASE | re.DOTALL)
+WHITESPACE = re.compile(rb'\s+')
+
+def page_fingerprint(content: bytes) -> str:
+    """Hash of a page body with scripts, styles, comments and whitespace runs removed"""
+    normalized = VOLATILE_MARKUP.sub(b'', content)
+    normalized = WHITESPACE.sub(b' ', normalized).strip()
+    return hashlib.sha256(normalized).hexdigest()
+
+class FingerprintStore:
+    def __init__(self, path: str = "walk_fingerprints.json"):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries: Dict[str, Dict] = {}
+
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+
+    def get(self, url: str) -> Optional[Dict]:
+        with self.lock:
+            return self.entries.get(url)
+
+    def is_unchanged(self, url: str, fingerprint: str) -> bool:
+        """True if this URL was scraped before with the same page fingerprint"""
+        entry = self.get(url)
+        return bool(entry) and entry.get('fingerprint') == fingerprint
+
+    def update(self, url: str, fingerprint: str, scraped_at: Optional[float] = None):
+        """Record the fingerprint of a page that has just been extracted"""
+        scraped_at = scraped_at or time.time()
+        with self.lock:
+            previous = self.entries.get(url, {})
+            changed = previous.get('fingerprint') != fingerprint
+            self.entries[url] = {
+                'fingerprint': fingerprint,
+                'scraped_at': scraped_at,
+                'changed_at': scraped_at if changed else previous.get('changed_at', scraped_at)
+            }
+
+    def save(self):
+        """Write the store atomically so an interrupted run never leaves it half-written"""
+        tmp_path = f"{self.path}.tmp"
+        with self.lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, indent=2)
+        os.replace(tmp_path, self.path)
@@ -3,10 +3,19 @@
 Format scraped WalkHighlands data for insertion into Convex database.
 """
 
-import json
+import math
+import os
 import re
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import unicodedata
+import xml.etree.ElementTree as ET
+
+from gpx_track import gpx_path, track_stats
+from osgb import grid_refs_to_wgs84
+from record_io import RecordWriter, read_records
+from search_index import SearchIndexBuilder
+from walk_records import ConvertedWalk, ScrapedWalk, read_walks
+from walk_tagging import TITLE_FEATURE_TAGS, WALK_MATCHER, route_type
 
 def create_slug(title: str) -> str:
     """Create URL-friendly slug from title"""
@@ -45,22 +54,12 @@ def map_difficulty(difficulty_level: int, difficulty_desc: str) -> str:
 
 def extract_route_type(title: str, description: str) -> str:
     """Determine route type from title and description"""
-    title_lower = title.lower()
-    desc_lower = description.lower()
-    
-    if any(word in title_lower or word in desc_lower for word in ['circuit', 'circular', 'loop', 'round']):
-        return "Circular"
-    elif any(word in title_lower or word in desc_lower for word in ['out and back', 'return', 'there and back']):
-        return "Out and Back"
-    else:
-        return "Linear"
+    return route_type(WALK_MATCHER.matches(f"{title}\n{description}"), 'listing_route_type')
 
 def generate_tags(title: str, region: str, difficulty: str, distance_km: float) -> List[str]:
     """Generate relevant tags for a walk"""
     tags = []
     
-    title_lower = title.lower()
-    
     # Distance-based tags
     if distance_km and distance_km <= 3:
         tags.append("short-walk")
@@ -72,32 +71,8 @@ def generate_tags(title: str, region: str, difficulty: str, distance_km: float)
         tags.append("family-friendly")
     
     # Feature-based tags from title
-    feature_tags = {
-        'beach': ['beach', 'coastal'],
-        'bay': ['beach', 'coastal'],
-        'castle': ['historic', 'castle'],
-        'waterfall': ['waterfall'],
-        'falls': ['waterfall'],
-        'loch': ['loch'],
-        'glen': ['glen'],
-        'forest': ['forest'],
-        'wood': ['forest'],  
-        'trail': ['trail'],
-        'island': ['island'],
-        'lighthouse': ['lighthouse'],
-        'quarry': ['historic', 'industrial'],
-        'bridge': ['bridge'],
-        'village': ['historic'],
-        'church': ['historic'],
-        'hide': ['wildlife'],
-        'reserve': ['wildlife'],
-        'hill': ['hill'],
-        'mountain': ['mountain'],
-    }
-    
-    for keyword, tag_list in feature_tags.items():
-        if keyword in title_lower:
-            tags.extend(tag_list)
+    for keyword in WALK_MATCHER.labels(WALK_MATCHER.matches(title), 'title_features'):
+        tags.extend(TITLE_FEATURE_TAGS[keyword])
     
     # Region-based tags
     if 'skye' in region.lower():
@@ -128,12 +103,12 @@ def estimate_ascent(distance_km: float, difficulty: str) -> int:
     # Add some variation to make it more realistic
     return min(max(estimated_ascent, 10), 2000)  # Cap between 10m and 2000m
 
-def generate_enhanced_description(walk: Dict) -> str:
+def generate_enhanced_description(walk: ScrapedWalk) -> str:
     """Generate an enhanced description for the walk"""
-    title = walk['title']
-    region = walk['region']
-    difficulty = walk['difficulty']
-    distance = walk.get('distance_km', 0)
+    title = walk.title
+    region = walk.region
+    difficulty = walk.difficulty
+    distance = walk.distance_km
     
     # Base description
     base_desc = walk.get('description', f"A {difficulty.lower()} walk in {region}")
@@ -167,108 +142,167 @@ def generate_enhanced_description(walk: Dict) -> str:
     
     return "\n\n".join(enhanced_parts)
 
-def format_walks_for_database(input_file: str = "popular_scottish_walks.json", output_file: str = "formatted_walks.json") -> None:
-    """Format scraped walks for database insertion"""
+def load_grid_refs(details_file: str) -> Dict[str, str]:
+    """Start grid reference of each walk in a detailed or converted walks file, by source URL"""
+    grid_refs = {}
+    for record in read_records(details_file):
+        source_url = record.get('source_url') or record.get('sourceUrl')
+        grid_ref = record.get('start_grid_ref') or record.get('startGridRef')
+        if source_url and grid_ref:
+            grid_refs[source_url] = grid_ref
+    return grid_refs
+
+def format_walks_for_database(input_file: str = "popular_scottish_walks.json", output_file: str = "formatted_walks.json",
+                              search_index_file: Optional[str] = None, gpx_dir: Optional[str] = None,
+                              details_file: Optional[str] = None) -> None:
+    """Format scraped walks for database insertion, streaming one walk at a time.
+    Listings have no grid references, so coordinates come from details_file (detailed or converted
+    walks), matched by source URL; walks without a match get placeholder coordinates.
+    With search_index_file, also write the full-text search index over the formatted walks.
+    With gpx_dir, walks whose GPX route is in that local store get measured distance, ascent and elevation."""
     
-    with open(input_file, 'r', encoding='utf-8') as f:
-        scraped_walks = json.load(f)
+    # Ratings are spread over the whole file, so read its size and source URLs first;
+    # every matched grid reference is converted to latitude/longitude in a single batch
+    known_grid_refs = load_grid_refs(details_file) if details_file and os.path.exists(details_file) else {}
+    grid_refs = [known_grid_refs.get(walk.get('source_url')) for walk in read_records(input_file)]
+    total_walks = len(grid_refs)
+    latitudes, longitudes = grid_refs_to_wgs84(grid_refs)
+    placeholders = 0
     
-    formatted_walks = []
+    region_counts = {}
+    sample_walks = []
+    search_index = SearchIndexBuilder() if search_index_file else None
     
-    print(f"Processing {len(scraped_walks)} walks...")
+    print(f"Processing {total_walks} walks...")
     
-    for i, walk in enumerate(scraped_walks):
-        try:
-            # Basic info
-            title = walk.get('title', '').strip()
-            if not title:
-                print(f"Skipping walk {i} - no title")
-                continue
+    with RecordWriter(output_file) as writer:
+        for i, walk in enumerate(read_walks(input_file, ScrapedWalk)):
+            try:
+                # Basic info
+                title = (walk.title or '').strip()
+                if not title:
+                    print(f"Skipping walk {i} - no title")
+                    continue
             
-            region = walk.get('region', '').strip()
-            distance_km = walk.get('distance_km', 0) or 0
-            duration_minutes = walk.get('duration_minutes', 0) or 0
+                region = (walk.region or '').strip()
+                distance_km = walk.distance_km or 0
+                duration_minutes = walk.duration_minutes or 0
             
-            # Convert duration from minutes to hours
-            estimated_time = max(0.5, duration_minutes / 60) if duration_minutes > 0 else max(1.0, distance_km * 0.3)
+                # A GPX route in the local store gives the measured distance
+                route_path = gpx_path(gpx_dir, walk.source_url) if gpx_dir and walk.source_url else None
+                track = None
+                if route_path and os.path.exists(route_path):
+                    try:
+                        track = track_stats(route_path)
+                    except ET.ParseError as e:
+                        print(f"✗ Unreadable GPX route {route_path}: {e}")
+                if track:
+                    distance_km = track['distance_km']
             
-            # Difficulty mapping
-            difficulty_level = walk.get('difficulty_level', 1)
-            difficulty_desc = walk.get('difficulty', 'Easy')
-            difficulty = map_difficulty(difficulty_level, difficulty_desc)
+                # Convert duration from minutes to hours
+                estimated_time = max(0.5, duration_minutes / 60) if duration_minutes > 0 else max(1.0, distance_km * 0.3)
             
-            # Generate enhanced content
-            slug = create_slug(title)
-            region_slug = map_region_name(region)
-            route_type = extract_route_type(title, walk.get('description', ''))
-            tags = generate_tags(title, region, difficulty, distance_km)
-            enhanced_description = generate_enhanced_description(walk)
+                # Difficulty mapping
+                difficulty_level = walk.get('difficulty_level', 1)
+                difficulty_desc = walk.get('difficulty', 'Easy')
+                difficulty = map_difficulty(difficulty_level, difficulty_desc)
             
-            # Generate short description
-            short_description = enhanced_description.split('.')[0] + '.' if '.' in enhanced_description else enhanced_description[:100] + '...'
+                # Generate enhanced content
+                slug = create_slug(title)
+                region_slug = map_region_name(region)
+                route_type = extract_route_type(title, walk.description or '')
+                tags = generate_tags(title, region, difficulty, distance_km)
+                enhanced_description = generate_enhanced_description(walk)
             
-            # Estimate ascent and elevation
-            ascent = estimate_ascent(distance_km, difficulty)
-            max_elevation = min(ascent + 100, 1500)  # Rough elevation estimate
+                # Generate short description
+                short_description = enhanced_description.split('.')[0] + '.' if '.' in enhanced_description else enhanced_description[:100] + '...'
             
-            # Create formatted walk
-            formatted_walk = {
-                "title": title,
-                "slug": slug,
-                "description": enhanced_description,
-                "shortDescription": short_description,
-                "regionSlug": region_slug,  # Will be mapped to regionId during insertion
-                "distance": max(0.1, distance_km),  # Minimum 0.1km
-                "ascent": ascent,
-                "difficulty": difficulty,
-                "estimatedTime": round(estimated_time, 1),
-                "latitude": 57.0 + (i * 0.001),  # Placeholder coordinates - spread across Scotland
-                "longitude": -4.0 - (i * 0.001),
-                "maxElevation": max_elevation,
-                "routeType": route_type,
-                "featuredImageUrl": "https://images.unsplash.com/photo-1506905925346-21bda4d32df4?w=800&h=600&fit=crop",
-                "tags": tags,
-                "isPublished": True,
-                "publishedAt": f"Date.now() - {i * 3600000}",  # Spread over time
-                "viewCount": max(1, 50 - i),  # Decreasing view counts
-                "likeCount": max(0, 15 - (i // 5)),
-                "reportCount": max(0, 2 - (i // 20)),
-                "averageRating": round(4.0 + (0.5 * (1 - i / len(scraped_walks))), 1),
-                "sourceUrl": walk.get('source_url', ''),
-                "originalRegion": region
-            }
+                # Walks without a grid reference get placeholder coordinates spread across Scotland
+                if math.isnan(latitudes[i]):
+                    latitude, longitude = 57.0 + (i * 0.001), -4.0 - (i * 0.001)
+                    placeholders += 1
+                else:
+                    latitude, longitude = round(float(latitudes[i]), 6), round(float(longitudes[i]), 6)
             
-            formatted_walks.append(formatted_walk)
+                # Estimate ascent and elevation, unless the GPX route gives the real figures
+                ascent = estimate_ascent(distance_km, difficulty)
+                max_elevation = min(ascent + 100, 1500)  # Rough elevation estimate
+                if track and track['ascent_m'] is not None:
+                    ascent, max_elevation = track['ascent_m'], track['max_elevation_m']
             
-        except Exception as e:
-            print(f"Error processing walk {i} ({walk.get('title', 'Unknown')}): {e}")
-            continue
+                # Create formatted walk
+                formatted_walk = ConvertedWalk(
+                    title=title,
+                    slug=slug,
+                    description=enhanced_description,
+                    shortDescription=short_description,
+                    regionSlug=region_slug,  # Will be mapped to regionId during insertion
+                    distance=max(0.1, distance_km),  # Minimum 0.1km
+                    ascent=ascent,
+                    difficulty=difficulty,
+                    estimatedTime=round(estimated_time, 1),
+                    latitude=latitude,
+                    longitude=longitude,
+                    maxElevation=max_elevation,
+                    routeType=route_type,
+                    featuredImageUrl="https://images.unsplash.com/photo-1506905925346-21bda4d32df4?w=800&h=600&fit=crop",
+                    tags=tags,
+                    isPublished=True,
+                    publishedAt=f"Date.now() - {i * 3600000}",  # Spread over time
+                    viewCount=max(1, 50 - i),  # Decreasing view counts
+                    likeCount=max(0, 15 - (i // 5)),
+                    reportCount=max(0, 2 - (i // 20)),
+                    averageRating=round(4.0 + (0.5 * (1 - i / total_walks)), 1),
+                    sourceUrl=walk.source_url or '',
+                    originalRegion=region
+                )
+            
+                writer.write(formatted_walk)
+                if search_index:
+                    search_index.add(formatted_walk)
+                region_counts[region_slug] = region_counts.get(region_slug, 0) + 1
+                if len(sample_walks) < 3:
+                    sample_walks.append(formatted_walk)
+            
+            except Exception as e:
+                print(f"Error processing walk {i} ({walk.get('title', 'Unknown')}): {e}")
+                continue
     
-    print(f"Successfully formatted {len(formatted_walks)} walks")
+    print(f"Successfully formatted {writer.count} walks")
+    print(f"Coordinates from grid references: {writer.count - placeholders}, placeholders: {placeholders}")
     
-    # Group by region for summary
-    region_counts = {}
-    for walk in formatted_walks:
-        region = walk['regionSlug']
-        region_counts[region] = region_counts.get(region, 0) + 1
+    if search_index:
+        search_index.save(search_index_file)
     
     print("\nWalks by region:")
     for region, count in sorted(region_counts.items()):
         print(f"  {region}: {count} walks")
     
-    # Save formatted walks
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(formatted_walks, f, indent=2, ensure_ascii=False)
-    
     print(f"\nFormatted walks saved to {output_file}")
     
     # Show some examples
     print("\nSample formatted walks:")
-    for walk in formatted_walks[:3]:
-        print(f"- {walk['title']} ({walk['regionSlug']}) - {walk['difficulty']}, {walk['distance']}km, {walk['estimatedTime']}h")
-        print(f"  Tags: {', '.join(walk['tags'])}")
-        print(f"  Description: {walk['shortDescription']}")
+    for walk in sample_walks:
+        print(f"- {walk.title} ({walk.regionSlug}) - {walk.difficulty}, {walk.distance}km, {walk.estimatedTime}h")
+        print(f"  Tags: {', '.join(walk.tags)}")
+        print(f"  Description: {walk.shortDescription}")
         print()
 
+def main():
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Format scraped walks for database insertion")
+    parser.add_argument('input_file', nargs='?', default="popular_scottish_walks.json",
+                        help="Scraped walks (.json array or .jsonl)")
+    parser.add_argument('output_file', nargs='?', default="formatted_walks.json",
+                        help="Formatted walks; a .jsonl file is written one walk per line")
+    parser.add_argument('--search-index', metavar='PATH', help="Also write the full-text search index to this file")
+    parser.add_argument('--gpx-dir', metavar='DIR', help="Local GPX store (<region>/<walk>.gpx) to measure routes from")
+    parser.add_argument('--details', metavar='PATH', default="detailed_walks_all.json",
+                        help="Detailed or converted walks to take start grid references from, matched by source URL")
+    args = parser.parse_args()
+    
+    format_walks_for_database(args.input_file, args.output_file, args.search_index, args.gpx_dir, args.details)
+
 if __name__ == "__main__":
-    format_walks_for_database()
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -0,0 +1,117 @@
+"""
+Breadth-first crawl frontier for the WalkHighlands catalogue crawler.
+Normalises URLs before de-duplicating them, enforces depth and page budgets,
+and can track seen URLs in a Bloom filter when the frontier gets very large.
+"""
+
+import hashlib
+import math
+import re
+from collections import deque
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+DUPLICATE_SLASHES = re.compile(r'/{2,}')
+
+def normalize_url(url: str) -> str:
+    """Canonical form of a URL so the same page is only crawled once"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower() or 'https'
+    host = parts.hostname.lower() if parts.hostname else ''
+    if parts.port and not ((scheme == 'http' and parts.port == 80) or (scheme == 'https' and parts.port == 443)):
+        host = f"{host}:{parts.port}"
+
+    path = DUPLICATE_SLASHES.sub('/', parts.path) or '/'
+    if path.endswith('/index.shtml'):
+        path = path[:-len('index.shtml')]
+    # Directory pages are reachable with and without the trailing slash
+    if not path.endswith('/') and '.' not in path.rsplit('/', 1)[-1]:
+        path += '/'
+
+    # Fragments never change the page; query strings on this site are tracking only
+    return urlunsplit((scheme, host, path, '', ''))
+
+class BloomFilter:
+    def __init__(self, expected_items: int = 1_000_000, false_positive_rate: float = 0.001):
+        self.size = max(8, int(-expected_items * math.log(false_positive_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / expected_items * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def positions(self, item: str):
+        """Bit positions for an item, from two 64-bit hashes (Kirsch-Mitzenmacher)"""
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, item: str) -> bool:
+        """Add an item, returning False if it was (probably) already present"""
+        new = False
+        for position in self.positions(item):
+            byte, bit = divmod(position, 8)
+            if not self.bits[byte] & (1 << bit):
+                self.bits[byte] |= 1 << bit
+                new = True
+        if new:
+            self.count += 1
+        return new
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[p // 8] & (1 << (p % 8)) for p in self.positions(item))
+
+    def __len__(self) -> int:
+        return self.count
+
+class SeenSet:
+    """Exact seen-URL set with the same add() contract as BloomFilter"""
+
+    def __init__(self):
+        self.items = set()
+
+    def add(self, item: str) -> bool:
+        if item in self.items:
+            return False
+        self.items.add(item)
+        return True
+
+    def __contains__(self, item: str) -> bool:
+        return item in self.items
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+def make_seen_set(use_bloom: bool = False, expected_items: int = 1_000_000):
+    """Exact set by default; a Bloom filter trades a tiny false-positive rate for far less memory"""
+    return BloomFilter(expected_items) if use_bloom else SeenSet()
+
+class Frontier:
+    def __init__(self, max_pages: Optional[int] = None, max_depth: Optional[int] = None,
+                 use_bloom: bool = False, expected_urls: int = 1_000_000):
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.queue = deque()
+        self.seen = make_seen_set(use_bloom, expected_urls)
+        self.pages_popped = 0
+
+    def add(self, url: str, depth: int, context: Optional[Dict] = None) -> bool:
+        """Queue a URL unless it was seen before or is beyond the depth budget"""
+        if self.max_depth is not None and depth > self.max_depth:
+            return False
+        url = normalize_url(url)
+        if not self.seen.add(url):
+            return False
+        self.queue.append((url, depth, context or {}))
+        return True
+
+    def pop(self) -> Optional[Tuple[str, int, Dict]]:
+        """Next URL in breadth-first order, or None when empty or out of page budget"""
+        if not self.queue:
+            return None
+        if self.max_pages is not None and self.pages_popped >= self.max_pages:
+            return None
+        self.pages_popped += 1
+        return self.queue.popleft()
+
+    def __len__(self) -> int:
+        return len(self.queue)
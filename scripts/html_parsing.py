@@ -0,0 +1,34 @@
+"""
+HTML parser backends for the WalkHighlands scrapers.
+The extract_* methods work on BeautifulSoup trees, so every backend here is a
+BeautifulSoup tree builder; lxml is much faster than html.parser when installed.
+"""
+
+from typing import List
+
+from bs4 import BeautifulSoup, FeatureNotFound
+
+PARSER_BACKENDS = ['html.parser', 'lxml', 'html5lib']
+
+def available_backends() -> List[str]:
+    """Parser backends that can be used in this environment"""
+    backends = []
+    for backend in PARSER_BACKENDS:
+        try:
+            BeautifulSoup('<p></p>', backend)
+        except FeatureNotFound:
+            continue
+        backends.append(backend)
+    return backends
+
+def check_backend(backend: str) -> str:
+    """Validate a backend name, raising ValueError if it is unknown or not installed"""
+    if backend not in PARSER_BACKENDS:
+        raise ValueError(f"Unknown parser backend {backend!r}, choose from {', '.join(PARSER_BACKENDS)}")
+    if backend not in available_backends():
+        raise ValueError(f"Parser backend {backend!r} is not installed")
+    return backend
+
+def parse_html(content: bytes, backend: str = 'html.parser') -> BeautifulSoup:
+    """Parse a page body with the chosen backend"""
+    return BeautifulSoup(content, backend)
@@ -0,0 +1,176 @@
+"""
+Persistent HTTP response cache shared by the WalkHighlands scrapers.
+Stores page bodies on disk with their ETag/Last-Modified validators and
+revalidates them with conditional requests, so unchanged pages come back as 304s.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+import requests
+
+class HttpCache:
+    def __init__(self, cache_dir: str = ".http_cache", ttl_seconds: float = 30 * 24 * 3600,
+                 max_bytes: int = 500 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds  # entries not validated within this window are dropped
+        self.max_bytes = max_bytes      # least recently used entries are evicted above this size
+        self.lock = threading.Lock()
+        self.index: Dict[str, Dict] = {}
+        self.total_bytes = 0
+        self.stats = {'revalidated': 0, 'downloaded': 0, 'bytes_downloaded': 0, 'evicted': 0}
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self.load_index()
+
+    def key_for(self, url: str) -> str:
+        """Stable file key for a URL"""
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def body_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.html")
+
+    def meta_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def load_index(self):
+        """Rebuild the in-memory index from the metadata files on disk"""
+        for filename in os.listdir(self.cache_dir):
+            if not filename.endswith('.json'):
+                continue
+            key = filename[:-5]
+            try:
+                with open(self.meta_path(key), 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if not os.path.exists(self.body_path(key)):
+                continue
+            self.index[key] = meta
+            self.total_bytes += meta.get('size', 0)
+
+        with self.lock:
+            self.expire()
+            self.evict_to_size()
+
+    def remove(self, key: str):
+        """Drop an entry from the index and disk (caller holds the lock)"""
+        meta = self.index.pop(key, None)
+        if meta:
+            self.total_bytes -= meta.get('size', 0)
+        for path in (self.body_path(key), self.meta_path(key)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def expire(self):
+        """Remove entries older than the TTL (caller holds the lock)"""
+        cutoff = time.time() - self.ttl_seconds
+        for key in [k for k, meta in self.index.items() if meta.get('validated_at', 0) < cutoff]:
+            self.remove(key)
+            self.stats['evicted'] += 1
+
+    def evict_to_size(self):
+        """Evict least recently used entries until under the size limit (caller holds the lock)"""
+        if self.total_bytes <= self.max_bytes:
+            return
+        for key in sorted(self.index, key=lambda k: self.index[k].get('last_used', 0)):
+            if self.total_bytes <= self.max_bytes * 0.9:
+                break
+            self.remove(key)
+            self.stats['evicted'] += 1
+
+    def write_meta(self, key: str, meta: Dict):
+        with open(self.meta_path(key), 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+
+    def lookup(self, url: str) -> Optional[Dict]:
+        """Return the cache metadata for a URL if it is present and within the TTL"""
+        key = self.key_for(url)
+        with self.lock:
+            meta = self.index.get(key)
+            if meta and meta.get('validated_at', 0) < time.time() - self.ttl_seconds:
+                self.remove(key)
+                self.stats['evicted'] += 1
+                return None
+            return meta
+
+    def read_body(self, url: str) -> Optional[bytes]:
+        """Read a cached body from disk"""
+        try:
+            with open(self.body_path(self.key_for(url)), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def store(self, url: str, content: bytes, etag: Optional[str], last_modified: Optional[str]):
+        """Save a freshly downloaded response"""
+        key = self.key_for(url)
+        now = time.time()
+        meta = {
+            'url': url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'size': len(content),
+            'stored_at': now,
+            'validated_at': now,
+            'last_used': now
+        }
+        with self.lock:
+            self.remove(key)
+            with open(self.body_path(key), 'wb') as f:
+                f.write(content)
+            self.write_meta(key, meta)
+            self.index[key] = meta
+            self.total_bytes += meta['size']
+            self.evict_to_size()
+
+    def mark_revalidated(self, url: str):
+        """Record a 304 for a cached entry"""
+        key = self.key_for(url)
+        with self.lock:
+            meta = self.index.get(key)
+            if meta:
+                meta['validated_at'] = meta['last_used'] = time.time()
+                self.write_meta(key, meta)
+
+    def fetch(self, session: requests.Session, url: str, timeout: float = 15) -> bytes:
+        """GET a URL, revalidating any cached copy. Raises requests exceptions like session.get"""
+        headers = {}
+        meta = self.lookup(url)
+        if meta:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        response = session.get(url, timeout=timeout, headers=headers)
+
+        if response.status_code == 304 and meta:
+            content = self.read_body(url)
+            if content is not None:
+                self.mark_revalidated(url)
+                with self.lock:
+                    self.stats['revalidated'] += 1
+                return content
+            # Body went missing from disk, fetch it again unconditionally
+            response = session.get(url, timeout=timeout)
+
+        response.raise_for_status()
+        content = response.content
+        self.store(url, content, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        with self.lock:
+            self.stats['downloaded'] += 1
+            self.stats['bytes_downloaded'] += len(content)
+        return content
+
+    def summary(self) -> str:
+        """One-line description of cache activity for end-of-run output"""
+        return (f"Cache: {self.stats['revalidated']} revalidated (304), "
+                f"{self.stats['downloaded']} downloaded ({self.stats['bytes_downloaded'] / 1024:.0f} KB), "
+                f"{self.stats['evicted']} evicted, {len(self.index)} entries on disk")
@@ -0,0 +1,136 @@
+"""
+Record/replay archive of WalkHighlands responses.
+RecordingSession saves every response it fetches into a compressed zip archive;
+ReplaySession serves them back offline with optional simulated latency and
+errors, so the scrapers can be benchmarked and regression-tested deterministically.
+Like a requests session, it runs response hooks, so metrics count replayed responses.
+"""
+
+import hashlib
+import json
+import random
+import threading
+import time
+import zipfile
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+import requests
+from requests.hooks import default_hooks, dispatch_hook
+from requests.structures import CaseInsensitiveDict
+
+# Response headers worth keeping for replay (validators and pacing hints)
+KEPT_HEADERS = ['Content-Type', 'ETag', 'Last-Modified', 'Retry-After']
+
+def archive_key(url: str) -> str:
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+class PageArchive:
+    def __init__(self, path: str, mode: str = 'r'):
+        """Open an archive for replay ('r') or recording ('a')"""
+        self.path = path
+        self.lock = threading.Lock()
+        self.zip = zipfile.ZipFile(path, mode, compression=zipfile.ZIP_DEFLATED, compresslevel=6)
+        self.entries: Dict[str, Dict] = {}
+
+        for name in self.zip.namelist():
+            if name.endswith('.json'):
+                meta = json.loads(self.zip.read(name))
+                self.entries[meta['url']] = meta
+
+    def urls(self) -> List[str]:
+        return list(self.entries)
+
+    def add(self, url: str, status_code: int, headers: Dict[str, str], content: bytes):
+        """Store a response; the first recording of a URL wins"""
+        with self.lock:
+            if url in self.entries:
+                return
+            key = archive_key(url)
+            meta = {'url': url, 'status_code': status_code, 'headers': headers, 'recorded_at': time.time()}
+            self.zip.writestr(f"{key}.html", content)
+            self.zip.writestr(f"{key}.json", json.dumps(meta))
+            self.entries[url] = meta
+
+    def get(self, url: str) -> Optional[Dict]:
+        """Archived metadata and body for a URL, or None if it was never recorded"""
+        meta = self.entries.get(url)
+        if meta is None:
+            return None
+        with self.lock:
+            content = self.zip.read(f"{archive_key(url)}.html")
+        return dict(meta, content=content)
+
+    def close(self):
+        self.zip.close()
+
+def build_response(url: str, status_code: int, headers: Dict[str, str], content: bytes) -> requests.Response:
+    """A requests.Response that behaves like one received from the network"""
+    response = requests.Response()
+    response.url = url
+    response.status_code = status_code
+    response.headers = CaseInsensitiveDict(headers)
+    response._content = content
+    response.encoding = 'utf-8'
+    return response
+
+class RecordingSession:
+    """Wraps a requests session and archives every full response it receives"""
+
+    def __init__(self, session: requests.Session, archive: PageArchive):
+        self.session = session
+        self.archive = archive
+        self.headers = session.headers
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        response = self.session.get(url, **kwargs)
+        if response.status_code != 304:
+            headers = {name: response.headers[name] for name in KEPT_HEADERS if name in response.headers}
+            self.archive.add(url, response.status_code, headers, response.content)
+        return response
+
+class ReplaySession:
+    """Serves archived responses in place of a requests session"""
+
+    def __init__(self, archive: PageArchive, latency: float = 0.0, latency_jitter: float = 0.0,
+                 error_rate: float = 0.0, seed: Optional[int] = None):
+        self.archive = archive
+        self.latency = latency                # seconds added to every request
+        self.latency_jitter = latency_jitter  # +/- uniform variation on the latency
+        self.error_rate = error_rate          # fraction of requests that fail
+        self.random = random.Random(seed)
+        self.random_lock = threading.Lock()
+        self.headers = CaseInsensitiveDict()
+        self.hooks = default_hooks()  # as on requests.Session, e.g. ScrapeMetrics.instrument
+        self.requests_served = 0
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None, timeout: Optional[float] = None,
+            **kwargs) -> requests.Response:
+        with self.random_lock:
+            delay = max(0.0, self.latency + self.random.uniform(-self.latency_jitter, self.latency_jitter))
+            roll = self.random.random()
+            self.requests_served += 1
+        if delay:
+            time.sleep(delay)
+
+        # Simulated failures alternate between dropped connections and overloaded-server responses
+        if roll < self.error_rate / 2:
+            raise requests.ConnectionError(f"Simulated connection error for {url}")
+        if roll < self.error_rate:
+            response = build_response(url, 503, {'Retry-After': '1'}, b'')
+        else:
+            response = self.archived_response(url, headers)
+        response.elapsed = timedelta(seconds=delay)
+        return dispatch_hook('response', self.hooks, response)
+
+    def archived_response(self, url: str, headers: Optional[Dict[str, str]] = None) -> requests.Response:
+        entry = self.archive.get(url)
+        if entry is None:
+            return build_response(url, 404, {}, b'')
+
+        # Honour conditional requests so the HTTP cache behaves as it would live
+        request_headers = CaseInsensitiveDict(headers or {})
+        etag = entry['headers'].get('ETag')
+        if etag and request_headers.get('If-None-Match') == etag:
+            return build_response(url, 304, entry['headers'], b'')
+        return build_response(url, entry['status_code'], entry['headers'], entry['content'])
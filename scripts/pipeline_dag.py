@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+"""
+Memoised DAG runner for the scrape → detail → dedupe → convert → format pipeline,
+and the spatial and search indexes built from the converted walks.
+Each stage declares the files it reads and writes. Its cache key hashes the input
+file contents, the stage's config and the source of the scripts it runs, and a
+stage is skipped while its recorded outputs still match that key. Stages whose
+inputs are ready run in parallel worker processes, one branch per region.
+
+Usage: python pipeline_dag.py [targets...] [--regions skye torridon] [--workers 4] [--force 'scrape:*'] [--dry-run]
+"""
+
+import ast
+import fnmatch
+import hashlib
+import inspect
+import json
+import os
+import sys
+import textwrap
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from record_io import RecordWriter, read_records
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+class Stage:
+    def __init__(self, name: str, func: Callable, inputs: List[str], outputs: List[str],
+                 config: Optional[Dict] = None, options: Optional[Dict] = None):
+        self.name = name
+        self.func = func              # module-level, so it can run in a worker process
+        self.inputs = inputs
+        self.outputs = outputs
+        self.config = config or {}    # part of the cache key
+        self.options = options or {}  # passed to func but not hashed: rates, cache and archive paths
+
+def run_stage(stage: Stage) -> float:
+    """Run one stage (in a worker process), returning its duration"""
+    start = time.perf_counter()
+    stage.func(stage.inputs, stage.outputs, **stage.config, **stage.options)
+    missing = [path for path in stage.outputs if not os.path.exists(path)]
+    if missing:
+        raise RuntimeError(f"{stage.name} did not write {', '.join(missing)}")
+    return time.perf_counter() - start
+
+def imported_scripts(tree: ast.AST, top_level_only: bool = False) -> List[str]:
+    """Script files in this directory imported by a parsed module or function"""
+    nodes = ast.iter_child_nodes(tree) if top_level_only else ast.walk(tree)
+    names = set()
+    for node in nodes:
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module)
+    paths = [os.path.join(SCRIPTS_DIR, f"{name}.py") for name in names]
+    return sorted(path for path in paths if os.path.exists(path))
+
+def parse_file(path: str) -> ast.AST:
+    with open(path, 'r', encoding='utf-8') as f:
+        return ast.parse(f.read(), path)
+
+def code_files(func: Callable) -> List[str]:
+    """Scripts a stage function runs: those its module imports at the top and those it imports
+    itself, then everything they import in turn"""
+    module_file = os.path.abspath(sys.modules[func.__module__].__file__)
+    files = set(imported_scripts(parse_file(module_file), top_level_only=True))
+    files.update(imported_scripts(ast.parse(textwrap.dedent(inspect.getsource(func)))))
+    pending = list(files)
+    while pending:
+        for path in imported_scripts(parse_file(pending.pop())):
+            if path not in files:
+                files.add(path)
+                pending.append(path)
+    return sorted(files)
+
+class StageManifest:
+    """Cache keys and output hashes of the stages that have run, plus a file hash cache"""
+
+    def __init__(self, path: str = ".pipeline_manifest.json"):
+        self.path = path
+        self.stages: Dict[str, Dict] = {}
+        self.files: Dict[str, Dict] = {}  # path -> size, mtime and sha256, so unchanged files are not re-read
+
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.stages = data.get('stages', {})
+            self.files = data.get('files', {})
+
+    def file_digest(self, path: str) -> Optional[str]:
+        """sha256 of a file's contents, or None if it does not exist"""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        entry = self.files.get(path)
+        if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            return entry['sha256']
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        self.files[path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest.hexdigest()}
+        return digest.hexdigest()
+
+    def stage_key(self, stage: Stage) -> str:
+        """Hash of everything a stage's outputs depend on"""
+        material = {
+            'name': stage.name,
+            'config': stage.config,
+            'inputs': {path: self.file_digest(path) for path in stage.inputs},
+            'function': hashlib.sha256(inspect.getsource(stage.func).encode('utf-8')).hexdigest(),
+            'code': {os.path.basename(path): self.file_digest(path) for path in code_files(stage.func)}
+        }
+        return hashlib.sha256(json.dumps(material, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def is_fresh(self, stage: Stage, key: str) -> bool:
+        """True if the stage last ran with this key and its outputs are untouched since"""
+        entry = self.stages.get(stage.name)
+        if not entry or entry['key'] != key:
+            return False
+        return all(self.file_digest(path) == entry['outputs'].get(path) for path in stage.outputs)
+
+    def record(self, stage: Stage, key: str, seconds: float):
+        self.stages[stage.name] = {
+            'key': key,
+            'outputs': {path: self.file_digest(path) for path in stage.outputs},
+            'finished_at': time.time(),
+            'seconds': round(seconds, 3)
+        }
+
+    def save(self):
+        """Write the manifest atomically so an interrupted run never leaves it half-written"""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'stages': self.stages, 'files': self.files}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+class PipelineRunner:
+    def __init__(self, stages: List[Stage], manifest: Optional[StageManifest] = None, workers: int = 4):
+        self.stages = {stage.name: stage for stage in stages}
+        self.manifest = manifest or StageManifest()
+        self.workers = max(1, workers)
+
+        # Edges come from files: a stage depends on whichever stage writes one of its inputs
+        producers = {}
+        for stage in stages:
+            for path in stage.outputs:
+                if path in producers:
+                    raise ValueError(f"{path} is written by both {producers[path]} and {stage.name}")
+                producers[path] = stage.name
+        self.dependencies = {
+            stage.name: {producers[path] for path in stage.inputs if path in producers} for stage in stages
+        }
+        self.dependants: Dict[str, Set[str]] = {name: set() for name in self.stages}
+        for name, dependencies in self.dependencies.items():
+            for dependency in dependencies:
+                self.dependants[dependency].add(name)
+        self.order = self.topological_order()
+
+    def topological_order(self) -> List[str]:
+        remaining = {name: len(dependencies) for name, dependencies in self.dependencies.items()}
+        ready = [name for name in self.stages if not remaining[name]]
+        order = []
+        while ready:
+            name = ready.pop(0)
+            order.append(name)
+            for dependant in sorted(self.dependants[name]):
+                remaining[dependant] -= 1
+                if not remaining[dependant]:
+                    ready.append(dependant)
+        if len(order) < len(self.stages):
+            raise ValueError(f"Stages form a cycle: {', '.join(sorted(set(self.stages) - set(order)))}")
+        return order
+
+    def select(self, targets: Optional[Iterable[str]] = None) -> Set[str]:
+        """Stages matching the target patterns and everything upstream of them"""
+        if not targets:
+            return set(self.stages)
+        selected = set()
+        pending = [name for name in self.stages if any(fnmatch.fnmatch(name, target) for target in targets)]
+        while pending:
+            name = pending.pop()
+            if name not in selected:
+                selected.add(name)
+                pending.extend(self.dependencies[name])
+        return selected
+
+    def run(self, targets: Optional[Iterable[str]] = None, force: Iterable[str] = (), dry_run: bool = False) -> Dict:
+        """Run every stale stage once its inputs are ready, skipping stages that are up to date"""
+        force = list(force)
+        selected = self.select(targets)
+        waiting = {name: set(self.dependencies[name]) for name in selected}
+        result = {'ran': [], 'skipped': [], 'failed': [], 'blocked': []}
+        stale_upstream: Set[str] = set()  # for dry runs: stages that would have rerun
+        start = time.perf_counter()
+
+        def finish(name: str, outcome: str):
+            result[outcome].append(name)
+            for dependant in self.dependants[name]:
+                if dependant in waiting:
+                    waiting[dependant].discard(name)
+            if outcome in ('failed', 'blocked'):
+                for dependant in self.dependants[name]:
+                    if dependant in waiting:
+                        del waiting[dependant]
+                        print(f"  - Blocked {dependant} (upstream {name} did not finish)")
+                        finish(dependant, 'blocked')
+
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            running = {}
+            while waiting or running:
+                ready = [name for name in self.order if name in waiting and not waiting[name]]
+                if not ready and not running:
+                    break
+                for name in ready:
+                    del waiting[name]
+                    stage = self.stages[name]
+                    missing = [path for path in stage.inputs if not os.path.exists(path)
+                               and not (dry_run and self.dependencies[name] & stale_upstream)]
+                    if missing:
+                        print(f"  ✗ {name}: missing input {', '.join(missing)}")
+                        finish(name, 'failed')
+                        continue
+
+                    forced = any(fnmatch.fnmatch(name, pattern) for pattern in force)
+                    if dry_run:
+                        stale = forced or self.dependencies[name] & stale_upstream \
+                            or not self.manifest.is_fresh(stage, self.manifest.stage_key(stage))
+                        print(f"  {'→ Would run' if stale else '- Up to date'}: {name}")
+                        if stale:
+                            stale_upstream.add(name)
+                        finish(name, 'ran' if stale else 'skipped')
+                        continue
+
+                    key = self.manifest.stage_key(stage)
+                    if not forced and self.manifest.is_fresh(stage, key):
+                        print(f"  - Skipped {name} (up to date)")
+                        finish(name, 'skipped')
+                        continue
+
+                    for path in stage.outputs:
+                        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+                    print(f"  → Running {name}")
+                    running[executor.submit(run_stage, stage)] = (name, key)
+
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, key = running.pop(future)
+                    try:
+                        seconds = future.result()
+                    except Exception as e:
+                        print(f"  ✗ {name} failed: {e}")
+                        finish(name, 'failed')
+                        continue
+                    self.manifest.record(self.stages[name], key, seconds)
+                    self.manifest.save()
+                    print(f"  ✓ {name} ({seconds:.1f}s)")
+                    finish(name, 'ran')
+
+        if not dry_run:
+            self.manifest.save()
+        result['seconds'] = time.perf_counter() - start
+        return result
+
+# Stage functions take their input and output paths, then their config and options
+
+def scrape_region_stage(inputs: List[str], outputs: List[str], region: str, limit: int,
+                        rate: float = 0.5, max_rate: Optional[float] = None, cache_dir: str = '.http_cache',
+                        replay: Optional[str] = None):
+    """Listing of one region's most approachable walks"""
+    from http_cache import HttpCache
+    from page_archive import PageArchive, ReplaySession
+    from scrape_walkhighlands import WalkHighlandsScraper
+
+    scraper = WalkHighlandsScraper(cache=None if replay else HttpCache(cache_dir), requests_per_second=rate,
+                                   max_rate=max_rate)
+    if replay:
+        scraper.session = scraper.metrics.instrument(ReplaySession(PageArchive(replay)))
+    walks = scraper.scrape_region(region, limit)
+    scraper.save_walks_json([w for w in walks if w.title and w.region], outputs[0])
+
+def detail_stage(inputs: List[str], outputs: List[str], rate: float = 0.4, max_rate: Optional[float] = None,
+                 concurrency: int = 4, cache_dir: str = '.http_cache', replay: Optional[str] = None,
+                 collect_gpx: bool = False, gpx_dir: Optional[str] = None):
+    """Detailed records for every walk in a listing, with their GPX routes measured when collect_gpx is set"""
+    from detailed_walk_scraper import DetailedWalkScraper
+    from http_cache import HttpCache
+    from page_archive import PageArchive, ReplaySession
+
+    scraper = DetailedWalkScraper(concurrency=concurrency, requests_per_second=rate, max_rate=max_rate,
+                                  cache=None if replay else HttpCache(cache_dir),
+                                  gpx_dir=gpx_dir, collect_gpx=collect_gpx)
+    if replay:
+        scraper.session = scraper.metrics.instrument(ReplaySession(PageArchive(replay)))
+    with RecordWriter(outputs[0]) as writer:
+        for walk in scraper.stream_walks(scraper.load_walk_urls(inputs[0])):
+            writer.write(walk)
+
+def convert_stage(inputs: List[str], outputs: List[str]):
+    from convert_detailed_walks import DetailedWalkConverter
+    DetailedWalkConverter().convert_walks_file(inputs[0], outputs[0])
+
+def dedupe_stage(inputs: List[str], outputs: List[str], threshold: float = 0.6):
+    from walk_dedupe import WalkDeduplicator, dedupe_walks_file
+    dedupe_walks_file(inputs[0], outputs[0], outputs[1], WalkDeduplicator(threshold=threshold))
+
+def format_stage(inputs: List[str], outputs: List[str]):
+    """Listing walks formatted for the database, located by the grid references of their detailed records"""
+    from format_walks_for_db import format_walks_for_database
+    format_walks_for_database(inputs[0], outputs[0], details_file=inputs[1])
+
+def spatial_index_stage(inputs: List[str], outputs: List[str], neighbours: int = 5, geohash_precision: int = 7):
+    """Geohash cells and nearest neighbours of the converted walks"""
+    from spatial_index import build_spatial_index
+    build_spatial_index(inputs[0], outputs[0], neighbours, geohash_precision)
+
+def search_index_stage(inputs: List[str], outputs: List[str]):
+    """Full-text search index over the converted walks"""
+    from search_index import build_search_index
+    build_search_index(inputs[0], outputs[0])
+
+def routes_stage(inputs: List[str], outputs: List[str], gpx_dir: str = 'gpx'):
+    """Converted walks with zoom-banded route polylines from the GPX store"""
+    from route_polyline import add_route_polylines, print_route_stats
+    print_route_stats(add_route_polylines(inputs[0], outputs[0], gpx_dir))
+
+def elevation_stage(inputs: List[str], outputs: List[str], dem_dir: str = 'dem', gpx_dir: Optional[str] = None):
+    """Converted walks with ascent, maximum elevation and profiles from the local DEM tiles"""
+    from dem_elevation import add_elevations, print_elevation_stats
+    print_elevation_stats(add_elevations(inputs[0], outputs[0], dem_dir, gpx_dir))
+
+def columns_stage(inputs: List[str], outputs: List[str]):
+    """Columnar export of the converted catalogue"""
+    from walk_columns import export_columns
+    from walk_records import ConvertedWalk, read_walks
+    export_columns(read_walks(inputs[0], ConvertedWalk), os.path.dirname(outputs[0]))
+
+def merge_stage(inputs: List[str], outputs: List[str]):
+    """Concatenate record files in input order"""
+    with RecordWriter(outputs[0]) as writer:
+        for path in inputs:
+            for record in read_records(path):
+                writer.write(record)
+    print(f"Merged {writer.count} records from {len(inputs)} files into {outputs[0]}")
+
+def build_walk_pipeline(regions: List[str], work_dir: str = 'pipeline', limit_per_region: int = 15,
+                        rate: float = 0.5, workers: int = 4, cache_dir: str = '.http_cache',
+                        replay: Optional[str] = None, gpx_dir: Optional[str] = None,
+                        dem_dir: Optional[str] = None, max_rate: Optional[float] = None) -> List[Stage]:
+    """Per-region scrape → detail branches, merged into the usual pipeline files, then deduplicated and converted,
+    with spatial and search indexes over the converted walks.
+    With gpx_dir, walk routes are collected into that store and encoded as map polylines after conversion.
+    With dem_dir, ascent and elevation of the converted walks are taken from the DEM tiles there."""
+    from walk_columns import COLUMN_FILES
+
+    # Region branches run side by side, so they share the per-host request budget; each branch's
+    # adaptive rate is capped at its share of max_rate (by default the total rate) so together
+    # they never exceed it
+    branches = max(1, min(workers, len(regions)))
+    network = {'rate': rate / branches, 'max_rate': (max_rate or rate) / branches,
+               'cache_dir': cache_dir, 'replay': replay}
+    routes = {'collect_gpx': True} if gpx_dir else {}
+
+    def path(kind: str, region: str) -> str:
+        return os.path.join(work_dir, kind, f"{region}.json")
+
+    stages = []
+    for region in regions:
+        stages += [
+            Stage(f"scrape:{region}", scrape_region_stage, [], [path('listings', region)],
+                  config={'region': region, 'limit': limit_per_region}, options=network),
+            Stage(f"detail:{region}", detail_stage, [path('listings', region)], [path('detailed', region)],
+                  config=routes, options=dict(network, gpx_dir=gpx_dir)),
+        ]
+    stages += [
+        Stage('listings', merge_stage, [path('listings', r) for r in regions], ['popular_scottish_walks.json']),
+        Stage('detailed', merge_stage, [path('detailed', r) for r in regions], ['detailed_walks_all.json']),
+        # Walks listed under several regions are merged before anything is converted
+        Stage('dedupe', dedupe_stage, ['detailed_walks_all.json'], ['detailed_walks_unique.json', 'walk_merges.jsonl']),
+        Stage('convert', convert_stage, ['detailed_walks_unique.json'], ['converted_priority_walks.json']),
+        Stage('format', format_stage, ['popular_scottish_walks.json', 'detailed_walks_all.json'], ['formatted_walks.json']),
+        Stage('columns', columns_stage, ['converted_priority_walks.json'],
+              [os.path.join('walk_columns', name) for name in COLUMN_FILES]),
+        Stage('spatial_index', spatial_index_stage, ['converted_priority_walks.json'], ['walks_spatial_index.json'],
+              config={'neighbours': 5, 'geohash_precision': 7}),
+        Stage('search_index', search_index_stage, ['converted_priority_walks.json'], ['walks_search_index.json']),
+    ]
+    # The GPX store and DEM tiles are not hashed: after updating them outside the pipeline,
+    # rerun with --force elevation or --force routes
+    converted = 'converted_priority_walks.json'
+    if dem_dir:
+        stages.append(Stage('elevation', elevation_stage, [converted], ['converted_walks_elevation.json'],
+                            options={'dem_dir': dem_dir, 'gpx_dir': gpx_dir}))
+        converted = 'converted_walks_elevation.json'
+    if gpx_dir:
+        stages.append(Stage('routes', routes_stage, [converted], ['converted_walks_routes.json'],
+                            options={'gpx_dir': gpx_dir}))
+    return stages
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the walk pipeline, skipping stages that are up to date")
+    parser.add_argument('targets', nargs='*', help="Stages to bring up to date, with their upstream (default: all)")
+    parser.add_argument('--regions', nargs='+', help="Regions to scrape (default: the scraper's priority regions)")
+    parser.add_argument('--limit', type=int, default=15, help="Walks per region")
+    parser.add_argument('--workers', type=int, default=4, help="Stages run at once")
+    parser.add_argument('--rate', type=float, default=0.5, help="Requests per second per host, shared by all branches")
+    parser.add_argument('--max-rate', type=float,
+                        help="Ceiling the adaptive rate may climb to, shared by all branches (default: --rate)")
+    parser.add_argument('--work-dir', default='pipeline', help="Directory for per-region intermediate files")
+    parser.add_argument('--manifest', default='.pipeline_manifest.json', help="Where stage keys are recorded")
+    parser.add_argument('--cache-dir', default='.http_cache', help="Directory for the on-disk HTTP cache")
+    parser.add_argument('--replay', metavar='ARCHIVE', help="Serve pages from this archive instead of the live site")
+    parser.add_argument('--gpx-dir', metavar='DIR', help="Collect GPX routes into this store and encode map polylines")
+    parser.add_argument('--dem-dir', metavar='DIR', help="Take ascent and elevation from the SRTM .hgt tiles here")
+    parser.add_argument('--force', nargs='+', default=[], metavar='PATTERN',
+                        help="Rerun matching stages even if up to date, e.g. 'scrape:*' to re-scrape listings")
+    parser.add_argument('--dry-run', action='store_true', help="Show which stages would run")
+    parser.add_argument('--list', action='store_true', help="List the stages and their files")
+    args = parser.parse_args()
+
+    regions = args.regions
+    if not regions:
+        from scrape_walkhighlands import WalkHighlandsScraper
+        regions = WalkHighlandsScraper().priority_regions
+
+    stages = build_walk_pipeline(regions, work_dir=args.work_dir, limit_per_region=args.limit, rate=args.rate,
+                                 workers=args.workers, cache_dir=args.cache_dir, replay=args.replay,
+                                 gpx_dir=args.gpx_dir, dem_dir=args.dem_dir, max_rate=args.max_rate)
+    runner = PipelineRunner(stages, StageManifest(args.manifest), workers=args.workers)
+
+    if args.list:
+        for name in runner.order:
+            stage = runner.stages[name]
+            print(f"{name}: {', '.join(stage.inputs) or '(web)'} → {', '.join(stage.outputs)}")
+        return
+
+    print(f"Pipeline of {len(stages)} stages over {len(regions)} regions, {args.workers} workers"
+          + (" (dry run)" if args.dry_run else ""))
+    result = runner.run(args.targets, force=args.force, dry_run=args.dry_run)
+
+    print(f"\nPipeline finished in {result['seconds']:.1f}s")
+    print(f"✓ {'Would run' if args.dry_run else 'Ran'}: {len(result['ran'])} stages")
+    print(f"- Up to date: {len(result['skipped'])} stages")
+    if result['failed'] or result['blocked']:
+        print(f"✗ Failed: {', '.join(result['failed'])}; blocked: {len(result['blocked'])} stages")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+"""
+Request pacing shared by the WalkHighlands scrapers.
+Each host gets a token bucket so concurrent fetchers stay within a request budget.
+The adaptive limiter moves that budget with the server's health: it grows while
+responses are fast and healthy, and shrinks multiplicatively on 429/5xx or rising
+latency. It also honours Retry-After, retries transient failures with jittered
+exponential backoff, and pauses a host behind a circuit breaker when most recent
+requests fail.
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Optional, Tuple, TypeVar
+from urllib.parse import urlparse
+
+import requests
+
+T = TypeVar('T')
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float = 1.0):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate                    # tokens added per second
+        self.capacity = max(1.0, capacity)  # maximum burst size
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take one token, sleeping until it is available. Returns seconds waited"""
+        with self.lock:
+            now = time.monotonic()
+            self.refill(now)
+
+            # Reserve the token up front so waiting callers are served in arrival order
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def set_rate(self, rate: float):
+        with self.lock:
+            self.refill(time.monotonic())
+            # Time already owed by reserved tokens stays the same at the new rate
+            if self.tokens < 0:
+                self.tokens *= rate / self.rate
+            self.rate = rate
+
+    def pause(self, seconds: float):
+        """Hold back the next request for at least this long, later ones following at the usual rate"""
+        with self.lock:
+            self.refill(time.monotonic())
+            self.tokens = min(self.tokens, 1.0 - seconds * self.rate)
+
+class HostRateLimiter:
+    def __init__(self, requests_per_second: float = 0.4, burst: int = 2):
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.lock = threading.Lock()
+
+    def bucket_for(self, url: str) -> TokenBucket:
+        """Get (or create) the token bucket for the host of a URL"""
+        host = urlparse(url).netloc.lower()
+        with self.lock:
+            bucket = self.buckets.get(host)
+            if bucket is None:
+                bucket = TokenBucket(self.requests_per_second, self.burst)
+                self.buckets[host] = bucket
+            return bucket
+
+    def acquire(self, url: str) -> float:
+        """Wait until a request to this URL's host fits in the rate budget"""
+        return self.bucket_for(url).acquire()
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header, given as seconds or as an HTTP date"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        # Dates with a -0000 zone parse without one; HTTP dates are always UTC
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, retry_at.timestamp() - time.time())
+
+def is_retryable(status: Optional[int]) -> bool:
+    """Failures worth retrying: no response at all, throttling, and server errors"""
+    return status is None or status == 429 or status >= 500
+
+class CircuitBreaker:
+    """Opens when too many of a host's recent requests failed. While open, callers wait out a
+    cooldown; then a single probe request is let through, which closes the circuit if it
+    succeeds or reopens it with twice the cooldown if it fails. The probe is identified by the
+    token wait() hands its caller, so outcomes of requests started earlier cannot settle it."""
+
+    def __init__(self, window: int = 20, min_requests: int = 5, failure_rate: float = 0.5,
+                 cooldown: float = 30.0, max_cooldown: float = 600.0):
+        self.outcomes = deque(maxlen=window)  # True for each recent success
+        self.min_requests = min_requests
+        self.failure_rate = failure_rate
+        self.base_cooldown = cooldown
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.open_until: Optional[float] = None
+        self.probe: Optional[int] = None  # token of the probe in flight
+        self.probes = 0
+        self.trips = 0
+        self.condition = threading.Condition()
+
+    def wait(self) -> Tuple[float, Optional[int]]:
+        """Block while the circuit is open or a probe is in flight. Returns seconds waited, and
+        the probe token when the caller's request is to be the probe"""
+        start = time.monotonic()
+        probe = None
+        with self.condition:
+            while self.open_until is not None:
+                now = time.monotonic()
+                if now < self.open_until:
+                    self.condition.wait(self.open_until - now)
+                elif self.probe is None:
+                    self.probes += 1
+                    self.probe = probe = self.probes
+                    break
+                else:
+                    self.condition.wait()
+        return time.monotonic() - start, probe
+
+    def release(self, probe: Optional[int]):
+        """Give up a probe without an outcome, letting another request probe instead"""
+        with self.condition:
+            if probe is not None and probe == self.probe:
+                self.probe = None
+                self.condition.notify_all()
+
+    def record(self, success: bool, probe: Optional[int] = None) -> bool:
+        """Count a request's outcome, passing the token from wait() if it was the probe.
+        Returns True if this opened the circuit"""
+        with self.condition:
+            if probe is not None and probe == self.probe:
+                self.probe = None
+                if success:
+                    self.open_until = None
+                    self.cooldown = self.base_cooldown
+                else:
+                    self.cooldown = min(self.max_cooldown, self.cooldown * 2)
+                    self.open_until = time.monotonic() + self.cooldown
+                self.condition.notify_all()
+                return False
+            if self.open_until is not None:
+                # Requests already in flight when the circuit opened, even if they finish while the probe is out
+                return False
+
+            self.outcomes.append(success)
+            failures = self.outcomes.count(False)
+            if len(self.outcomes) < self.min_requests or failures < self.failure_rate * len(self.outcomes):
+                return False
+            self.open_until = time.monotonic() + self.cooldown
+            self.outcomes.clear()
+            self.trips += 1
+            return True
+
+class HostState:
+    """Adaptive budget, latency tracking and circuit breaker of one host"""
+
+    def __init__(self, bucket: TokenBucket, breaker: CircuitBreaker):
+        self.bucket = bucket
+        self.breaker = breaker
+        self.lock = threading.Lock()
+        self.latency: Optional[float] = None  # moving average of response time
+        self.baseline: Optional[float] = None # the host's healthy latency, following the average's lows
+        self.last_decrease = float('-inf')
+        self.adjusted_at = time.monotonic()
+        self.decreases = 0
+
+class AdaptiveRateLimiter(HostRateLimiter):
+    """Per-host request budget between min_rate and max_rate, adjusted by additive increase and
+    multiplicative decrease as responses come back. fetch() wraps a request with the budget,
+    the circuit breaker and retries."""
+
+    def __init__(self, requests_per_second: float = 0.4, burst: int = 2, min_rate: Optional[float] = None,
+                 max_rate: Optional[float] = None, increase: Optional[float] = None, decrease: float = 0.5,
+                 error_decrease: float = 0.8, latency_factor: float = 2.0, decrease_interval: float = 2.0,
+                 max_attempts: int = 4, backoff: float = 1.0, max_backoff: float = 60.0):
+        super().__init__(requests_per_second, burst)
+        self.min_rate = min_rate or requests_per_second / 8
+        self.max_rate = max_rate or requests_per_second * 4
+        self.increase = increase or requests_per_second / 4   # added per second of healthy responses
+        self.decrease = decrease                              # rate multiplier when the server throttles us
+        self.error_decrease = error_decrease                  # rate multiplier on server errors and slow responses
+        self.latency_factor = latency_factor                  # latency above baseline counted as trouble
+        self.decrease_interval = decrease_interval            # at most one decrease per interval
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.hosts: Dict[str, HostState] = {}
+
+    def host_state(self, url: str) -> HostState:
+        host = urlparse(url).netloc.lower()
+        bucket = self.bucket_for(url)
+        with self.lock:
+            state = self.hosts.get(host)
+            if state is None:
+                state = self.hosts[host] = HostState(bucket, CircuitBreaker())
+            return state
+
+    def acquire(self, url: str) -> Tuple[float, Optional[int]]:
+        """Wait for the host's circuit breaker and request budget. Returns seconds waited, and the
+        breaker's probe token when this request is the probe"""
+        state = self.host_state(url)
+        waited, probe = state.breaker.wait()
+        return waited + state.bucket.acquire(), probe
+
+    def slow_down(self, state: HostState, now: float, factor: float):
+        if now - state.last_decrease < self.decrease_interval:
+            return
+        state.last_decrease = state.adjusted_at = now
+        state.decreases += 1
+        state.bucket.set_rate(max(self.min_rate, state.bucket.rate * factor))
+
+    def speed_up(self, state: HostState, now: float):
+        # The rate grows with time rather than per response, so it climbs no faster when already high
+        elapsed = min(now - state.adjusted_at, self.decrease_interval)
+        state.adjusted_at = now
+        state.bucket.set_rate(min(self.max_rate, state.bucket.rate + self.increase * elapsed))
+
+    def record(self, url: str, status: Optional[int], seconds: float, retry_after: Optional[float] = None,
+               probe: Optional[int] = None):
+        """Adjust the host's budget for one response (status None when no response arrived)"""
+        state = self.host_state(url)
+        failed = is_retryable(status)
+        # Other 4xx answers such as 403 and 404 mean the host is up and answering, so they count
+        # as successes for the circuit breaker; they do not raise the rate, though
+        if state.breaker.record(not failed, probe):
+            print(f"  ✗ Circuit open for {urlparse(url).netloc}: pausing requests for {state.breaker.cooldown:.0f}s")
+
+        now = time.monotonic()
+        with state.lock:
+            if retry_after:
+                state.bucket.pause(retry_after)
+            if status == 429 or retry_after:
+                self.slow_down(state, now, self.decrease)
+                return
+            if failed:
+                self.slow_down(state, now, self.error_decrease)
+                return
+            state.latency = seconds if state.latency is None else 0.8 * state.latency + 0.2 * seconds
+            if state.baseline is None or state.latency < state.baseline:
+                state.baseline = state.latency
+            else:
+                # Drifts up slowly, so one unusually fast response does not make every later one look slow
+                state.baseline += 0.01 * (state.latency - state.baseline)
+            if state.latency > self.latency_factor * state.baseline:
+                self.slow_down(state, now, self.error_decrease)
+            elif status < 400:
+                self.speed_up(state, now)
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Full-jitter exponential backoff before retry number attempt"""
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1)))
+
+    def fetch(self, url: str, fetch: Callable[[], T], metrics=None) -> T:
+        """Call fetch() for url within the host's budget, retrying throttled, failed and timed-out
+        requests. Raises the last requests exception once max_attempts are used up."""
+        for attempt in range(1, self.max_attempts + 1):
+            waited, probe = self.acquire(url)
+            if metrics:
+                metrics.observe('rate_limit_wait_seconds', waited)
+            start = time.perf_counter()
+            try:
+                result = fetch()
+            except requests.RequestException as e:
+                response = getattr(e, 'response', None)
+                status = response.status_code if response is not None else None
+                retry_after = parse_retry_after(response.headers.get('Retry-After')) if response is not None else None
+                self.record(url, status, time.perf_counter() - start, retry_after, probe)
+                if attempt == self.max_attempts or not is_retryable(status):
+                    raise
+                if metrics:
+                    metrics.count('request_retries_total', reason=str(status) if status else type(e).__name__)
+                time.sleep(self.backoff_delay(attempt))
+            except Exception:
+                # Not a network error (a full disk, say), so it says nothing about the host's health
+                self.host_state(url).breaker.release(probe)
+                raise
+            else:
+                self.record(url, 200, time.perf_counter() - start, probe=probe)
+                return result
+
+    def summary(self) -> str:
+        """One-line description of each host's budget for end-of-run output"""
+        return '; '.join(
+            f"{host} {state.bucket.rate:.2f} req/s (from {self.requests_per_second:g}), "
+            f"{state.decreases} slowdowns, {state.breaker.trips} circuit trips"
+            for host, state in sorted(self.hosts.items())
+        ) or 'no requests'
@@ -0,0 +1,104 @@
+"""
+Streaming reads and writes of walk record files.
+Files ending in .jsonl hold one JSON record per line and are appended to and
+flushed record by record, so a crash keeps everything written so far and a
+downstream stage can follow the file while the upstream stage is still running.
+Any other file is a JSON array, written incrementally in the usual indented layout.
+"""
+
+import json
+import os
+import time
+from typing import Dict, Iterator
+
+def is_jsonl(path: str) -> bool:
+    return path.endswith('.jsonl')
+
+def writing_marker(path: str) -> str:
+    """Sibling file that exists while a RecordWriter has the file open"""
+    return f"{path}.writing"
+
+def read_records(path: str, follow: bool = False, poll_interval: float = 1.0) -> Iterator[Dict]:
+    """Yield records one at a time from a .jsonl or JSON array file.
+
+    With follow=True a .jsonl file is tailed until its writer closes it, so
+    records can be processed while the upstream stage is still producing them.
+    """
+    if not is_jsonl(path):
+        if follow:
+            raise ValueError(f"Only .jsonl files can be followed, not {path}")
+        with open(path, 'r', encoding='utf-8') as f:
+            yield from json.load(f)
+        return
+
+    # A follower may start before the upstream stage has created the file
+    while follow and not os.path.exists(path):
+        time.sleep(poll_interval)
+
+    with open(path, 'r', encoding='utf-8') as f:
+        partial = ''
+        while True:
+            line = f.readline()
+            if line.endswith('\n'):
+                line, partial = partial + line, ''
+                if line.strip():
+                    yield json.loads(line)
+                continue
+
+            # End of file, possibly with half a record still being written
+            partial += line
+            if follow and os.path.exists(writing_marker(path)):
+                time.sleep(poll_interval)
+                continue
+            # The writer has finished; pick up anything written since the last read
+            partial += f.read()
+            break
+
+    for line in partial.splitlines():
+        if line.strip():
+            yield json.loads(line)
+
+def count_records(path: str) -> int:
+    """Number of records in a file, without keeping them in memory"""
+    return sum(1 for _ in read_records(path))
+
+class RecordWriter:
+    """Writes records one at a time to a .jsonl or JSON array file"""
+
+    def __init__(self, path: str, append: bool = False):
+        self.path = path
+        self.jsonl = is_jsonl(path)
+        self.count = 0
+        if append and not self.jsonl:
+            raise ValueError(f"Only .jsonl files can be appended to, not {path}")
+
+        if self.jsonl:
+            open(writing_marker(path), 'w').close()
+        self.file = open(path, 'a' if append else 'w', encoding='utf-8')
+
+    def write(self, record: Dict):
+        """Write a record, either a dict or a walk record with to_dict()"""
+        if hasattr(record, 'to_dict'):
+            record = record.to_dict()
+        if self.jsonl:
+            self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            # Flushed per record so followers see it and a crash cannot lose it
+            self.file.flush()
+        else:
+            # Same layout as json.dump(records, f, indent=2), one element at a time
+            body = json.dumps(record, indent=2, ensure_ascii=False).replace('\n', '\n  ')
+            self.file.write(('[\n  ' if self.count == 0 else ',\n  ') + body)
+        self.count += 1
+
+    def close(self):
+        if not self.jsonl:
+            self.file.write('\n]' if self.count else '[]')
+        self.file.close()
+        if os.path.exists(writing_marker(self.path)):
+            os.remove(writing_marker(self.path))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
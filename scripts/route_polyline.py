@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Lightweight map geometry for converted walks.
+Each walk's GPX route is simplified once per zoom band with Douglas-Peucker, at a
+tolerance of about a pixel at the band's most detailed zoom, then quantised to
+1e-5 degrees and written as encoded polylines (Google's format) on the walk.
+
+Usage: python route_polyline.py converted_priority_walks.json converted_walks_routes.json --gpx-dir gpx
+"""
+
+import json
+import math
+import os
+import time
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from gpx_track import EARTH_RADIUS_KM, gpx_path, track_segments
+from record_io import RecordWriter
+from walk_records import ConvertedWalk, read_walks
+
+# Band name → the most detailed zoom level it is drawn at; the map picks the first band covering its zoom
+ZOOM_BANDS = {'z9': 9, 'z12': 12, 'z15': 15}
+
+# Ground metres per 256-pixel web map tile pixel at the equator at zoom 0
+EQUATOR_METRES_PER_PIXEL = 156543.03392
+PIXEL_TOLERANCE = 1.0
+
+POLYLINE_PRECISION = 5
+
+def zoom_tolerance(zoom: int, latitude: float) -> float:
+    """Simplification tolerance in metres for a zoom level at a latitude"""
+    return PIXEL_TOLERANCE * EQUATOR_METRES_PER_PIXEL * math.cos(math.radians(latitude)) / 2 ** zoom
+
+def project(points: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Latitude/longitude points as local x/y metres (equirectangular about the mean latitude)"""
+    latitudes = np.radians(points[:, 0])
+    longitudes = np.radians(points[:, 1])
+    metres = EARTH_RADIUS_KM * 1000
+    return longitudes * math.cos(latitudes.mean()) * metres, latitudes * metres
+
+def douglas_peucker(x: np.ndarray, y: np.ndarray, tolerance: float) -> np.ndarray:
+    """Indices of the points kept by Douglas-Peucker simplification. Spans are split a level at a
+    time: the distances of every open span's points to its chord are measured in one pass."""
+    count = len(x)
+    if count < 3:
+        return np.arange(count)
+    keep = np.zeros(count, dtype=bool)
+    keep[0] = keep[-1] = True
+    starts, ends = np.array([0]), np.array([count - 1])
+    while len(starts):
+        lengths = ends - starts - 1
+        has_points = lengths > 0
+        starts, ends, lengths = starts[has_points], ends[has_points], lengths[has_points]
+        if not len(starts):
+            break
+
+        # Span of each interior point, and the point's index
+        span = np.repeat(np.arange(len(starts)), lengths)
+        offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        points = np.arange(len(span)) - offsets[span] + starts[span] + 1
+
+        chord_x, chord_y = (x[ends] - x[starts])[span], (y[ends] - y[starts])[span]
+        offset_x, offset_y = x[points] - x[starts][span], y[points] - y[starts][span]
+        chord = np.hypot(chord_x, chord_y)
+        # A span that returns to its start point measures from that point
+        distances = np.where(chord > 0, np.abs(chord_x * offset_y - chord_y * offset_x) / np.where(chord > 0, chord, 1),
+                             np.hypot(offset_x, offset_y))
+
+        # The first farthest point of each span splits it, if it lies beyond the tolerance
+        farthest = np.maximum.reduceat(distances, offsets)
+        candidates = np.flatnonzero(distances == farthest[span])
+        _, first = np.unique(span[candidates], return_index=True)
+        split = farthest > tolerance
+        splits = points[candidates[first]][split]
+        keep[splits] = True
+        starts, ends = np.concatenate((starts[split], splits)), np.concatenate((splits, ends[split]))
+    return np.flatnonzero(keep)
+
+def quantise(points: np.ndarray, precision: int = POLYLINE_PRECISION) -> np.ndarray:
+    """Points as integer multiples of 10**-precision degrees, without consecutive repeats"""
+    quantised = np.round(points * 10 ** precision).astype(np.int64)
+    moved = np.ones(len(quantised), dtype=bool)
+    moved[1:] = np.any(quantised[1:] != quantised[:-1], axis=1)
+    return quantised[moved]
+
+# Shifts of the (up to seven) 5-bit chunks of a 64-bit zigzag value
+CHUNK_SHIFTS = np.arange(0, 35, 5, dtype=np.uint64)
+
+def encode_polyline(quantised: np.ndarray) -> str:
+    """Encoded polyline of quantised latitude/longitude pairs. Every delta is zigzag-encoded and
+    split into 5-bit chunks for all values at once."""
+    if not len(quantised):
+        return ''
+    deltas = np.diff(quantised, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+    values = np.where(deltas < 0, ~(deltas << 1), deltas << 1).astype(np.uint64)
+    chunks = (values[:, None] >> CHUNK_SHIFTS) & np.uint64(31)
+    lengths = 1 + np.count_nonzero((values[:, None] >> CHUNK_SHIFTS[1:]) > 0, axis=1)
+    position = np.arange(len(CHUNK_SHIFTS))
+    # Every chunk but a value's last carries the continuation bit
+    chunks |= np.where(position < (lengths - 1)[:, None], np.uint64(0x20), np.uint64(0))
+    return (chunks[position < lengths[:, None]] + np.uint64(63)).astype(np.uint8).tobytes().decode('ascii')
+
+def polyline_points(line: str) -> int:
+    """Points in an encoded polyline: each has two values, and only a value's last character is below 95"""
+    return int(np.count_nonzero(np.frombuffer(line.encode('ascii'), dtype=np.uint8) < 95)) // 2
+
+def route_polylines(segments: List[np.ndarray], bands: Optional[Dict[str, int]] = None) -> Dict[str, List[str]]:
+    """Encoded polylines of a route's segments for each zoom band"""
+    bands = bands or ZOOM_BANDS
+    polylines = {name: [] for name in bands}
+    for segment in segments:
+        x, y = project(segment)
+        latitude = float(segment[:, 0].mean())
+        kept = np.arange(len(segment))
+        # Most detailed band first; each coarser band simplifies the previous band's points
+        for name, zoom in sorted(bands.items(), key=lambda band: -band[1]):
+            kept = kept[douglas_peucker(x[kept], y[kept], zoom_tolerance(zoom, latitude))]
+            polylines[name].append(encode_polyline(quantise(segment[kept])))
+    return polylines
+
+def raw_payload_bytes(segments: List[np.ndarray]) -> int:
+    """Size of the route as JSON [latitude, longitude] pairs at GPX precision, for comparison"""
+    return sum(len(json.dumps(np.round(segment, 6).tolist())) for segment in segments)
+
+def add_route_polylines(input_file: str, output_file: str, gpx_dir: str,
+                        bands: Optional[Dict[str, int]] = None) -> Dict:
+    """Write the converted walks with encoded polylines for those whose route is in the GPX store.
+    Returns compression and timing statistics."""
+    bands = bands or ZOOM_BANDS
+    stats = {'walks': 0, 'routes': 0, 'points': 0, 'raw_bytes': 0,
+             'band_points': {name: 0 for name in bands}, 'band_bytes': {name: 0 for name in bands},
+             'parse_seconds': 0.0, 'simplify_seconds': 0.0}
+
+    with RecordWriter(output_file) as writer:
+        for walk in read_walks(input_file, ConvertedWalk):
+            stats['walks'] += 1
+            route_path = gpx_path(gpx_dir, walk.sourceUrl) if walk.sourceUrl else None
+            if route_path and os.path.exists(route_path):
+                start = time.perf_counter()
+                try:
+                    segments = track_segments(route_path)
+                except ET.ParseError as e:
+                    print(f"✗ Unreadable GPX route {route_path}: {e}")
+                    segments = []
+                parsed = time.perf_counter()
+                if segments:
+                    walk.routePolylines = route_polylines(segments, bands)
+                    stats['simplify_seconds'] += time.perf_counter() - parsed
+                    stats['routes'] += 1
+                    stats['points'] += sum(len(segment) for segment in segments)
+                    stats['raw_bytes'] += raw_payload_bytes(segments)
+                    for name, lines in walk.routePolylines.items():
+                        stats['band_bytes'][name] += sum(len(line) for line in lines)
+                        stats['band_points'][name] += sum(polyline_points(line) for line in lines)
+                stats['parse_seconds'] += parsed - start
+            writer.write(walk)
+    return stats
+
+def print_route_stats(stats: Dict):
+    print(f"\n✓ Encoded routes for {stats['routes']} of {stats['walks']} walks ({stats['points']} points)")
+    if not stats['routes']:
+        return
+    print(f"- Raw coordinates: {stats['raw_bytes'] / 1024:.0f} KB")
+    for name, size in stats['band_bytes'].items():
+        ratio = stats['raw_bytes'] / size if size else 0
+        print(f"- {name}: {stats['band_points'][name]} points, {size / 1024:.1f} KB, {ratio:.0f}x smaller")
+    per_thousand = 1000 / stats['routes']
+    print(f"- Per thousand routes: {stats['parse_seconds'] * per_thousand:.1f}s reading GPX, "
+          f"{stats['simplify_seconds'] * per_thousand:.1f}s simplifying and encoding")
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Add zoom-banded encoded route polylines to converted walks")
+    parser.add_argument('input_file', nargs='?', default='converted_priority_walks.json',
+                        help="Converted walks (.json array or .jsonl)")
+    parser.add_argument('output_file', nargs='?', default='converted_walks_routes.json',
+                        help="Converted walks with routePolylines")
+    parser.add_argument('--gpx-dir', metavar='DIR', default='gpx', help="Local GPX store (<region>/<walk>.gpx)")
+    args = parser.parse_args()
+
+    print_route_stats(add_route_polylines(args.input_file, args.output_file, args.gpx_dir))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Low-overhead instrumentation for the WalkHighlands scrapers.
+Records request, download, parse and extract latency histograms, bytes transferred,
+status and error counts, retries and pages per second, and exports them as a
+Prometheus textfile (for node_exporter's textfile collector) and a JSON summary.
+"""
+
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+# Upper bounds in seconds, from sub-millisecond extracts to slow page loads
+DEFAULT_BUCKETS = [0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0]
+
+METRIC_HELP = {
+    'fetch_seconds': ('histogram', "Time to get a page body, including cache revalidation"),
+    'rate_limit_wait_seconds': ('histogram', "Time spent waiting for the per-host request budget"),
+    'response_seconds': ('histogram', "Time from sending a request until its response headers arrived"),
+    'download_seconds': ('histogram', "Time spent reading response bodies"),
+    'parse_seconds': ('histogram', "Time to parse a page into a tree"),
+    'extract_seconds': ('histogram', "Time spent in each extractor"),
+    'responses_total': ('counter', "HTTP responses by status code"),
+    'response_bytes_total': ('counter', "Response body bytes received over the network"),
+    'errors_total': ('counter', "Failed fetches by exception type"),
+    'retries_total': ('counter', "URLs attempted again after an earlier failure"),
+    'request_retries_total': ('counter', "Requests retried after throttling, a server error or no response"),
+    'pages_total': ('counter', "Pages scraped by outcome"),
+}
+
+class Histogram:
+    def __init__(self, buckets: List[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bucket bound below which a fraction q of observations fall (None past the last bucket)"""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return None
+
+class ScrapeMetrics:
+    def __init__(self, prefix: str = 'walkscraper', buckets: Optional[List[float]] = None,
+                 interval: float = 10.0, textfile: Optional[str] = None, export_every: float = 15.0):
+        self.prefix = prefix
+        self.buckets = buckets or DEFAULT_BUCKETS
+        self.interval = interval          # seconds per throughput bucket in the summary
+        self.textfile = textfile          # Prometheus textfile rewritten during the run
+        self.export_every = export_every
+        self.lock = threading.Lock()
+        self.histograms: Dict[Tuple, Histogram] = {}
+        self.counters: Dict[Tuple, float] = {}
+        self.page_buckets: Dict[int, int] = {}
+        self.started = time.time()
+        self.start = time.perf_counter()
+        self.last_export = self.start
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def count(self, name: str, amount: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def timed(self, name: str, func, *args, **labels):
+        """Call func(*args), observing its duration"""
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def page_done(self, outcome: str = 'success'):
+        """Count a finished page towards throughput, exporting the textfile when it is due"""
+        now = time.perf_counter()
+        self.count('pages_total', outcome=outcome)
+        with self.lock:
+            bucket = int((now - self.start) // self.interval)
+            self.page_buckets[bucket] = self.page_buckets.get(bucket, 0) + 1
+            due = self.textfile and now - self.last_export >= self.export_every
+            if due:
+                self.last_export = now
+        if due:
+            self.write_prometheus(self.textfile)
+
+    def response_hook(self, response, *args, **kwargs):
+        """requests response hook: status, headers latency and body download time of every request"""
+        self.observe('response_seconds', response.elapsed.total_seconds())
+        start = time.perf_counter()
+        body = response.content  # read here so the download is timed; requests keeps it for the caller
+        self.observe('download_seconds', time.perf_counter() - start)
+        self.count('responses_total', code=str(response.status_code))
+        self.count('response_bytes_total', len(body or b''))
+        return response
+
+    def instrument(self, session):
+        """Attach the response hook to a requests session"""
+        session.hooks.setdefault('response', []).append(self.response_hook)
+        return session
+
+    def pages_per_second(self) -> float:
+        elapsed = time.perf_counter() - self.start
+        with self.lock:
+            pages = sum(self.page_buckets.values())
+        return pages / elapsed if elapsed > 0 else 0.0
+
+    def summary(self) -> Dict:
+        """End-of-run summary: counters, histogram percentiles and throughput over time"""
+        with self.lock:
+            histograms = {}
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                key = name + ''.join(f"[{value}]" for _, value in labels)
+                histograms[key] = {
+                    'count': histogram.count,
+                    'sum': round(histogram.sum, 6),
+                    'mean': round(histogram.sum / histogram.count, 6) if histogram.count else None,
+                    'p50': histogram.quantile(0.5),
+                    'p90': histogram.quantile(0.9),
+                    'p99': histogram.quantile(0.99)
+                }
+            counters = {
+                name + ''.join(f"[{value}]" for _, value in labels): value
+                for (name, labels), value in sorted(self.counters.items())
+            }
+            last_bucket = max(self.page_buckets, default=-1)
+            throughput = [self.page_buckets.get(i, 0) / self.interval for i in range(last_bucket + 1)]
+        return {
+            'started_at': self.started,
+            'elapsed_seconds': round(time.perf_counter() - self.start, 3),
+            'pages_per_second': round(self.pages_per_second(), 3),
+            'throughput_interval_seconds': self.interval,
+            'pages_per_second_by_interval': throughput,
+            'counters': counters,
+            'histograms': histograms
+        }
+
+    def prometheus_text(self) -> str:
+        """Every metric in the Prometheus text exposition format"""
+        def label_text(labels, extra: str = '') -> str:
+            parts = [f'{key}="{value}"' for key, value in labels] + ([extra] if extra else [])
+            return '{' + ','.join(parts) + '}' if parts else ''
+
+        with self.lock:
+            series: Dict[str, List[str]] = {}
+            for (name, labels), value in sorted(self.counters.items()):
+                series.setdefault(name, []).append(f"{self.prefix}_{name}{label_text(labels)} {value}")
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                lines = series.setdefault(name, [])
+                cumulative = 0
+                for bound, count in zip(self.buckets + [float('inf')], histogram.counts):
+                    cumulative += count
+                    le = 'le="+Inf"' if bound == float('inf') else f'le="{bound:g}"'
+                    lines.append(f"{self.prefix}_{name}_bucket{label_text(labels, le)} {cumulative}")
+                lines.append(f"{self.prefix}_{name}_sum{label_text(labels)} {histogram.sum:.6f}")
+                lines.append(f"{self.prefix}_{name}_count{label_text(labels)} {histogram.count}")
+
+        output = []
+        for name, lines in series.items():
+            kind, help_text = METRIC_HELP.get(name, ('untyped', name))
+            output.append(f"# HELP {self.prefix}_{name} {help_text}")
+            output.append(f"# TYPE {self.prefix}_{name} {kind}")
+            output.extend(lines)
+        output.append(f"# HELP {self.prefix}_pages_per_second Pages scraped per second since the run started")
+        output.append(f"# TYPE {self.prefix}_pages_per_second gauge")
+        output.append(f"{self.prefix}_pages_per_second {self.pages_per_second():.6f}")
+        return '\n'.join(output) + '\n'
+
+    def write_prometheus(self, path: str):
+        """Write the textfile atomically, as the textfile collector may read it at any time"""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+
+    def write_json(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def report(self) -> str:
+        """One-line summary for the end of a run"""
+        summary = self.summary()
+        fetch = summary['histograms'].get('fetch_seconds', {})
+        parse = summary['histograms'].get('parse_seconds', {})
+        received = sum(v for k, v in summary['counters'].items() if k.startswith('response_bytes_total'))
+        return (f"Metrics: {summary['pages_per_second']:.2f} pages/sec, "
+                f"fetch p50 {fetch.get('p50')}s p90 {fetch.get('p90')}s, "
+                f"parse mean {parse.get('mean')}s, {received / 1024:.0f} KB received")
@@ -6,20 +6,37 @@ Focuses on high-priority regions for Phase 1 launch.
 
 import requests
 from bs4 import BeautifulSoup
-import json
-import time
 import re
+import time
 from urllib.parse import urljoin, urlparse
-from typing import List, Dict, Optional
+from typing import Iterable, List, Dict, Optional
+
+from frontier import Frontier, make_seen_set, normalize_url
+from html_parsing import check_backend, parse_html
+from http_cache import HttpCache
+from page_archive import PageArchive, RecordingSession, ReplaySession
+from politeness import AdaptiveRateLimiter
+from record_io import RecordWriter
+from scrape_metrics import ScrapeMetrics
+from walk_records import ScrapedWalk
 
 class WalkHighlandsScraper:
-    def __init__(self):
+    def __init__(self, cache: Optional[HttpCache] = None, parser_backend: str = 'html.parser',
+                 requests_per_second: float = 0.5, burst: int = 1, metrics: Optional[ScrapeMetrics] = None,
+                 max_rate: Optional[float] = None):
         self.base_url = "https://www.walkhighlands.co.uk"
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
         
+        # Optional on-disk cache; unchanged pages are revalidated with conditional requests
+        self.cache = cache
+        self.parser_backend = check_backend(parser_backend)
+        self.rate_limiter = AdaptiveRateLimiter(requests_per_second, burst, max_rate=max_rate)
+        self.metrics = metrics or ScrapeMetrics()
+        self.metrics.instrument(self.session)
+        
         # Priority regions for Phase 1 (most popular/tourism hotspots)
         self.priority_regions = [
             'skye',           # Most popular Scottish island
@@ -32,15 +49,31 @@ class WalkHighlandsScraper:
             'perthshire',     # Southern Highlands
         ]
         
-    def get_page(self, url: str) -> Optional[BeautifulSoup]:
-        """Fetch and parse a webpage with error handling"""
-        try:
+    def download(self, url: str) -> bytes:
+        """One attempt at a page body, raising requests exceptions on failure"""
+        start = time.perf_counter()
+        if self.cache:
+            content = self.cache.fetch(self.session, url, timeout=10)
+        else:
             response = self.session.get(url, timeout=10)
             response.raise_for_status()
-            return BeautifulSoup(response.content, 'html.parser')
+            content = response.content
+        self.metrics.observe('fetch_seconds', time.perf_counter() - start)
+        return content
+            
+    def get_page(self, url: str) -> Optional[BeautifulSoup]:
+        """Fetch and parse a webpage, retrying transient failures"""
+        try:
+            content = self.rate_limiter.fetch(url, lambda: self.download(url), self.metrics)
         except requests.RequestException as e:
+            self.metrics.count('errors_total', type=type(e).__name__)
+            self.metrics.page_done('error')
             print(f"Error fetching {url}: {e}")
             return None
+        with self.metrics.timer('parse_seconds'):
+            soup = parse_html(content, self.parser_backend)
+        self.metrics.page_done('success')
+        return soup
             
     def extract_difficulty(self, difficulty_cell) -> Dict[str, any]:
         """Extract difficulty rating from boot icons"""
@@ -96,10 +129,33 @@ class WalkHighlandsScraper:
             return float(distance_match.group(1))
         return None
         
-    def get_region_walks(self, region: str) -> List[Dict]:
+    def get_region_walks(self, region: str) -> List[ScrapedWalk]:
         """Get all walks from a specific region"""
         walks = []
         
+        region_soup = self.get_region_page(region)
+        if not region_soup:
+            print(f"Could not access region page for {region}")
+            return walks
+            
+        # Look for sub-region links (like skye/cuillin.shtml)
+        subregion_links = self.find_subregion_links(region_soup, region)
+                
+        # If no subregion links found, try to parse walks directly from region page
+        if not subregion_links:
+            walks.extend(self.parse_walks_from_page(region_soup, region))
+        else:
+            # Parse walks from each subregion
+            for subregion_url in subregion_links[:5]:  # Limit to avoid overloading
+                print(f"Parsing subregion: {subregion_url}")
+                subregion_soup = self.get_page(subregion_url)
+                if subregion_soup:
+                    walks.extend(self.parse_walks_from_page(subregion_soup, region))
+                
+        return walks
+        
+    def get_region_page(self, region: str) -> Optional[BeautifulSoup]:
+        """Fetch a region's landing page, trying the URL patterns the site uses"""
         # Try different possible URL patterns for region pages
         possible_urls = [
             f"{self.base_url}/{region}",
@@ -107,40 +163,97 @@ class WalkHighlandsScraper:
             f"{self.base_url}/{region}/index.shtml"
         ]
         
-        region_soup = None
         for url in possible_urls:
             region_soup = self.get_page(url)
             if region_soup:
                 print(f"Successfully accessed {region} at {url}")
-                break
+                return region_soup
                 
-        if not region_soup:
-            print(f"Could not access region page for {region}")
-            return walks
-            
-        # Look for sub-region links (like skye/cuillin.shtml)
+        return None
+        
+    def find_subregion_links(self, soup: BeautifulSoup, region: str) -> List[str]:
+        """Relative .shtml links on a region page, which lead to its subregions"""
         subregion_links = []
-        for link in region_soup.find_all('a', href=True):
+        for link in soup.find_all('a', href=True):
             href = link['href']
             if href.endswith('.shtml') and '/' not in href.lstrip('./'):
                 full_url = urljoin(f"{self.base_url}/{region}/", href)
                 subregion_links.append(full_url)
+        return subregion_links
+        
+    def is_region_page(self, region: str) -> bool:
+        """Whether a directory's landing page lists walks, as region pages do and pages such as /forum/ do not"""
+        soup = self.get_page(f"{self.base_url}/{region}/")
+        return bool(soup and self.parse_walks_from_page(soup, region))
+        
+    def discover_regions(self) -> List[str]:
+        """Priority regions, plus other region directories linked from the home page whose landing page lists walks"""
+        regions = list(self.priority_regions)
+        soup = self.get_page(f"{self.base_url}/")
+        if not soup:
+            return regions
+            
+        site = urlparse(self.base_url)
+        candidates = []
+        for link in soup.find_all('a', href=True):
+            parsed = urlparse(urljoin(f"{self.base_url}/", link['href']))
+            if parsed.netloc != site.netloc or not parsed.path.startswith(site.path):
+                continue
+            segments = [segment for segment in parsed.path[len(site.path):].split('/') if segment]
+            # Region landing pages are single directories such as /skye/, but so are /forum/ and /about/
+            if len(segments) == 1 and '.' not in segments[0]:
+                directory = segments[0].lower()
+                if directory not in regions and directory not in candidates:
+                    candidates.append(directory)
+                    
+        for directory in candidates:
+            if self.is_region_page(directory):
+                regions.append(directory)
+            else:
+                print(f"Skipping /{directory}/: not a region page")
+        return regions
+        
+    def crawl_catalogue(self, max_pages: int = 5000, max_depth: int = 3, use_bloom: bool = False) -> List[ScrapedWalk]:
+        """Breadth-first crawl of every region and subregion page, collecting each walk once"""
+        frontier = Frontier(max_pages=max_pages, max_depth=max_depth, use_bloom=use_bloom)
+        seen_walks = make_seen_set(use_bloom)
+        walks = []
+        
+        regions = self.discover_regions()
+        print(f"Crawling {len(regions)} regions (page budget {max_pages}, depth {max_depth})")
+        for region in regions:
+            frontier.add(f"{self.base_url}/{region}/", 0, {'region': region})
+            
+        while True:
+            item = frontier.pop()
+            if item is None:
+                break
+            url, depth, context = item
+            region = context['region']
+            
+            print(f"[{frontier.pages_popped}] depth {depth}, {len(frontier)} queued: {url}")
+            soup = self.get_page(url)
+            if not soup:
+                continue
                 
-        # If no subregion links found, try to parse walks directly from region page
-        if not subregion_links:
-            walks.extend(self.parse_walks_from_page(region_soup, region))
-        else:
-            # Parse walks from each subregion
-            for subregion_url in subregion_links[:5]:  # Limit to avoid overloading
-                print(f"Parsing subregion: {subregion_url}")
-                subregion_soup = self.get_page(subregion_url)
-                if subregion_soup:
-                    walks.extend(self.parse_walks_from_page(subregion_soup, region))
-                time.sleep(1)  # Be respectful to the server
-                
+            # Walks are collected, not crawled; their pages belong to the detailed scraper
+            page_walk_urls = set()
+            for walk in self.parse_walks_from_page(soup, region):
+                walk_url = normalize_url(walk.source_url)
+                page_walk_urls.add(walk_url)
+                if seen_walks.add(walk_url):
+                    walks.append(walk)
+                    
+            for link in self.find_subregion_links(soup, region):
+                if normalize_url(link) not in page_walk_urls:
+                    frontier.add(link, depth + 1, context)
+                    
+        print(f"\nCrawled {frontier.pages_popped} pages, found {len(walks)} unique walks")
+        if len(frontier):
+            print(f"Page budget reached with {len(frontier)} URLs still queued")
         return walks
         
-    def parse_walks_from_page(self, soup: BeautifulSoup, region: str) -> List[Dict]:
+    def parse_walks_from_page(self, soup: BeautifulSoup, region: str) -> List[ScrapedWalk]:
         """Parse walk information from a page"""
         walks = []
         
@@ -160,7 +273,8 @@ class WalkHighlandsScraper:
                     continue
                     
                 try:
-                    walk_data = self.extract_walk_from_row(cells, region)
+                    walk_data = self.metrics.timed('extract_seconds', self.extract_walk_from_row, cells, region,
+                                                   extractor='walk_row')
                     if walk_data:
                         walks.append(walk_data)
                 except Exception as e:
@@ -169,7 +283,7 @@ class WalkHighlandsScraper:
                     
         return walks
         
-    def extract_walk_from_row(self, cells, region: str) -> Optional[Dict]:
+    def extract_walk_from_row(self, cells, region: str) -> Optional[ScrapedWalk]:
         """Extract walk information from table row cells"""
         if len(cells) < 3:
             return None
@@ -201,16 +315,16 @@ class WalkHighlandsScraper:
             duration_text = cells[3].get_text().strip()
             duration = self.parse_duration(duration_text)
             
-        return {
-            'title': walk_name,
-            'region': region.title(),
-            'difficulty': difficulty['description'],
-            'difficulty_level': difficulty['level'],
-            'distance_km': distance,
-            'duration_minutes': duration,
-            'source_url': walk_url,
-            'description': f"A {difficulty['description'].lower()} walk in {region.title()}"
-        }
+        return ScrapedWalk(
+            title=walk_name,
+            region=region.title(),
+            difficulty=difficulty['description'],
+            difficulty_level=difficulty['level'],
+            distance_km=distance,
+            duration_minutes=duration,
+            source_url=walk_url,
+            description=f"A {difficulty['description'].lower()} walk in {region.title()}"
+        )
         
     def get_walk_details(self, walk_url: str) -> Dict:
         """Get detailed information from individual walk page"""
@@ -234,55 +348,110 @@ class WalkHighlandsScraper:
             
         return details
         
-    def scrape_popular_walks(self, limit_per_region: int = 20) -> List[Dict]:
+    def scrape_popular_walks(self, limit_per_region: int = 20) -> List[ScrapedWalk]:
         """Scrape popular walks from priority regions"""
         all_walks = []
+        seen_walks = make_seen_set()
         
+        # Subregion pages overlap, so a walk can be listed under more than one region
         for region in self.priority_regions:
-            print(f"\\nScraping {region}...")
-            region_walks = self.get_region_walks(region)
-            
-            # Sort by difficulty (easier walks first for broader appeal) 
-            # and limit to most manageable ones for Phase 1
-            region_walks.sort(key=lambda x: (x.get('difficulty_level', 1), x.get('distance_km', 0)))
-            
-            # Take top walks from each region
-            selected_walks = region_walks[:limit_per_region]
-            all_walks.extend(selected_walks)
-            
-            print(f"Found {len(selected_walks)} walks in {region}")
-            time.sleep(2)  # Be respectful to the server
+            for walk in self.scrape_region(region, limit_per_region):
+                if seen_walks.add(normalize_url(walk.source_url)):
+                    all_walks.append(walk)
             
         return all_walks
         
-    def save_walks_json(self, walks: List[Dict], filename: str = "popular_scottish_walks.json"):
-        """Save walks data to JSON file"""
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(walks, f, indent=2, ensure_ascii=False)
-        print(f"Saved {len(walks)} walks to {filename}")
+    def scrape_region(self, region: str, limit: int = 20) -> List[ScrapedWalk]:
+        """Scrape the most approachable walks of one region"""
+        print(f"\\nScraping {region}...")
+        region_walks = self.get_region_walks(region)
+        
+        # Sort by difficulty (easier walks first for broader appeal) 
+        # and limit to most manageable ones for Phase 1
+        region_walks.sort(key=lambda x: (x.difficulty_level or 1, x.distance_km or 0))
+        
+        # Take top walks from the region
+        selected_walks = region_walks[:limit]
+        
+        print(f"Found {len(selected_walks)} walks in {region}")
+        return selected_walks
+        
+    def save_walks_json(self, walks: Iterable[ScrapedWalk], filename: str = "popular_scottish_walks.json"):
+        """Save walks data to a JSON or JSON Lines file, one walk at a time"""
+        with RecordWriter(filename) as writer:
+            for walk in walks:
+                writer.write(walk)
+        print(f"Saved {writer.count} walks to {filename}")
 
 def main():
-    scraper = WalkHighlandsScraper()
+    import argparse
     
-    print("Starting to scrape popular Scottish walks...")
-    print("Priority regions:", ", ".join(scraper.priority_regions))
+    parser = argparse.ArgumentParser(description="Scrape walk listings from WalkHighlands")
+    parser.add_argument('mode', nargs='?', default='popular', choices=['popular', 'catalogue'],
+                        help="popular: top walks from the priority regions; catalogue: crawl every region")
+    parser.add_argument('--max-pages', type=int, default=5000, help="Page budget for catalogue mode")
+    parser.add_argument('--max-depth', type=int, default=3, help="Link depth below region pages for catalogue mode")
+    parser.add_argument('--bloom', action='store_true', help="Track seen URLs in a Bloom filter instead of a set")
+    parser.add_argument('--rate', type=float, default=0.5, help="Requests per second per host to start at")
+    parser.add_argument('--max-rate', type=float,
+                        help="Highest requests per second per host while the site responds well (default: 4x --rate)")
+    parser.add_argument('--jsonl', action='store_true', help="Write one walk per line (.jsonl) instead of a JSON array")
+    parser.add_argument('--record', metavar='ARCHIVE', help="Save every fetched response to this zip archive")
+    parser.add_argument('--replay', metavar='ARCHIVE', help="Serve pages from this archive instead of the live site")
+    parser.add_argument('--metrics-file', metavar='PATH',
+                        help="Prometheus textfile to keep updated with scrape metrics (e.g. for node_exporter)")
+    parser.add_argument('--metrics-json', metavar='PATH', help="Write an end-of-run metrics summary to this file")
+    args = parser.parse_args()
     
-    walks = scraper.scrape_popular_walks(limit_per_region=15)
+    # Recording needs full responses, so it bypasses the cache's 304s
+    scraper = WalkHighlandsScraper(cache=None if args.record else HttpCache(), requests_per_second=args.rate,
+                                   metrics=ScrapeMetrics(textfile=args.metrics_file), max_rate=args.max_rate)
+    
+    archive = None
+    if args.record:
+        archive = PageArchive(args.record, 'a')
+        scraper.session = RecordingSession(scraper.session, archive)
+    elif args.replay:
+        archive = PageArchive(args.replay)
+        scraper.session = scraper.metrics.instrument(ReplaySession(archive))
+    
+    if args.mode == 'catalogue':
+        print("Crawling the full WalkHighlands catalogue...")
+        walks = scraper.crawl_catalogue(max_pages=args.max_pages, max_depth=args.max_depth, use_bloom=args.bloom)
+        output_file = "walkhighlands_catalogue.jsonl" if args.jsonl else "walkhighlands_catalogue.json"
+    else:
+        print("Starting to scrape popular Scottish walks...")
+        print("Priority regions:", ", ".join(scraper.priority_regions))
+        walks = scraper.scrape_popular_walks(limit_per_region=15)
+        output_file = "popular_scottish_walks.jsonl" if args.jsonl else "popular_scottish_walks.json"
     
     print(f"\\nTotal walks scraped: {len(walks)}")
     
     # Filter out walks without essential information
-    valid_walks = [w for w in walks if w.get('title') and w.get('region')]
+    valid_walks = [w for w in walks if w.title and w.region]
     
     print(f"Valid walks after filtering: {len(valid_walks)}")
     
-    scraper.save_walks_json(valid_walks)
+    scraper.save_walks_json(valid_walks, output_file)
     
     # Show sample of scraped data
     if valid_walks:
         print("\\nSample walks:")
         for walk in valid_walks[:5]:
-            print(f"- {walk['title']} ({walk['region']}) - {walk.get('difficulty', 'Unknown')} difficulty")
+            print(f"- {walk.title} ({walk.region}) - {walk.difficulty or 'Unknown'} difficulty")
+            
+    if scraper.cache:
+        print(f"\n{scraper.cache.summary()}")
+    if archive:
+        archive.close()
+        
+    print(scraper.metrics.report())
+    print(f"Politeness: {scraper.rate_limiter.summary()}")
+    if args.metrics_file:
+        scraper.metrics.write_prometheus(args.metrics_file)
+    if args.metrics_json:
+        scraper.metrics.write_json(args.metrics_json)
+        print(f"Saved metrics summary to {args.metrics_json}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Precomputed full-text search index for walks.
+The pipeline tokenises and stems each walk's title, tags and descriptions and
+writes an inverted index whose postings carry BM25F weights (per-field boosts
+and length normalisation), so a selective query only touches the walks containing
+its terms instead of substring-scanning the whole catalogue. Broad queries, whose
+postings cover much of the catalogue, are scored into one dense array instead.
+
+Usage: python search_index.py formatted_walks.json [walks_search_index.json] [--query "fairy glen"]
+"""
+
+import bisect
+import json
+import math
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from record_io import read_records
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+STOP_WORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in', 'into', 'is', 'it', 'its',
+    'of', 'on', 'or', 'that', 'the', 'this', 'to', 'with'
+}
+
+# Searchable fields and how much a match in each counts
+FIELD_BOOSTS = {
+    'title': 3.0,
+    'tags': 2.0,
+    'shortDescription': 1.5,
+    'description': 1.0
+}
+
+# Fields kept per walk so results can be filtered like searchWalks does
+DOC_FIELDS = ['slug', 'title', 'difficulty', 'distance', 'viewCount']
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Queries with fewer postings than an eighth of the walks are scored from their postings alone
+SPARSE_QUERY_FRACTION = 8
+
+def stem(word: str) -> str:
+    """Light suffix-stripping stemmer for plurals, -ing and -ed"""
+    if len(word) <= 3 or word.isdigit():
+        return word
+    if word.endswith('ies') and len(word) > 4:
+        return word[:-3] + 'y'
+    if word.endswith('sses'):
+        return word[:-2]
+    if word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        word = word[:-1]
+    for suffix in ('ing', 'ed'):
+        if word.endswith(suffix):
+            base = word[:-len(suffix)]
+            if len(base) >= 3 and re.search('[aeiouy]', base):
+                # running -> run, but keep the double letter in hill, moss, grass
+                if len(base) > 3 and base[-1] == base[-2] and base[-1] not in 'lsz':
+                    base = base[:-1]
+                return base
+    return word
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased, stemmed terms with stop words removed"""
+    return [stem(token) for token in TOKEN_RE.findall(text.lower()) if token not in STOP_WORDS]
+
+def field_text(walk: Dict, field: str) -> str:
+    value = walk.get(field) or ''
+    return ' '.join(value) if isinstance(value, list) else str(value)
+
+class SearchIndexBuilder:
+    """Collects walks one at a time and writes the inverted index once they are all seen"""
+
+    def __init__(self, field_boosts: Optional[Dict[str, float]] = None, k1: float = BM25_K1, b: float = BM25_B):
+        self.field_boosts = field_boosts or FIELD_BOOSTS
+        self.k1 = k1
+        self.b = b
+        self.docs: List[Dict] = []
+        self.term_counts: List[Dict[str, Counter]] = []  # per walk, per field
+        self.field_lengths = {field: 0 for field in self.field_boosts}
+
+    def add(self, walk: Dict):
+        counts = {}
+        for field in self.field_boosts:
+            terms = tokenize(field_text(walk, field))
+            counts[field] = Counter(terms)
+            self.field_lengths[field] += len(terms)
+        self.term_counts.append(counts)
+        self.docs.append({field: walk.get(field) for field in DOC_FIELDS})
+
+    def build(self) -> Dict:
+        """Inverted index with a BM25F weight on every posting"""
+        doc_count = len(self.docs)
+        avg_lengths = {field: (total / doc_count if doc_count else 0) or 1 for field, total in self.field_lengths.items()}
+
+        postings: Dict[str, List[List]] = {}
+        for doc_id, counts in enumerate(self.term_counts):
+            # BM25F: length-normalised, boosted term frequency summed across fields
+            weighted_tf: Dict[str, float] = {}
+            for field, boost in self.field_boosts.items():
+                field_counts = counts[field]
+                length = sum(field_counts.values())
+                norm = 1 - self.b + self.b * length / avg_lengths[field]
+                for term, tf in field_counts.items():
+                    weighted_tf[term] = weighted_tf.get(term, 0.0) + boost * tf / norm
+            for term, tf in weighted_tf.items():
+                postings.setdefault(term, []).append([doc_id, tf / (self.k1 + tf)])
+
+        for term, term_postings in postings.items():
+            idf = math.log(1 + (doc_count - len(term_postings) + 0.5) / (len(term_postings) + 0.5))
+            for posting in term_postings:
+                posting[1] = round(posting[1] * idf, 4)
+
+        return {
+            'version': 1,
+            'params': {'k1': self.k1, 'b': self.b, 'field_boosts': self.field_boosts},
+            'docs': self.docs,
+            'terms': dict(sorted(postings.items()))
+        }
+
+    def save(self, path: str) -> Dict:
+        index = self.build()
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False, separators=(',', ':'))
+        print(f"Saved search index of {len(index['docs'])} walks and {len(index['terms'])} terms to {path}")
+        return index
+
+def merge_postings(postings: List[Tuple[np.ndarray, np.ndarray]], combine: np.ufunc) -> Tuple[np.ndarray, np.ndarray]:
+    """Union of posting lists (walk ids in ascending order, weights), combining the weights of a
+    walk found in several lists with combine"""
+    if len(postings) == 1:
+        return postings[0]
+    doc_ids = np.concatenate([ids for ids, _ in postings])
+    weights = np.concatenate([weights for _, weights in postings])
+    order = np.argsort(doc_ids, kind='stable')
+    doc_ids, weights = doc_ids[order], weights[order]
+    starts = np.flatnonzero(np.concatenate(([True], doc_ids[1:] != doc_ids[:-1])))
+    return doc_ids[starts], combine.reduceat(weights, starts)
+
+class SearchIndex:
+    def __init__(self, index: Dict):
+        self.docs = index['docs']
+        self.postings = index['terms']
+        self.terms = list(self.postings)  # sorted, for prefix expansion
+        self.posting_arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+        # Filter columns, so filtering the matches is a few vectorised comparisons
+        self.distances = np.array([doc.get('distance') or 0 for doc in self.docs], dtype=float)
+        self.view_counts = np.array([doc.get('viewCount') or 0 for doc in self.docs], dtype=float)
+        self.difficulties = np.array([doc.get('difficulty') or '' for doc in self.docs], dtype=object)
+
+    @classmethod
+    def load(cls, path: str) -> 'SearchIndex':
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    @classmethod
+    def from_walks(cls, walks: Iterable[Dict]) -> 'SearchIndex':
+        builder = SearchIndexBuilder()
+        for walk in walks:
+            builder.add(walk)
+        return cls(builder.build())
+
+    def expand_prefix(self, prefix: str, limit: int = 50) -> List[str]:
+        """Indexed terms starting with prefix, so the word being typed still matches"""
+        start = bisect.bisect_left(self.terms, prefix)
+        matches = []
+        for term in self.terms[start:start + limit]:
+            if not term.startswith(prefix):
+                break
+            matches.append(term)
+        return matches
+
+    def posting_array(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Walk ids and weights for a term, converted to arrays on first use"""
+        arrays = self.posting_arrays.get(term)
+        if arrays is None:
+            postings = np.array(self.postings[term], dtype=float).reshape(-1, 2)
+            arrays = self.posting_arrays[term] = (postings[:, 0].astype(np.int64), postings[:, 1])
+        return arrays
+
+    def search(self, query: str, limit: int = 10, difficulty: Optional[str] = None,
+               min_distance: Optional[float] = None, max_distance: Optional[float] = None) -> List[Dict]:
+        """Walks ranked by BM25F score, with the same filters as searchWalks"""
+        raw_terms = [token for token in TOKEN_RE.findall(query.lower()) if token not in STOP_WORDS]
+        if not raw_terms:
+            return []
+
+        word_postings = []
+        for position, raw in enumerate(raw_terms):
+            term = stem(raw)
+            candidates = [term] if term in self.postings else []
+            if position == len(raw_terms) - 1:
+                candidates += [t for t in self.expand_prefix(raw) if t != term]
+            if candidates:
+                word_postings.append([self.posting_array(candidate) for candidate in candidates])
+        if not word_postings:
+            return []
+
+        # A walk scores once per query word, by its best-matching expansion
+        posting_count = sum(len(ids) for postings in word_postings for ids, _ in postings)
+        if posting_count * SPARSE_QUERY_FRACTION < len(self.docs):
+            # Selective queries merge their postings, touching only the walks that contain the terms
+            doc_ids, scores = merge_postings([merge_postings(postings, np.maximum) for postings in word_postings],
+                                             np.add)
+        else:
+            # Broad queries match much of the catalogue, where scattering into one score per walk is cheaper
+            scores = np.zeros(len(self.docs))
+            for postings in word_postings:
+                if len(postings) == 1:
+                    ids, weights = postings[0]
+                    scores[ids] += weights
+                    continue
+                term_scores = np.zeros(len(self.docs))
+                for ids, weights in postings:
+                    term_scores[ids] = np.maximum(term_scores[ids], weights)
+                scores += term_scores
+            doc_ids = np.flatnonzero(scores)
+            scores = scores[doc_ids]
+
+        matches = scores > 0
+        if difficulty is not None:
+            matches &= self.difficulties[doc_ids] == difficulty
+        if min_distance is not None:
+            matches &= self.distances[doc_ids] >= min_distance
+        if max_distance is not None:
+            matches &= self.distances[doc_ids] <= max_distance
+        doc_ids, scores = doc_ids[matches], scores[matches]
+
+        if len(doc_ids) > limit:
+            # Keep everything tied with the limit-th best score so the view-count tie-break still applies
+            threshold = -np.partition(-scores, limit - 1)[limit - 1]
+            tied = scores >= threshold
+            doc_ids, scores = doc_ids[tied], scores[tied]
+        # Best score first; equal scores go to the more viewed walk, as searchWalks sorts by views
+        order = np.lexsort((-self.view_counts[doc_ids], -scores))[:limit]
+        return [dict(self.docs[doc_id], score=round(float(score), 4))
+                for doc_id, score in zip(doc_ids[order].tolist(), scores[order].tolist())]
+
+def build_search_index(input_file: str, output_file: str = "walks_search_index.json") -> Dict:
+    """Pipeline stage: build the search index from a formatted or converted walks file"""
+    builder = SearchIndexBuilder()
+    for walk in read_records(input_file):
+        builder.add(walk)
+    return builder.save(output_file)
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the walk search index")
+    parser.add_argument('input_file', nargs='?', default='formatted_walks.json',
+                        help="Formatted or converted walks (.json array or .jsonl)")
+    parser.add_argument('output_file', nargs='?', default='walks_search_index.json', help="Search index to write")
+    parser.add_argument('--query', help="Run a search against the new index")
+    args = parser.parse_args()
+
+    index = SearchIndex(build_search_index(args.input_file, args.output_file))
+    if args.query:
+        print(f"\nResults for '{args.query}':")
+        for result in index.search(args.query):
+            print(f"- {result['title']} ({result['score']})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Spatial index over converted walks for "walks near here" queries.
+Walks are placed on the unit sphere and held in a k-d tree, which answers radius
+and nearest-neighbour queries without scanning the catalogue; bounding boxes use
+a latitude-sorted array. The pipeline stage writes one record per walk with its
+geohash cell and its nearest neighbours, ready to load into the database.
+
+Usage: python spatial_index.py converted_priority_walks.json [walks_spatial_index.json] [--neighbours 5]
+"""
+
+import heapq
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from record_io import RecordWriter, read_records
+
+EARTH_RADIUS_KM = 6371.0088
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+def geohash_encode(latitude: float, longitude: float, precision: int = 7) -> str:
+    """Geohash cell key for a point; precision 7 cells are roughly 150m across"""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        value, bounds = (longitude, lon_range) if even else (latitude, lat_range)
+        middle = (bounds[0] + bounds[1]) / 2
+        bits <<= 1
+        if value >= middle:
+            bits |= 1
+            bounds[0] = middle
+        else:
+            bounds[1] = middle
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_ALPHABET[bits])
+            bits = bit_count = 0
+    return ''.join(chars)
+
+def to_unit_vectors(latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    """Points on the unit sphere, where straight-line distance orders the same as great-circle distance"""
+    lat, lon = np.radians(latitudes), np.radians(longitudes)
+    return np.column_stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)))
+
+def chord_to_km(chord: float) -> float:
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+def km_to_chord(km: float) -> float:
+    return 2 * math.sin(min(math.pi, km / EARTH_RADIUS_KM) / 2)
+
+class KDTree:
+    """Static k-d tree over 3-D points, stored in flat arrays"""
+
+    def __init__(self, points: np.ndarray, leaf_size: int = 16):
+        self.leaf_size = leaf_size
+        self.order = np.arange(len(points))
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        self.children: List[Tuple[int, int]] = []
+        self.mins: List[Tuple[float, float, float]] = []
+        self.maxs: List[Tuple[float, float, float]] = []
+        if len(points):
+            self.build(points)
+        # Points in tree order, so every node covers a contiguous slice
+        self.points = points[self.order]
+
+    def build(self, points: np.ndarray):
+        stack = [(self.new_node(points, 0, len(points)), 0, len(points))]
+        while stack:
+            node, start, end = stack.pop()
+            if end - start <= self.leaf_size:
+                continue
+            node_points = points[self.order[start:end]]
+            dim = int(np.argmax(node_points.max(axis=0) - node_points.min(axis=0)))
+            middle = (end - start) // 2
+            split = np.argpartition(node_points[:, dim], middle)
+            self.order[start:end] = self.order[start:end][split]
+
+            left = self.new_node(points, start, start + middle)
+            right = self.new_node(points, start + middle, end)
+            self.children[node] = (left, right)
+            stack.append((left, start, start + middle))
+            stack.append((right, start + middle, end))
+
+    def new_node(self, points: np.ndarray, start: int, end: int) -> int:
+        node_points = points[self.order[start:end]]
+        self.starts.append(start)
+        self.ends.append(end)
+        self.children.append((-1, -1))
+        self.mins.append(tuple(node_points.min(axis=0)))
+        self.maxs.append(tuple(node_points.max(axis=0)))
+        return len(self.starts) - 1
+
+    def box_distance2(self, node: int, q: Tuple[float, float, float]) -> float:
+        """Squared distance from q to the node's bounding box"""
+        total = 0.0
+        for low, high, value in zip(self.mins[node], self.maxs[node], q):
+            if value < low:
+                total += (low - value) ** 2
+            elif value > high:
+                total += (value - high) ** 2
+        return total
+
+    def nearest(self, q: np.ndarray, k: int) -> List[Tuple[float, int]]:
+        """(distance, point index) of the k nearest points, closest first"""
+        if not self.starts or k <= 0:
+            return []
+        q_tuple = tuple(q)
+        best: List[Tuple[float, int]] = []  # max-heap of (-distance2, index)
+        frontier = [(0.0, 0)]
+        while frontier:
+            box_d2, node = heapq.heappop(frontier)
+            if len(best) == k and box_d2 > -best[0][0]:
+                break
+            left, right = self.children[node]
+            if left >= 0:
+                for child in (left, right):
+                    child_d2 = self.box_distance2(child, q_tuple)
+                    if len(best) < k or child_d2 <= -best[0][0]:
+                        heapq.heappush(frontier, (child_d2, child))
+                continue
+            start, end = self.starts[node], self.ends[node]
+            d2 = ((self.points[start:end] - q) ** 2).sum(axis=1)
+            for offset in np.argsort(d2)[:k]:
+                item = (-float(d2[offset]), int(self.order[start + offset]))
+                if len(best) < k:
+                    heapq.heappush(best, item)
+                elif item[0] > best[0][0]:
+                    heapq.heapreplace(best, item)
+                else:
+                    break
+        return sorted((math.sqrt(-d2), index) for d2, index in best)
+
+    def within(self, q: np.ndarray, radius: float) -> List[Tuple[float, int]]:
+        """(distance, point index) of every point within radius of q, closest first"""
+        if not self.starts:
+            return []
+        q_tuple = tuple(q)
+        radius2 = radius * radius
+        found = []
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            if self.box_distance2(node, q_tuple) > radius2:
+                continue
+            left, right = self.children[node]
+            if left >= 0:
+                stack.extend((left, right))
+                continue
+            start, end = self.starts[node], self.ends[node]
+            d2 = ((self.points[start:end] - q) ** 2).sum(axis=1)
+            for offset in np.nonzero(d2 <= radius2)[0]:
+                found.append((math.sqrt(float(d2[offset])), int(self.order[start + offset])))
+        return sorted(found)
+
+class SpatialIndex:
+    def __init__(self, walks: Iterable[Dict]):
+        """Index every walk that has coordinates, keyed by slug"""
+        located = [w for w in walks if w.get('latitude') is not None and w.get('longitude') is not None]
+        self.slugs = [w['slug'] for w in located]
+        self.latitudes = np.array([w['latitude'] for w in located], dtype=float)
+        self.longitudes = np.array([w['longitude'] for w in located], dtype=float)
+        self.tree = KDTree(to_unit_vectors(self.latitudes, self.longitudes))
+
+        # Bounding boxes scan a latitude band found by binary search
+        self.by_latitude = np.argsort(self.latitudes, kind='stable')
+        self.sorted_latitudes = self.latitudes[self.by_latitude]
+
+    @classmethod
+    def load(cls, path: str) -> 'SpatialIndex':
+        """Build the index from a converted walks file or a spatial index artifact"""
+        return cls(read_records(path))
+
+    def __len__(self) -> int:
+        return len(self.slugs)
+
+    def point(self, latitude: float, longitude: float) -> np.ndarray:
+        return to_unit_vectors(np.array([latitude]), np.array([longitude]))[0]
+
+    def results(self, matches: List[Tuple[float, int]]) -> List[Dict]:
+        return [{'slug': self.slugs[i], 'distance_km': round(chord_to_km(chord), 3)} for chord, i in matches]
+
+    def nearest(self, latitude: float, longitude: float, k: int = 5) -> List[Dict]:
+        """The k walks closest to a point, closest first"""
+        return self.results(self.tree.nearest(self.point(latitude, longitude), k))
+
+    def within_radius(self, latitude: float, longitude: float, radius_km: float) -> List[Dict]:
+        """Every walk within radius_km of a point, closest first"""
+        return self.results(self.tree.within(self.point(latitude, longitude), km_to_chord(radius_km)))
+
+    def in_bbox(self, south: float, west: float, north: float, east: float) -> List[str]:
+        """Slugs of walks inside a latitude/longitude box (west > east crosses the antimeridian)"""
+        start = np.searchsorted(self.sorted_latitudes, south, side='left')
+        end = np.searchsorted(self.sorted_latitudes, north, side='right')
+        candidates = self.by_latitude[start:end]
+        longitudes = self.longitudes[candidates]
+        if west <= east:
+            inside = (longitudes >= west) & (longitudes <= east)
+        else:
+            inside = (longitudes >= west) | (longitudes <= east)
+        return [self.slugs[i] for i in candidates[inside]]
+
+    def neighbours(self, slug_index: int, k: int) -> List[Dict]:
+        """Nearest other walks to an indexed walk"""
+        q = self.point(self.latitudes[slug_index], self.longitudes[slug_index])
+        matches = [m for m in self.tree.nearest(q, k + 1) if m[1] != slug_index][:k]
+        return self.results(matches)
+
+    def records(self, neighbours: int = 5, geohash_precision: int = 7) -> Iterable[Dict]:
+        """One record per walk with its geohash cell and nearest neighbours"""
+        for i, slug in enumerate(self.slugs):
+            latitude, longitude = float(self.latitudes[i]), float(self.longitudes[i])
+            yield {
+                'slug': slug,
+                'latitude': latitude,
+                'longitude': longitude,
+                'geohash': geohash_encode(latitude, longitude, geohash_precision),
+                'nearby': self.neighbours(i, neighbours)
+            }
+
+def build_spatial_index(input_file: str, output_file: str = "walks_spatial_index.json",
+                        neighbours: int = 5, geohash_precision: int = 7) -> Optional[SpatialIndex]:
+    """Pipeline stage: index converted walks and write per-walk geohashes and neighbour lists"""
+    try:
+        index = SpatialIndex.load(input_file)
+    except FileNotFoundError:
+        print(f"Input file {input_file} not found")
+        return None
+
+    print(f"Indexed {len(index)} walks with coordinates from {input_file}")
+    with RecordWriter(output_file) as writer:
+        for record in index.records(neighbours, geohash_precision):
+            writer.write(record)
+    print(f"Saved {writer.count} walks with {neighbours} nearest neighbours each to {output_file}")
+    return index
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build a spatial index over converted walks")
+    parser.add_argument('input_file', nargs='?', default='converted_priority_walks.json',
+                        help="Converted walks (.json array or .jsonl)")
+    parser.add_argument('output_file', nargs='?', default='walks_spatial_index.json',
+                        help="Per-walk geohash and nearest neighbours")
+    parser.add_argument('--neighbours', type=int, default=5, help="Nearest walks listed for each walk")
+    parser.add_argument('--geohash-precision', type=int, default=7, help="Geohash cell key length")
+    parser.add_argument('--near', nargs=2, type=float, metavar=('LAT', 'LON'),
+                        help="Also print the walks nearest this point")
+    parser.add_argument('--radius', type=float, help="With --near, list every walk within this many km")
+    args = parser.parse_args()
+
+    index = build_spatial_index(args.input_file, args.output_file, args.neighbours, args.geohash_precision)
+    if index and args.near:
+        latitude, longitude = args.near
+        if args.radius:
+            matches = index.within_radius(latitude, longitude, args.radius)
+            print(f"\n{len(matches)} walks within {args.radius}km of {latitude}, {longitude}:")
+        else:
+            matches = index.nearest(latitude, longitude, args.neighbours)
+            print(f"\nNearest walks to {latitude}, {longitude}:")
+        for match in matches:
+            print(f"- {match['slug']} ({match['distance_km']}km)")
+
+if __name__ == "__main__":
+    main()
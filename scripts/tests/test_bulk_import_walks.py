@@ -0,0 +1,66 @@
+from bulk_import_walks import BulkWalkImporter, batched
+from convex_stub import StubConvexBackend, StubConvexServer
+
+def make_walks(count, region='isle-of-skye'):
+    return [{'title': f"Walk {i}", 'slug': f"walk-{i}", 'regionSlug': region, 'stages': [{'stage': 1}]}
+            for i in range(count)]
+
+def importer_for(server, **kwargs):
+    kwargs.setdefault('auth_token', server.backend.admin_key)
+    return BulkWalkImporter(server.url, retry_delay=0.01, **kwargs)
+
+def test_batched_splits_into_consecutive_lists():
+    assert [len(batch) for batch in batched(range(7), 3)] == [3, 3, 1]
+    assert list(batched([], 3)) == []
+
+def test_imports_every_walk_in_batches():
+    with StubConvexServer() as server:
+        totals = importer_for(server, batch_size=10, concurrency=2).import_walks(make_walks(25))
+        assert totals['batches'] == 3
+        assert totals['walks'] == 25
+        assert totals['created'] == 25
+        assert totals['failed_batches'] == 0
+        assert len(server.backend.walks) == 25
+        assert server.backend.stage_count == 25
+        assert server.backend.requests == 3
+
+def test_reimport_skips_existing_walks():
+    with StubConvexServer() as server:
+        importer = importer_for(server, batch_size=10)
+        importer.import_walks(make_walks(12))
+        totals = importer.import_walks(make_walks(12))
+        assert totals['created'] == 0
+        assert totals['skipped'] == 12
+        assert len(server.backend.walks) == 12
+
+def test_failed_batch_is_retried():
+    with StubConvexServer(StubConvexBackend(fail_first=2)) as server:
+        totals = importer_for(server, batch_size=10, concurrency=1, max_attempts=3).import_walks(make_walks(15))
+        assert totals['created'] == 15
+        assert totals['failed_batches'] == 0
+        # The first batch took three attempts, the second one
+        assert server.backend.requests == 4
+
+def test_batch_fails_after_its_last_attempt():
+    with StubConvexServer(StubConvexBackend(fail_first=2)) as server:
+        totals = importer_for(server, batch_size=10, concurrency=1, max_attempts=2).import_walks(make_walks(15))
+        assert totals['failed_batches'] == 1
+        assert totals['errors'] == 10
+        assert totals['created'] == 5
+
+def test_unknown_region_is_reported_per_walk():
+    with StubConvexServer() as server:
+        walks = make_walks(3)
+        walks[2]['regionSlug'] = 'atlantis'
+        totals = importer_for(server).import_walks(walks)
+        assert totals['created'] == 2
+        assert totals['errors'] == 1
+
+def test_batch_mutation_requires_the_admin_key():
+    with StubConvexServer() as server:
+        totals = importer_for(server, auth_token=None, max_attempts=3).import_walks(make_walks(3))
+        assert totals['created'] == 0
+        assert totals['failed_batches'] == 1
+        assert not server.backend.walks
+        # Rejected by the mutation, so not retried
+        assert server.backend.requests == 1
@@ -0,0 +1,109 @@
+import json
+
+import numpy as np
+import pytest
+
+from dem_elevation import VOID, ElevationService, add_elevations, route_elevation, tile_name
+
+# 3 arc-second tiles have 1201 x 1201 heights
+SIZE = 1201
+
+def write_tile(directory, latitude, longitude, heights):
+    heights.astype('>i2').tofile(directory / tile_name(latitude, longitude))
+
+def plane_tile():
+    """Heights rising 1 m per row southwards and 2 m per column eastwards, exact under bilinear sampling"""
+    rows, columns = np.mgrid[0:SIZE, 0:SIZE]
+    return rows + 2 * columns
+
+@pytest.fixture
+def dem_dir(tmp_path):
+    write_tile(tmp_path, 56, -5, plane_tile())
+    write_tile(tmp_path, 57, -5, np.full((SIZE, SIZE), 500))
+    return tmp_path
+
+def plane_height(latitude, longitude):
+    return (57 - latitude) * 1200 + 2 * (longitude + 5) * 1200
+
+def test_tile_names():
+    assert tile_name(56, -5) == 'N56W005.hgt'
+    assert tile_name(-34, 151) == 'S34E151.hgt'
+
+def test_bilinear_heights_between_samples(dem_dir):
+    service = ElevationService(str(dem_dir))
+    rng = np.random.default_rng(1)
+    latitudes = rng.uniform(56.0, 57.0, 500)
+    longitudes = rng.uniform(-5.0, -4.0, 500)
+    assert np.allclose(service.heights(latitudes, longitudes), plane_height(latitudes, longitudes))
+
+def test_points_in_several_tiles_and_outside_them(dem_dir):
+    service = ElevationService(str(dem_dir))
+    heights = service.heights([56.5, 57.5, 58.5, 57.2], [-4.5, -4.5, -4.5, -4.9])
+    assert heights[0] == pytest.approx(plane_height(56.5, -4.5))
+    assert heights[1] == heights[3] == 500
+    assert np.isnan(heights[2])
+    assert service.stats['tiles_opened'] == 2
+    assert service.stats['tiles_missing'] == 1
+
+def test_voids_give_no_height_nearby(tmp_path):
+    heights = np.full((SIZE, SIZE), 100)
+    heights[600, 600] = VOID
+    write_tile(tmp_path, 56, -5, heights)
+    service = ElevationService(str(tmp_path))
+    near, far = service.heights([56.5 + 0.1 / 1200, 56.25], [-4.5 + 0.1 / 1200, -4.25])
+    assert np.isnan(near)
+    assert far == 100
+
+def test_least_recently_used_tiles_are_evicted(tmp_path):
+    for longitude in (-7, -6, -5):
+        write_tile(tmp_path, 56, longitude, np.full((SIZE, SIZE), 10 * -longitude))
+    service = ElevationService(str(tmp_path), max_tiles=2)
+    service.heights([56.5], [-6.5])
+    service.heights([56.5], [-5.5])
+    service.heights([56.5], [-6.5])
+    # Opening a third tile evicts the one used longest ago
+    assert service.heights([56.5], [-4.5])[0] == 50
+    assert list(service.tiles) == [(56, -7), (56, -5)]
+    assert service.stats['tiles_evicted'] == 1
+    assert service.heights([56.5], [-5.5])[0] == 60
+    assert service.stats['tiles_opened'] == 4
+
+def test_route_elevation_counts_climb_and_descent(dem_dir):
+    service = ElevationService(str(dem_dir))
+    # South 0.1 degree then back north, along a plane rising southwards by 120 m
+    out = np.stack([np.linspace(56.6, 56.5, 50), np.full(50, -4.5)], axis=1)
+    elevation = route_elevation(service, [out, out[::-1]])
+    # Counted in steps of at least the threshold, so up to 5 m short of the full 120 m
+    assert 115 <= elevation['ascent_m'] <= 120
+    assert 115 <= elevation['descent_m'] <= 120
+    assert elevation['max_elevation_m'] == round(plane_height(56.5, -4.5))
+    assert len(elevation['profile']) == 100
+
+def test_noisy_flat_dem_has_no_ascent(tmp_path):
+    rng = np.random.default_rng(11)
+    write_tile(tmp_path, 56, -5, 300 + rng.integers(-2, 3, size=(SIZE, SIZE)))
+    service = ElevationService(str(tmp_path))
+    # About 11 km across the tile, sampled every 25 m
+    route = np.stack([np.linspace(56.2, 56.3, 200), np.linspace(-4.8, -4.7, 200)], axis=1)
+    elevation = route_elevation(service, [route])
+    assert elevation['ascent_m'] == 0
+    assert elevation['descent_m'] == 0
+    # Every sample step would add up to hundreds of metres
+    assert route_elevation(service, [route], climb_threshold_m=0.0)['ascent_m'] > 100
+
+def test_route_elevation_without_data(dem_dir):
+    service = ElevationService(str(dem_dir))
+    assert route_elevation(service, [np.array([[60.1, -1.2], [60.2, -1.2]])]) is None
+    assert route_elevation(service, []) is None
+
+def test_add_elevations_from_start_points(dem_dir, tmp_path):
+    walks = [{'slug': 'a', 'title': 'A', 'latitude': 57.5, 'longitude': -4.5, 'ascent': 300},
+             {'slug': 'b', 'title': 'B', 'latitude': 61.0, 'longitude': -1.0, 'ascent': 100},
+             {'slug': 'c', 'title': 'C'}]
+    input_file, output_file = tmp_path / 'walks.json', tmp_path / 'out.json'
+    input_file.write_text(json.dumps(walks))
+    stats = add_elevations(str(input_file), str(output_file), str(dem_dir))
+    written = json.loads(output_file.read_text())
+    assert written[0]['maxElevation'] == 800
+    assert written[1].get('maxElevation') is None
+    assert (stats['walks'], stats['start_points'], stats['no_data']) == (3, 1, 2)
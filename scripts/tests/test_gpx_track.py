@@ -0,0 +1,79 @@
+import io
+
+import numpy as np
+
+from gpx_track import count_climb, gpx_path, track_segments, track_stats
+
+def gpx(*segments, namespace='http://www.topografix.com/GPX/1/1'):
+    """GPX document with one track segment per list of (latitude, longitude, elevation) points"""
+    parts = [f'<?xml version="1.0"?><gpx xmlns="{namespace}" version="1.1"><trk>']
+    for points in segments:
+        parts.append('<trkseg>')
+        for latitude, longitude, elevation in points:
+            ele = '' if elevation is None else f'<ele>{elevation:.2f}</ele>'
+            parts.append(f'<trkpt lat="{latitude:.7f}" lon="{longitude:.7f}">{ele}</trkpt>')
+        parts.append('</trkseg>')
+    parts.append('</trk></gpx>')
+    return io.BytesIO(''.join(parts).encode('utf-8'))
+
+def straight_line(count, elevations):
+    """Points heading north from 57N 5W about 11 m apart"""
+    return [(57.0 + i * 1e-4, -5.0, elevation) for i, elevation in enumerate(elevations)]
+
+def test_gpx_path_mirrors_walk_url():
+    assert gpx_path('gpx', 'https://www.walkhighlands.co.uk/skye/quiraing.shtml') == 'gpx/skye/quiraing.gpx'
+
+def test_distance_of_a_straight_track():
+    stats = track_stats(gpx(straight_line(1001, [10.0] * 1001)))
+    # 0.1 degree of latitude
+    assert abs(stats['distance_km'] - 11.12) < 0.02
+    assert stats['points'] == 1001
+    assert stats['start_latitude'] == 57.0
+
+def test_noisy_flat_track_has_no_ascent():
+    rng = np.random.default_rng(7)
+    elevations = 200 + rng.uniform(-2, 2, size=5000)
+    stats = track_stats(gpx(straight_line(5000, elevations)), chunk_size=512)
+    assert stats['ascent_m'] == 0
+    assert stats['descent_m'] == 0
+
+def test_noisy_climb_counts_the_climb():
+    rng = np.random.default_rng(7)
+    elevations = np.linspace(100, 400, 3000) + rng.uniform(-2, 2, size=3000)
+    stats = track_stats(gpx(straight_line(3000, elevations)), chunk_size=256)
+    assert abs(stats['ascent_m'] - 300) <= 10
+    assert stats['descent_m'] <= 10
+
+def test_threshold_is_configurable():
+    elevations = [100, 102, 100, 102, 100]
+    assert track_stats(gpx(straight_line(5, elevations)))['ascent_m'] == 0
+    assert track_stats(gpx(straight_line(5, elevations)), climb_threshold_m=0)['ascent_m'] == 4
+
+def test_segments_are_measured_separately():
+    first = [(57.0, -5.0, 100), (57.001, -5.0, 150)]
+    second = [(58.0, -5.0, 500), (58.001, -5.0, 450)]
+    stats = track_stats(gpx(first, second))
+    # The gap between the segments adds neither distance nor climbing
+    assert stats['distance_km'] < 0.3
+    assert stats['ascent_m'] == 50
+    assert stats['descent_m'] == 50
+    assert stats['max_elevation_m'] == 500
+
+def test_track_without_elevations():
+    stats = track_stats(gpx([(57.0, -5.0, None), (57.001, -5.0, None)], namespace='http://www.topografix.com/GPX/1/0'))
+    assert stats['ascent_m'] is None
+    assert stats['distance_km'] > 0
+
+def test_empty_track():
+    assert track_stats(gpx()) is None
+
+def test_track_segments():
+    segments = track_segments(gpx([(57.0, -5.0, 1), (57.1, -5.1, 2)], [], [(58.0, -4.0, 3)]))
+    assert [segment.shape for segment in segments] == [(2, 2), (1, 2)]
+    assert segments[0][1].tolist() == [57.1, -5.1]
+
+def test_count_climb_carries_its_level():
+    elevations = np.array([100.0, 103.0, 106.0, 104.0, 112.0, 108.0, 101.0])
+    assert count_climb(elevations, 100.0) == (12.0, 11.0, 101.0)
+    # A run continuing from a counted level only counts once it leaves the threshold band
+    assert count_climb(np.array([104.0, 97.0]), 101.0) == (0.0, 0.0, 101.0)
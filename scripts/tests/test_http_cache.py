@@ -0,0 +1,117 @@
+import os
+import time
+
+import pytest
+import requests
+
+from http_cache import HttpCache
+
+URL = 'https://www.walkhighlands.co.uk/skye/quiraing.shtml'
+
+class Site:
+    """Session stand-in serving pages that honour If-None-Match and If-Modified-Since"""
+
+    def __init__(self):
+        self.pages = {}
+        self.requests = []
+
+    def publish(self, url, body, etag=None, last_modified=None):
+        self.pages[url] = (body, etag, last_modified)
+
+    def get(self, url, timeout=None, headers=None):
+        headers = headers or {}
+        self.requests.append((url, headers))
+        response = requests.Response()
+        response.url = url
+        if url not in self.pages:
+            response.status_code = 404
+            response._content = b''
+            return response
+        body, etag, last_modified = self.pages[url]
+        unchanged = ((etag and headers.get('If-None-Match') == etag) or
+                     (not etag and last_modified and headers.get('If-Modified-Since') == last_modified))
+        response.status_code = 304 if unchanged else 200
+        response._content = b'' if unchanged else body
+        if etag:
+            response.headers['ETag'] = etag
+        if last_modified:
+            response.headers['Last-Modified'] = last_modified
+        return response
+
+@pytest.fixture
+def site():
+    return Site()
+
+def test_etag_revalidation(tmp_path, site):
+    cache = HttpCache(str(tmp_path))
+    site.publish(URL, b'<h1>v1</h1>', etag='"v1"')
+    assert cache.fetch(site, URL) == b'<h1>v1</h1>'
+    assert cache.fetch(site, URL) == b'<h1>v1</h1>'
+    assert site.requests[0][1] == {}
+    assert site.requests[1][1] == {'If-None-Match': '"v1"'}
+    assert cache.stats['downloaded'] == 1 and cache.stats['revalidated'] == 1
+
+    # A changed page is downloaded again and replaces the cached copy
+    site.publish(URL, b'<h1>v2</h1>', etag='"v2"')
+    assert cache.fetch(site, URL) == b'<h1>v2</h1>'
+    assert cache.lookup(URL)['etag'] == '"v2"'
+    assert cache.fetch(site, URL) == b'<h1>v2</h1>'
+    assert cache.stats['downloaded'] == 2 and cache.stats['revalidated'] == 2
+
+def test_last_modified_revalidation(tmp_path, site):
+    cache = HttpCache(str(tmp_path))
+    site.publish(URL, b'page', last_modified='Wed, 01 Oct 2025 10:00:00 GMT')
+    cache.fetch(site, URL)
+    assert cache.fetch(site, URL) == b'page'
+    assert site.requests[1][1] == {'If-Modified-Since': 'Wed, 01 Oct 2025 10:00:00 GMT'}
+    assert cache.stats['revalidated'] == 1
+
+def test_cache_persists_across_instances(tmp_path, site):
+    site.publish(URL, b'page', etag='"v1"')
+    HttpCache(str(tmp_path)).fetch(site, URL)
+    cache = HttpCache(str(tmp_path))
+    assert cache.fetch(site, URL) == b'page'
+    assert cache.stats == {'revalidated': 1, 'downloaded': 0, 'bytes_downloaded': 0, 'evicted': 0}
+
+def test_missing_body_is_downloaded_again(tmp_path, site):
+    cache = HttpCache(str(tmp_path))
+    site.publish(URL, b'page', etag='"v1"')
+    cache.fetch(site, URL)
+    os.remove(cache.body_path(cache.key_for(URL)))
+    assert cache.fetch(site, URL) == b'page'
+    # The conditional request got a 304, so the page was requested again without validators
+    assert site.requests[-1][1] == {}
+    assert cache.stats['downloaded'] == 2
+
+def test_errors_are_raised_and_not_cached(tmp_path, site):
+    cache = HttpCache(str(tmp_path))
+    with pytest.raises(requests.HTTPError):
+        cache.fetch(site, 'https://www.walkhighlands.co.uk/missing.shtml')
+    assert cache.index == {}
+
+def test_expired_entries_are_fetched_unconditionally(tmp_path, site):
+    cache = HttpCache(str(tmp_path), ttl_seconds=60)
+    site.publish(URL, b'page', etag='"v1"')
+    cache.fetch(site, URL)
+    cache.index[cache.key_for(URL)]['validated_at'] = time.time() - 120
+    assert cache.lookup(URL) is None
+    assert not os.path.exists(cache.body_path(cache.key_for(URL)))
+    cache.fetch(site, URL)
+    assert site.requests[-1][1] == {}
+    assert cache.stats['evicted'] == 1
+
+def test_least_recently_used_entries_are_evicted(tmp_path, site):
+    cache = HttpCache(str(tmp_path), max_bytes=250)
+    urls = [f'https://www.walkhighlands.co.uk/skye/walk-{i}.shtml' for i in range(3)]
+    for url in urls:
+        site.publish(url, b'x' * 100, etag='"v1"')
+    cache.fetch(site, urls[0])
+    cache.fetch(site, urls[1])
+    # Revalidating the first page makes the second the least recently used
+    time.sleep(0.01)
+    cache.fetch(site, urls[0])
+    cache.fetch(site, urls[2])
+    assert cache.lookup(urls[1]) is None
+    assert cache.lookup(urls[0]) and cache.lookup(urls[2])
+    assert cache.total_bytes == 200
+    assert cache.stats['evicted'] == 1
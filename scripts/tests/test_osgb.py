@@ -0,0 +1,35 @@
+import math
+
+import numpy as np
+import pytest
+
+from osgb import easting_northing_to_osgb36, grid_ref_to_easting_northing, grid_ref_to_wgs84, grid_refs_to_wgs84
+
+def test_grid_letters_and_digits():
+    # Worked example from the Ordnance Survey guide to coordinate systems
+    assert grid_ref_to_easting_northing('TG 51409 13177') == (651409.5, 313177.5)
+    assert grid_ref_to_easting_northing('NN166712') == (216650.0, 771250.0)
+    assert grid_ref_to_easting_northing('nn 16 71') == (216500.0, 771500.0)
+    assert grid_ref_to_easting_northing('HU 4 1') == (445000.0, 1115000.0)
+
+@pytest.mark.parametrize('grid_ref', [None, '', 'NN 1667 712', 'XX 123 456', 'NI 123 456', 'NN 12345678901'])
+def test_invalid_grid_refs(grid_ref):
+    assert all(math.isnan(value) for value in grid_ref_to_easting_northing(grid_ref))
+    assert grid_ref_to_wgs84(grid_ref) is None
+
+def test_projection_matches_ordnance_survey_example():
+    # OS guide: E 651409.903 N 313177.270 is 52°39'27.2531"N 1°43'4.5177"E on OSGB36
+    lat, lon = easting_northing_to_osgb36(np.array([651409.903]), np.array([313177.270]))
+    assert math.degrees(lat[0]) == pytest.approx(52 + 39 / 60 + 27.2531 / 3600, abs=1e-6)
+    assert math.degrees(lon[0]) == pytest.approx(1 + 43 / 60 + 4.5177 / 3600, abs=1e-6)
+
+def test_wgs84_of_scottish_summits():
+    # Published Ben Nevis and Ben Macdui summit positions, to within about 10 m
+    assert grid_ref_to_wgs84('NN 16667 71283') == pytest.approx((56.7969, -5.0037), abs=1e-4)
+    assert grid_ref_to_wgs84('NN 98897 98946') == pytest.approx((57.0704, -3.6691), abs=1e-4)
+
+def test_batch_conversion_keeps_positions():
+    latitudes, longitudes = grid_refs_to_wgs84(['NN 16667 71283', None, 'bad', 'NN 16667 71283'])
+    assert np.isnan(latitudes[[1, 2]]).all()
+    assert latitudes[0] == latitudes[3]
+    assert grid_refs_to_wgs84([])[0].shape == (0,)
@@ -0,0 +1,215 @@
+import os
+import time
+from email.utils import formatdate
+
+import pytest
+import requests
+
+from politeness import AdaptiveRateLimiter, CircuitBreaker, TokenBucket, is_retryable, parse_retry_after
+
+URL = 'https://www.walkhighlands.co.uk/skye/quiraing.shtml'
+
+def rate_of(limiter):
+    return limiter.host_state(URL).bucket.rate
+
+def test_token_bucket_allows_a_burst_then_paces():
+    bucket = TokenBucket(rate=50, capacity=2)
+    assert bucket.acquire() == 0.0
+    assert bucket.acquire() == 0.0
+    assert bucket.acquire() == pytest.approx(0.02, abs=0.005)
+
+def test_retry_after_in_seconds():
+    assert parse_retry_after('120') == 120.0
+    assert parse_retry_after('-5') == 0.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('soon') is None
+
+def test_retry_after_as_http_date():
+    assert parse_retry_after(formatdate(time.time() + 120, usegmt=True)) == pytest.approx(120, abs=2)
+    assert parse_retry_after(formatdate(time.time() - 120, usegmt=True)) == 0.0
+
+@pytest.fixture
+def far_from_utc():
+    previous = os.environ.get('TZ')
+    os.environ['TZ'] = 'America/Los_Angeles'
+    time.tzset()
+    yield
+    if previous is None:
+        del os.environ['TZ']
+    else:
+        os.environ['TZ'] = previous
+    time.tzset()
+
+def test_retry_after_date_without_zone_is_utc(far_from_utc):
+    value = formatdate(time.time() + 120).replace('+0000', '-0000')
+    assert parse_retry_after(value) == pytest.approx(120, abs=2)
+
+def test_retryable_statuses():
+    assert is_retryable(None) and is_retryable(429) and is_retryable(503)
+    assert not is_retryable(404) and not is_retryable(200)
+
+def test_healthy_responses_increase_the_rate_additively():
+    limiter = AdaptiveRateLimiter(requests_per_second=1.0, increase=0.5, max_rate=2.0)
+    state = limiter.host_state(URL)
+    state.adjusted_at -= 1.0
+    limiter.record(URL, 200, 0.1)
+    assert rate_of(limiter) == pytest.approx(1.5, abs=0.01)
+    # Growth per response is capped at decrease_interval seconds' worth, and at max_rate
+    state.adjusted_at -= 100.0
+    limiter.record(URL, 200, 0.1)
+    assert rate_of(limiter) == pytest.approx(2.0)
+
+def test_throttling_halves_the_rate_once_per_interval():
+    limiter = AdaptiveRateLimiter(requests_per_second=4.0, decrease_interval=60.0)
+    limiter.record(URL, 429, 0.1)
+    assert rate_of(limiter) == pytest.approx(2.0)
+    limiter.record(URL, 429, 0.1)
+    assert rate_of(limiter) == pytest.approx(2.0)
+
+def test_server_errors_decrease_the_rate_down_to_min_rate():
+    limiter = AdaptiveRateLimiter(requests_per_second=4.0, min_rate=3.0, error_decrease=0.8)
+    state = limiter.host_state(URL)
+    limiter.record(URL, 503, 0.1)
+    assert rate_of(limiter) == pytest.approx(3.2)
+    state.last_decrease -= 10
+    limiter.record(URL, None, 0.1)
+    assert rate_of(limiter) == pytest.approx(3.0)
+
+def test_slow_responses_decrease_the_rate():
+    limiter = AdaptiveRateLimiter(requests_per_second=4.0, error_decrease=0.5)
+    for _ in range(5):
+        limiter.record(URL, 200, 0.1)
+    for _ in range(10):
+        limiter.record(URL, 200, 2.0)
+    assert rate_of(limiter) < 4.0
+
+def test_retry_after_pauses_and_slows_the_host():
+    limiter = AdaptiveRateLimiter(requests_per_second=10.0)
+    limiter.record(URL, 503, 0.1, retry_after=3.0)
+    bucket = limiter.host_state(URL).bucket
+    assert bucket.rate == pytest.approx(5.0)
+    # The next request waits out the pause
+    assert (1 - bucket.tokens) / bucket.rate >= 3.0
+
+def test_fetch_retries_transient_failures():
+    limiter = AdaptiveRateLimiter(requests_per_second=1000.0, backoff=0.001)
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            response = requests.Response()
+            response.status_code = 503
+            raise requests.HTTPError("HTTP 503", response=response)
+        return 'page'
+
+    assert limiter.fetch(URL, flaky) == 'page'
+    assert len(calls) == 3
+
+def test_fetch_does_not_retry_not_found():
+    limiter = AdaptiveRateLimiter(requests_per_second=1000.0, backoff=0.001)
+    calls = []
+
+    def missing():
+        calls.append(1)
+        response = requests.Response()
+        response.status_code = 404
+        raise requests.HTTPError("HTTP 404", response=response)
+
+    with pytest.raises(requests.HTTPError):
+        limiter.fetch(URL, missing)
+    assert len(calls) == 1
+    # A 404 is an answer from a healthy host
+    assert limiter.host_state(URL).breaker.outcomes[-1] is True
+
+def test_breaker_trips_when_most_requests_fail():
+    breaker = CircuitBreaker(window=10, min_requests=4, failure_rate=0.5, cooldown=0.05)
+    assert not breaker.record(True)
+    assert not breaker.record(False)
+    assert not breaker.record(True)
+    assert breaker.record(False)
+    assert breaker.trips == 1
+    assert breaker.open_until is not None
+
+def test_breaker_probe_success_closes_the_circuit():
+    breaker = CircuitBreaker(min_requests=2, cooldown=0.05)
+    breaker.record(False)
+    breaker.record(False)
+    waited, probe = breaker.wait()
+    assert waited >= 0.04
+    assert probe is not None
+    breaker.record(True, probe)
+    assert breaker.open_until is None
+    assert breaker.wait() == (pytest.approx(0.0, abs=0.01), None)
+
+def test_breaker_probe_failure_reopens_with_longer_cooldown():
+    breaker = CircuitBreaker(min_requests=2, cooldown=0.05, max_cooldown=0.15)
+    breaker.record(False)
+    breaker.record(False)
+    _, probe = breaker.wait()
+    breaker.record(False, probe)
+    assert breaker.cooldown == pytest.approx(0.1)
+    waited, probe = breaker.wait()
+    assert waited >= 0.09
+    breaker.record(False, probe)
+    assert breaker.cooldown == pytest.approx(0.15)
+    _, probe = breaker.wait()
+    # A successful probe resets the cooldown
+    breaker.record(True, probe)
+    assert breaker.cooldown == pytest.approx(0.05)
+    assert breaker.trips == 1
+
+def test_stale_outcomes_do_not_settle_the_probe():
+    breaker = CircuitBreaker(min_requests=2, cooldown=0.01)
+    breaker.record(False)
+    breaker.record(False)
+    _, probe = breaker.wait()
+    # Requests started before the circuit opened finish while the probe is out
+    breaker.record(True)
+    breaker.record(False)
+    assert breaker.probe == probe
+    assert breaker.cooldown == pytest.approx(0.01)
+    breaker.record(True, probe)
+    assert breaker.open_until is None
+
+def test_released_probe_lets_another_request_probe():
+    breaker = CircuitBreaker(min_requests=2, cooldown=0.01)
+    breaker.record(False)
+    breaker.record(False)
+    _, first = breaker.wait()
+    breaker.release(first)
+    _, second = breaker.wait()
+    assert second is not None and second != first
+    # The released token can no longer settle the circuit
+    breaker.record(True, first)
+    assert breaker.probe == second
+
+def test_fetch_does_not_count_local_errors_against_the_host():
+    limiter = AdaptiveRateLimiter(requests_per_second=1000.0)
+    state = limiter.host_state(URL)
+    rate = state.bucket.rate
+
+    def broken_cache():
+        raise OSError("No space left on device")
+
+    for _ in range(10):
+        with pytest.raises(OSError):
+            limiter.fetch(URL, broken_cache)
+    assert state.bucket.rate == rate
+    assert not state.breaker.outcomes
+    assert state.breaker.trips == 0
+
+def test_local_error_during_probe_frees_it():
+    limiter = AdaptiveRateLimiter(requests_per_second=1000.0)
+    breaker = limiter.host_state(URL).breaker
+    breaker.cooldown = 0.01
+    breaker.open_until = time.monotonic()
+
+    def broken_cache():
+        raise OSError("No space left on device")
+
+    with pytest.raises(OSError):
+        limiter.fetch(URL, broken_cache)
+    assert breaker.probe is None
+    assert limiter.fetch(URL, lambda: 'page') == 'page'
+    assert breaker.open_until is None
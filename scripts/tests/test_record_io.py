@@ -0,0 +1,90 @@
+import json
+import threading
+import time
+
+import pytest
+
+from record_io import RecordWriter, count_records, read_records, writing_marker
+
+RECORDS = [{'slug': 'the-cobbler', 'title': 'The Cobbler', 'distance': 11.2},
+           {'slug': 'ben-nevis', 'title': 'Ben Nevis – Mountain Track', 'tags': ['munro', 'popular']},
+           {'slug': 'quiraing', 'nested': {'region': 'Skye', 'grades': [1, 2]}}]
+
+@pytest.mark.parametrize('name', ['walks.json', 'walks.jsonl'])
+def test_round_trip(tmp_path, name):
+    path = str(tmp_path / name)
+    with RecordWriter(path) as writer:
+        for record in RECORDS:
+            writer.write(record)
+    assert writer.count == 3
+    assert list(read_records(path)) == RECORDS
+    assert count_records(path) == 3
+
+def test_json_array_layout_matches_json_dump(tmp_path):
+    path = tmp_path / 'walks.json'
+    with RecordWriter(str(path)) as writer:
+        for record in RECORDS:
+            writer.write(record)
+    assert path.read_text(encoding='utf-8') == json.dumps(RECORDS, indent=2, ensure_ascii=False)
+
+@pytest.mark.parametrize('name', ['empty.json', 'empty.jsonl'])
+def test_empty_files(tmp_path, name):
+    path = str(tmp_path / name)
+    RecordWriter(path).close()
+    assert list(read_records(path)) == []
+
+def test_writes_records_with_to_dict(tmp_path):
+    class Walk:
+        def to_dict(self):
+            return {'slug': 'schiehallion'}
+
+    path = str(tmp_path / 'walks.jsonl')
+    with RecordWriter(path) as writer:
+        writer.write(Walk())
+    assert list(read_records(path)) == [{'slug': 'schiehallion'}]
+
+def test_append_to_jsonl(tmp_path):
+    path = str(tmp_path / 'walks.jsonl')
+    with RecordWriter(path) as writer:
+        writer.write(RECORDS[0])
+    with RecordWriter(path, append=True) as writer:
+        writer.write(RECORDS[1])
+    assert list(read_records(path)) == RECORDS[:2]
+
+def test_json_arrays_cannot_be_appended_or_followed(tmp_path):
+    path = str(tmp_path / 'walks.json')
+    with pytest.raises(ValueError):
+        RecordWriter(path, append=True)
+    with RecordWriter(path) as writer:
+        writer.write(RECORDS[0])
+    with pytest.raises(ValueError):
+        list(read_records(path, follow=True))
+
+def test_marker_exists_only_while_writing(tmp_path):
+    path = str(tmp_path / 'walks.jsonl')
+    writer = RecordWriter(path)
+    assert (tmp_path / 'walks.jsonl.writing').exists()
+    writer.close()
+    assert not (tmp_path / 'walks.jsonl.writing').exists()
+    assert writing_marker(path) == f"{path}.writing"
+
+def test_follow_reads_records_while_they_are_written(tmp_path):
+    path = str(tmp_path / 'walks.jsonl')
+    writer = RecordWriter(path)
+
+    def produce():
+        for record in RECORDS:
+            time.sleep(0.02)
+            writer.write(record)
+        # Half a record left unterminated until the writer finishes it
+        writer.file.write('{"slug": "last"')
+        writer.file.flush()
+        time.sleep(0.02)
+        writer.file.write('}\n')
+        writer.close()
+
+    producer = threading.Thread(target=produce)
+    producer.start()
+    followed = list(read_records(path, follow=True, poll_interval=0.005))
+    producer.join()
+    assert followed == RECORDS + [{'slug': 'last'}]
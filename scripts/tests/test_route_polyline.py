@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+
+from route_polyline import (ZOOM_BANDS, douglas_peucker, encode_polyline, polyline_points, project, quantise,
+                            route_polylines)
+
+def decode_polyline(line):
+    """Latitude/longitude pairs of an encoded polyline, by the format's reference algorithm"""
+    values, value, shift = [], 0, 0
+    for character in line:
+        chunk = ord(character) - 63
+        value |= (chunk & 0x1f) << shift
+        shift += 5
+        if chunk < 0x20:
+            values.append(~(value >> 1) if value & 1 else value >> 1)
+            value, shift = 0, 0
+    return (np.cumsum(np.array(values).reshape(-1, 2), axis=0) / 1e5).tolist()
+
+def reference_douglas_peucker(x, y, tolerance, first=0, last=None):
+    """Indices kept by the textbook recursive Douglas-Peucker"""
+    last = len(x) - 1 if last is None else last
+    if last - first < 2:
+        return [first, last]
+    chord_x, chord_y = x[last] - x[first], y[last] - y[first]
+    chord = np.hypot(chord_x, chord_y)
+    offset_x, offset_y = x[first + 1:last] - x[first], y[first + 1:last] - y[first]
+    if chord > 0:
+        distances = np.abs(chord_x * offset_y - chord_y * offset_x) / chord
+    else:
+        distances = np.hypot(offset_x, offset_y)
+    farthest = int(np.argmax(distances))
+    if distances[farthest] <= tolerance:
+        return [first, last]
+    split = first + 1 + farthest
+    return reference_douglas_peucker(x, y, tolerance, first, split)[:-1] + reference_douglas_peucker(x, y, tolerance, split, last)
+
+def wiggly_route(count=2000, seed=3):
+    rng = np.random.default_rng(seed)
+    steps = rng.normal(0, 1e-4, size=(count, 2)) + [5e-5, 2e-5]
+    return np.array([57.0, -5.0]) + np.cumsum(steps, axis=0)
+
+def test_encodes_reference_polyline():
+    points = np.array([[38.5, -120.2], [40.7, -120.95], [43.252, -126.453]])
+    assert encode_polyline(quantise(points)) == '_p~iF~ps|U_ulLnnqC_mqNvxq`@'
+
+def test_encoding_round_trips():
+    route = wiggly_route()
+    quantised = quantise(route)
+    line = encode_polyline(quantised)
+    assert np.allclose(decode_polyline(line), quantised / 1e5)
+    assert polyline_points(line) == len(quantised)
+
+def test_encodes_large_deltas_and_empty_lines():
+    points = np.array([[89.99999, 179.99999], [-89.99999, -179.99999], [0.0, 0.0]])
+    assert np.allclose(decode_polyline(encode_polyline(quantise(points))), points)
+    assert encode_polyline(quantise(np.zeros((0, 2)))) == ''
+
+def test_quantise_drops_repeated_points():
+    points = np.array([[57.0, -5.0], [57.000001, -5.000001], [57.0001, -5.0]])
+    assert quantise(points).tolist() == [[5700000, -500000], [5700010, -500000]]
+
+@pytest.mark.parametrize('tolerance', [0.5, 5.0, 50.0])
+def test_douglas_peucker_matches_recursive_reference(tolerance):
+    x, y = project(wiggly_route())
+    assert douglas_peucker(x, y, tolerance).tolist() == reference_douglas_peucker(x, y, tolerance)
+
+def test_douglas_peucker_keeps_points_within_tolerance():
+    x, y = project(wiggly_route())
+    kept = douglas_peucker(x, y, 10.0)
+    assert kept[0] == 0 and kept[-1] == len(x) - 1
+    # Every dropped point lies within the tolerance of the line between the kept points around it
+    for start, end in zip(kept[:-1], kept[1:]):
+        chord_x, chord_y = x[end] - x[start], y[end] - y[start]
+        offset_x, offset_y = x[start:end] - x[start], y[start:end] - y[start]
+        distances = np.abs(chord_x * offset_y - chord_y * offset_x) / np.hypot(chord_x, chord_y)
+        assert distances.max() <= 10.0 + 1e-9
+
+def test_douglas_peucker_short_and_closed_lines():
+    assert douglas_peucker(np.array([0.0, 1.0]), np.array([0.0, 1.0]), 1.0).tolist() == [0, 1]
+    # A loop back to its start keeps its farthest point
+    x, y = np.array([0.0, 50.0, 100.0, 50.0, 0.0]), np.array([0.0, 20.0, 0.0, -20.0, 0.0])
+    assert 2 in douglas_peucker(x, y, 1.0)
+
+def test_coarser_bands_have_fewer_points():
+    segments = [wiggly_route(), wiggly_route(500, seed=4)]
+    polylines = route_polylines(segments)
+    assert set(polylines) == set(ZOOM_BANDS)
+    assert all(len(lines) == 2 for lines in polylines.values())
+    counts = {name: sum(polyline_points(line) for line in lines) for name, lines in polylines.items()}
+    assert counts['z9'] <= counts['z12'] <= counts['z15'] < 2500
+    # Every band keeps the route's end points
+    for lines in polylines.values():
+        decoded = decode_polyline(lines[0])
+        assert np.allclose(decoded[0], segments[0][0], atol=1e-5)
+        assert np.allclose(decoded[-1], segments[0][-1], atol=1e-5)
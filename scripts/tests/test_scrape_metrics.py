@@ -0,0 +1,59 @@
+import requests
+
+from page_archive import PageArchive, ReplaySession
+from scrape_metrics import Histogram, ScrapeMetrics
+
+URL = 'https://www.walkhighlands.co.uk/skye/quiraing.shtml'
+PAGE = b'<html><body><h1>The Quiraing</h1></body></html>'
+
+def replay_session(tmp_path, **kwargs):
+    path = str(tmp_path / 'pages.zip')
+    archive = PageArchive(path, 'a')
+    archive.add(URL, 200, {'ETag': '"v1"'}, PAGE)
+    archive.close()
+    return ReplaySession(PageArchive(path), **kwargs)
+
+def counter(metrics, key):
+    return metrics.summary()['counters'].get(key, 0)
+
+def test_histogram_quantiles():
+    histogram = Histogram([0.1, 1.0, 10.0])
+    for value in (0.05, 0.5, 0.5, 5.0):
+        histogram.observe(value)
+    assert histogram.quantile(0.25) == 0.1
+    assert histogram.quantile(0.5) == 1.0
+    assert histogram.quantile(1.0) == 10.0
+    histogram.observe(100.0)
+    assert histogram.quantile(1.0) is None
+
+def test_replayed_responses_are_counted(tmp_path):
+    metrics = ScrapeMetrics()
+    session = metrics.instrument(replay_session(tmp_path, latency=0.01))
+    assert session.get(URL).content == PAGE
+    assert session.get(URL, headers={'If-None-Match': '"v1"'}).status_code == 304
+    assert session.get('https://www.walkhighlands.co.uk/missing.shtml').status_code == 404
+
+    assert counter(metrics, 'responses_total[200]') == 1
+    assert counter(metrics, 'responses_total[304]') == 1
+    assert counter(metrics, 'responses_total[404]') == 1
+    assert counter(metrics, 'response_bytes_total') == len(PAGE)
+    response_seconds = metrics.summary()['histograms']['response_seconds']
+    assert response_seconds['count'] == 3
+    assert response_seconds['sum'] >= 0.03
+
+def test_simulated_errors_are_counted(tmp_path):
+    metrics = ScrapeMetrics()
+    session = metrics.instrument(replay_session(tmp_path, error_rate=1.0, seed=1))
+    statuses = []
+    for _ in range(20):
+        try:
+            statuses.append(session.get(URL).status_code)
+        except requests.ConnectionError:
+            statuses.append(None)
+    # Dropped connections never produce a response, just as on the network
+    assert counter(metrics, 'responses_total[503]') == statuses.count(503) > 0
+    assert None in statuses
+
+def test_live_session_is_instrumented():
+    session = ScrapeMetrics().instrument(requests.Session())
+    assert session.hooks['response'][-1].__name__ == 'response_hook'
@@ -0,0 +1,47 @@
+from page_archive import PageArchive, ReplaySession
+from scrape_walkhighlands import WalkHighlandsScraper
+
+BASE = 'https://www.walkhighlands.co.uk'
+
+HOME = b'''<html><body>
+<a href="/skye/">Skye</a> <a href="/mull/">Mull</a> <a href="/forum/">Forum</a>
+<a href="https://www.walkhighlands.co.uk/about/">About us</a> <a href="/shop/">Shop</a>
+<a href="/skye/quiraing.shtml">The Quiraing</a> <a href="https://www.facebook.com/walkhighlands/">Facebook</a>
+</body></html>'''
+
+def walk_table(*walks):
+    rows = ''.join(f'<tr><td><a href="{href}">{title}</a></td><td><img src="boot.gif"></td><td>5km</td></tr>'
+                   for href, title in walks)
+    return f'<html><body><table>{rows}</table></body></html>'.encode('utf-8')
+
+PAGES = {
+    f'{BASE}/': HOME,
+    f'{BASE}/skye/': walk_table(('quiraing.shtml', 'The Quiraing')),
+    f'{BASE}/mull/': walk_table(('ben-more.shtml', 'Ben More')),
+    # Non-region sections link to .shtml pages too, some of which list walks
+    f'{BASE}/forum/': b'<html><body><a href="rules.shtml">Rules</a> <a href="latest.shtml">Latest</a></body></html>',
+    f'{BASE}/forum/latest.shtml': walk_table(('/mull/ben-more.shtml', 'Ben More'),
+                                             ('/torridon/liathach.shtml', 'Liathach')),
+    f'{BASE}/about/': b'<html><body><a href="team.shtml">Our team</a></body></html>',
+}
+
+def scraper(tmp_path):
+    path = str(tmp_path / 'pages.zip')
+    archive = PageArchive(path, 'a')
+    for url, content in PAGES.items():
+        archive.add(url, 200, {}, content)
+    archive.close()
+    scraper = WalkHighlandsScraper(requests_per_second=1000.0, burst=10)
+    scraper.priority_regions = ['skye']
+    scraper.session = scraper.metrics.instrument(ReplaySession(PageArchive(path)))
+    return scraper
+
+def test_only_region_pages_become_regions(tmp_path):
+    assert scraper(tmp_path).discover_regions() == ['skye', 'mull']
+
+def test_crawl_skips_non_region_sections(tmp_path):
+    walks = scraper(tmp_path).crawl_catalogue(max_pages=50)
+    assert {walk.source_url: walk.region for walk in walks} == {
+        f'{BASE}/skye/quiraing.shtml': 'Skye',
+        f'{BASE}/mull/ben-more.shtml': 'Mull',
+    }
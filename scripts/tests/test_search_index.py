@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+import search_index
+from search_index import SearchIndex, merge_postings, stem
+
+WALKS = [
+    {'slug': 'fairy-glen', 'title': "The Fairy Glen", 'description': "Grassy cones and a tiny loch", 'tags': ['skye'],
+     'difficulty': 'Easy', 'distance': 1.5, 'viewCount': 40},
+    {'slug': 'glen-nevis', 'title': "Glen Nevis gorge", 'description': "Waterfalls below Ben Nevis", 'tags': [],
+     'difficulty': 'Moderate', 'distance': 3.0, 'viewCount': 90},
+    {'slug': 'ben-nevis', 'title': "Ben Nevis by the Mountain Track", 'description': "The highest summit",
+     'tags': ['munro'], 'difficulty': 'Strenuous', 'distance': 17.0, 'viewCount': 99},
+    {'slug': 'loch-an-eilein', 'title': "Loch an Eilein", 'description': "A castle on an island in the loch",
+     'tags': ['castle'], 'difficulty': 'Easy', 'distance': 6.0, 'viewCount': 10},
+]
+
+@pytest.fixture
+def index():
+    return SearchIndex.from_walks(WALKS)
+
+def slugs(results):
+    return [result['slug'] for result in results]
+
+def test_stem():
+    assert stem('waterfalls') == stem('waterfall')
+    assert stem('walking') == 'walk'
+
+def test_title_matches_rank_first(index):
+    # The shorter title weighs its match more
+    assert slugs(index.search('nevis')) == ['glen-nevis', 'ben-nevis']
+    assert slugs(index.search('fairy glen'))[0] == 'fairy-glen'
+
+def test_last_word_matches_as_prefix(index):
+    assert 'glen-nevis' in slugs(index.search('waterf'))
+
+def test_filters(index):
+    assert slugs(index.search('loch', difficulty='Easy', min_distance=2)) == ['loch-an-eilein']
+    assert slugs(index.search('loch')) == ['loch-an-eilein', 'fairy-glen']
+    assert index.search('loch', max_distance=1) == []
+    assert index.search('the') == []
+    assert index.search('zzzz') == []
+
+def test_merge_postings():
+    first = (np.array([1, 4, 7]), np.array([0.5, 1.0, 2.0]))
+    second = (np.array([4, 9]), np.array([3.0, 1.0]))
+    ids, weights = merge_postings([first, second], np.add)
+    assert ids.tolist() == [1, 4, 7, 9]
+    assert weights.tolist() == [0.5, 4.0, 2.0, 1.0]
+    ids, weights = merge_postings([first, second], np.maximum)
+    assert weights.tolist() == [0.5, 3.0, 2.0, 1.0]
+
+@pytest.mark.parametrize('query', ['nevis', 'glen', 'loch castle', 'ben nev', 'fairy glen', 'the highest sum'])
+def test_sparse_and_dense_scoring_agree(index, monkeypatch, query):
+    monkeypatch.setattr(search_index, 'SPARSE_QUERY_FRACTION', 0)
+    sparse = index.search(query)
+    monkeypatch.setattr(search_index, 'SPARSE_QUERY_FRACTION', 10 ** 9)
+    dense = index.search(query)
+    assert sparse == dense
+    assert sparse
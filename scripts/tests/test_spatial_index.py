@@ -0,0 +1,86 @@
+import json
+import math
+
+import numpy as np
+import pytest
+
+from spatial_index import EARTH_RADIUS_KM, SpatialIndex, build_spatial_index, geohash_encode
+
+def random_walks(count, seed=5):
+    rng = np.random.default_rng(seed)
+    latitudes = rng.uniform(54.6, 60.8, count)
+    longitudes = rng.uniform(-7.6, -0.8, count)
+    return [{'slug': f"walk-{i}", 'latitude': float(lat), 'longitude': float(lon)}
+            for i, (lat, lon) in enumerate(zip(latitudes, longitudes))]
+
+def great_circle_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+def brute_force_distances(walks, latitude, longitude):
+    latitudes = np.array([walk['latitude'] for walk in walks])
+    longitudes = np.array([walk['longitude'] for walk in walks])
+    return great_circle_km(latitude, longitude, latitudes, longitudes)
+
+@pytest.fixture(scope='module')
+def walks():
+    return random_walks(3000)
+
+@pytest.fixture(scope='module')
+def index(walks):
+    return SpatialIndex(walks)
+
+def test_geohash_reference_values():
+    assert geohash_encode(57.64911, 10.40744, 11) == 'u4pruydqqvj'
+    assert geohash_encode(42.605, -5.603, 5) == 'ezs42'
+    assert geohash_encode(56.7969, -5.0037, 7).startswith(geohash_encode(56.7969, -5.0037, 5))
+
+@pytest.mark.parametrize('point', [(56.7969, -5.0037), (57.5, -4.2), (60.5, -1.2), (55.0, -7.5)])
+def test_nearest_matches_brute_force(walks, index, point):
+    distances = brute_force_distances(walks, *point)
+    expected = [f"walk-{i}" for i in np.argsort(distances)[:10]]
+    results = index.nearest(*point, k=10)
+    assert [result['slug'] for result in results] == expected
+    assert results[0]['distance_km'] == pytest.approx(distances.min(), abs=1e-3)
+
+@pytest.mark.parametrize('radius_km', [1.0, 15.0, 60.0])
+def test_within_radius_matches_brute_force(walks, index, radius_km):
+    distances = brute_force_distances(walks, 57.5, -4.2)
+    expected = {f"walk-{i}" for i in np.flatnonzero(distances <= radius_km)}
+    results = index.within_radius(57.5, -4.2, radius_km)
+    assert {result['slug'] for result in results} == expected
+    assert [result['distance_km'] for result in results] == sorted(result['distance_km'] for result in results)
+
+def test_bounding_box(walks, index):
+    expected = {walk['slug'] for walk in walks
+                if 56.5 <= walk['latitude'] <= 57.0 and -5.5 <= walk['longitude'] <= -4.5}
+    assert set(index.in_bbox(56.5, -5.5, 57.0, -4.5)) == expected
+    assert index.in_bbox(50.0, -5.0, 51.0, -4.0) == []
+
+def test_bounding_box_across_antimeridian():
+    walks = [{'slug': 'fiji', 'latitude': -17.8, 'longitude': 178.4},
+             {'slug': 'samoa', 'latitude': -13.8, 'longitude': -171.8},
+             {'slug': 'nz', 'latitude': -41.3, 'longitude': 174.8}]
+    index = SpatialIndex(walks)
+    assert sorted(index.in_bbox(-20.0, 175.0, -10.0, -170.0)) == ['fiji', 'samoa']
+    # Nearest across the antimeridian is measured the short way round
+    assert index.nearest(-15.0, 179.9, k=1)[0]['slug'] == 'fiji'
+
+def test_walks_without_coordinates_are_skipped():
+    index = SpatialIndex([{'slug': 'a', 'latitude': 57.0, 'longitude': -4.0}, {'slug': 'b', 'latitude': None}])
+    assert len(index) == 1
+    assert [result['slug'] for result in index.nearest(57.0, -4.0, k=5)] == ['a']
+
+def test_build_writes_neighbours(tmp_path):
+    walks = random_walks(50)
+    input_file, output_file = tmp_path / 'walks.json', tmp_path / 'index.json'
+    input_file.write_text(json.dumps(walks))
+    build_spatial_index(str(input_file), str(output_file), neighbours=3)
+    records = json.loads(output_file.read_text())
+    assert len(records) == 50
+    first = records[0]
+    assert len(first['nearby']) == 3
+    assert first['slug'] not in {neighbour['slug'] for neighbour in first['nearby']}
+    assert len(first['geohash']) == 7
+    assert math.isclose(first['latitude'], walks[0]['latitude'])
@@ -0,0 +1,65 @@
+import numpy as np
+
+from walk_dedupe import MinHasher, UnionFind, WalkDeduplicator, shingles, similarity
+
+SUMMARY = ("A fine circuit from the village climbing through birch woods to the open ridge, "
+           "with views across the loch to the Cuillin before a steep descent by the burn.")
+STAGES = [{'stage': 1, 'description': "From the car park follow the track north past the church to a gate."},
+          {'stage': 2, 'description': "Climb the path beside the wall to the cairn and return by the same way."}]
+
+def walk(url, title, summary='', stages=None):
+    return {'source_url': f"https://www.walkhighlands.co.uk/{url}", 'title': title, 'summary': summary,
+            'stages': stages or []}
+
+def merged(walks):
+    return {(merge['position'], merge['merged_into_position'], merge['reason'])
+            for merge in WalkDeduplicator().find_duplicates(walks)}
+
+def test_shingles_are_distinct_word_trigrams():
+    assert len(shingles("one two three four")) == 2
+    assert len(shingles("one two three one two three")) == 3
+    assert len(shingles("two words")) == 2
+    assert len(shingles("")) == 0
+
+def test_minhash_estimates_jaccard_similarity():
+    hasher = MinHasher(num_perm=256)
+    first = np.arange(1000, dtype=np.uint64)
+    second = np.arange(500, 1500, dtype=np.uint64)
+    signatures = hasher.signatures([first, second, first])
+    assert similarity(signatures[0], signatures[2]) == 1.0
+    # True Jaccard similarity is 500 / 1500
+    assert abs(similarity(signatures[0], signatures[1]) - 1 / 3) < 0.1
+
+def test_union_find_keeps_earliest_root():
+    groups = UnionFind(4)
+    groups.union(3, 1)
+    groups.union(2, 3)
+    assert [groups.find(i) for i in range(4)] == [0, 1, 1, 1]
+
+def test_relisted_walk_is_merged_into_first():
+    walks = [walk('skye/quiraing.shtml', "The Quiraing", SUMMARY, STAGES),
+             walk('skye/other.shtml', "Loch Coruisk", "A different walk to a remote loch under the Cuillin ridge."),
+             walk('skye/quiraing-circuit.shtml', "Quiraing circuit", SUMMARY, STAGES)]
+    assert merged(walks) == {(2, 0, 'near_duplicate')}
+
+def test_same_url_is_merged():
+    walks = [walk('skye/quiraing.shtml', "The Quiraing", SUMMARY),
+             walk('skye/quiraing.shtml?ref=list', "The Quiraing (Trotternish)", "")]
+    assert merged(walks) == {(1, 0, 'same_url')}
+
+def test_walks_without_text_are_not_merged():
+    walks = [walk('skye/a.shtml', ''), walk('skye/b.shtml', '')]
+    assert merged(walks) == set()
+
+def test_fallback_titles_are_not_merged():
+    walks = [walk('skye/c.shtml', "Unknown Walk"), walk('fortwilliam/d.shtml', "Unknown Walk")]
+    assert merged(walks) == set()
+
+def test_walks_are_not_merged_on_title_alone():
+    walks = [walk('skye/glen.shtml', "Circuit of the glen and the old mill"),
+             walk('perthshire/glen.shtml', "Circuit of the glen and the old mill")]
+    assert merged(walks) == set()
+
+def test_short_texts_are_not_compared():
+    walks = [walk('skye/e.shtml', "Ben", "Steep."), walk('lochlomond/f.shtml', "Ben", "Steep.")]
+    assert merged(walks) == set()
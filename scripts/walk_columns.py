@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Columnar export of the converted walk catalogue for analytics.
+Numeric fields become columns of a NumPy structured array, text fields become ids into
+a shared string table, and stages and tags get tables of their own keyed by walk row.
+Every file is memory-mapped when loaded, so aggregates are vectorised over the columns
+instead of looping over JSON records.
+
+Usage: python walk_columns.py converted_priority_walks.json [walk_columns]
+       python walk_columns.py walk_columns    (statistics of an existing export)
+"""
+
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from walk_records import ConvertedWalk, read_walks
+
+# Numeric fields; missing values are NaN in float columns
+NUMERIC_COLUMNS = [
+    ('distance', 'f8'), ('ascent', 'f8'), ('estimatedTime', 'f8'), ('latitude', 'f8'), ('longitude', 'f8'),
+    ('maxElevation', 'f8'), ('averageRating', 'f8'), ('bogFactor', 'f8'), ('viewCount', 'i4'), ('likeCount', 'i4'),
+    ('reportCount', 'i4'), ('isPublished', '?'), ('scraped_at', 'f8'), ('converted_at', 'f8')
+]
+
+# Text fields, stored as string table ids (-1 when missing)
+STRING_COLUMNS = [
+    'title', 'slug', 'regionSlug', 'difficulty', 'routeType', 'sourceUrl', 'terrain', 'startGridRef',
+    'originalRegion', 'publishedAt', 'featuredImageUrl', 'shortDescription', 'description', 'detailedDescription'
+]
+
+WALK_DTYPE = np.dtype(NUMERIC_COLUMNS + [(name, 'i4') for name in STRING_COLUMNS])
+STAGE_DTYPE = np.dtype([('walk', 'i4'), ('stage', 'i4'), ('description', 'i4'), ('original_length', 'i4')])
+TAG_DTYPE = np.dtype([('walk', 'i4'), ('tag', 'i4')])
+
+# Files making up an export directory
+COLUMN_FILES = ['walks.npy', 'stages.npy', 'tags.npy', 'strings.npy', 'strings.bin']
+
+class ColumnBuilder:
+    """Collects walks one at a time and writes the columnar export once they are all seen"""
+
+    def __init__(self):
+        self.rows: List[tuple] = []
+        self.stage_rows: List[tuple] = []
+        self.tag_rows: List[tuple] = []
+        self.string_ids: Dict[str, int] = {}
+
+    def string_id(self, value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        string_id = self.string_ids.get(value)
+        if string_id is None:
+            string_id = self.string_ids[value] = len(self.string_ids)
+        return string_id
+
+    def add(self, walk: ConvertedWalk):
+        """Add a converted walk (a record or its dict)"""
+        index = len(self.rows)
+        numbers = []
+        for name, kind in NUMERIC_COLUMNS:
+            value = walk.get(name)
+            if kind == 'f8':
+                numbers.append(np.nan if value is None else float(value))
+            else:
+                numbers.append(value or 0)
+        self.rows.append(tuple(numbers) + tuple(self.string_id(walk.get(name)) for name in STRING_COLUMNS))
+
+        for i, stage in enumerate(walk.get('stages') or []):
+            self.stage_rows.append((index, stage.get('stage') or i + 1, self.string_id(stage.get('description')),
+                                    stage.get('original_length') or 0))
+        for tag in walk.get('tags') or []:
+            self.tag_rows.append((index, self.string_id(tag)))
+
+    def save(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, 'walks.npy'), np.array(self.rows, dtype=WALK_DTYPE))
+        np.save(os.path.join(directory, 'stages.npy'), np.array(self.stage_rows, dtype=STAGE_DTYPE))
+        np.save(os.path.join(directory, 'tags.npy'), np.array(self.tag_rows, dtype=TAG_DTYPE))
+
+        # The string table is one UTF-8 blob with an offsets array, string i being blob[offsets[i]:offsets[i + 1]]
+        encoded = [value.encode('utf-8') for value in self.string_ids]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        np.save(os.path.join(directory, 'strings.npy'), offsets)
+        with open(os.path.join(directory, 'strings.bin'), 'wb') as f:
+            f.write(b''.join(encoded))
+        print(f"Saved columns of {len(self.rows)} walks, {len(self.stage_rows)} stages and "
+              f"{len(self.string_ids)} strings to {directory}")
+
+class WalkColumns:
+    """A columnar export, memory-mapped"""
+
+    def __init__(self, directory: str, mmap: bool = True):
+        mode = 'r' if mmap else None
+        self.walks = np.load(os.path.join(directory, 'walks.npy'), mmap_mode=mode)
+        self.stages = np.load(os.path.join(directory, 'stages.npy'), mmap_mode=mode)
+        self.tags = np.load(os.path.join(directory, 'tags.npy'), mmap_mode=mode)
+        self.offsets = np.load(os.path.join(directory, 'strings.npy'), mmap_mode=mode)
+        blob_path = os.path.join(directory, 'strings.bin')
+        # An empty file cannot be memory-mapped
+        if mmap and os.path.getsize(blob_path):
+            self.blob = np.memmap(blob_path, dtype=np.uint8, mode='r')
+        else:
+            self.blob = np.fromfile(blob_path, dtype=np.uint8)
+
+    def __len__(self) -> int:
+        return len(self.walks)
+
+    def string(self, string_id: int) -> Optional[str]:
+        if string_id < 0:
+            return None
+        return self.blob[self.offsets[string_id]:self.offsets[string_id + 1]].tobytes().decode('utf-8')
+
+    def strings(self, name: str) -> List[Optional[str]]:
+        """A text column decoded"""
+        return [self.string(string_id) for string_id in self.walks[name]]
+
+    def categories(self, name: str) -> Tuple[List[str], np.ndarray]:
+        """Distinct values of a text column ('' for missing) and each walk's index into them"""
+        ids, inverse = np.unique(self.walks[name], return_inverse=True)
+        return [self.string(string_id) or '' for string_id in ids], inverse
+
+    def group_counts(self, name: str) -> Dict[str, int]:
+        """Walks per value of a text column"""
+        labels, inverse = self.categories(name)
+        return dict(zip(labels, np.bincount(inverse, minlength=len(labels)).tolist()))
+
+    def group_means(self, by: str, value: str) -> Dict[str, float]:
+        """Mean of a numeric column per value of a text column, ignoring missing values"""
+        labels, inverse = self.categories(by)
+        values = self.walks[value].astype(float)
+        present = ~np.isnan(values)
+        totals = np.bincount(inverse[present], weights=values[present], minlength=len(labels))
+        counts = np.bincount(inverse[present], minlength=len(labels))
+        return {
+            label: round(float(total / count), 2)
+            for label, total, count in zip(labels, totals, counts) if count
+        }
+
+def catalogue_stats(columns: WalkColumns) -> Dict:
+    """The converter's summary statistics, plus per-group means, computed over the columns"""
+    return {
+        'walks': len(columns),
+        'regions': columns.group_counts('regionSlug'),
+        'difficulties': columns.group_counts('difficulty'),
+        'total_stages': len(columns.stages),
+        'mean_ascent_by_region': columns.group_means('regionSlug', 'ascent'),
+        'mean_distance_by_difficulty': columns.group_means('difficulty', 'distance')
+    }
+
+def export_columns(walks: Iterable[ConvertedWalk], directory: str) -> int:
+    """Write the columnar export of converted walks, returning how many were written"""
+    builder = ColumnBuilder()
+    for walk in walks:
+        builder.add(walk)
+    builder.save(directory)
+    return len(builder.rows)
+
+def print_catalogue_stats(stats: Dict):
+    avg_stages = stats['total_stages'] / stats['walks'] if stats['walks'] else 0
+    print(f"\nStatistics:")
+    print(f"- Average stages per walk: {avg_stages:.1f}")
+    print(f"- Regions: {dict(sorted(stats['regions'].items()))}")
+    print(f"- Difficulties: {dict(sorted(stats['difficulties'].items()))}")
+    print(f"- Mean ascent by region: {dict(sorted(stats['mean_ascent_by_region'].items()))}")
+    print(f"- Mean distance by difficulty: {dict(sorted(stats['mean_distance_by_difficulty'].items()))}")
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export converted walks to memory-mappable columns")
+    parser.add_argument('source', help="Converted walks (.json array or .jsonl), or an existing export directory")
+    parser.add_argument('output_dir', nargs='?', default='walk_columns', help="Directory for the export")
+    args = parser.parse_args()
+
+    directory = args.source
+    if not os.path.isdir(args.source):
+        export_columns(read_walks(args.source, ConvertedWalk), args.output_dir)
+        directory = args.output_dir
+
+    print_catalogue_stats(catalogue_stats(WalkColumns(directory)))
+
+if __name__ == "__main__":
+    main()
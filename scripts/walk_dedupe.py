@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate detection across scraped walks, between scraping and conversion.
+Each walk's title, summary and stage text is reduced to a MinHash signature, and
+locality-sensitive hashing over bands of the signatures finds candidate pairs in
+near-linear time, so renamed or re-listed walks are merged before they are
+converted and uploaded twice. Walks at the same normalised URL are always merged;
+walks with only a title, or too little text to compare, are merged by URL alone.
+
+Usage: python walk_dedupe.py detailed_walks_all.json [detailed_walks_unique.json] [--merges walk_merges.jsonl]
+"""
+
+import re
+import zlib
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from frontier import normalize_url
+from record_io import RecordWriter, read_records
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+# Multiplier combining the word hashes of an n-gram (arithmetic wraps modulo 2**64)
+SHINGLE_MULTIPLIER = np.uint64(1099511628211)
+
+def walk_body(walk: Dict) -> str:
+    """Summary (or listing description) and stage text of a walk record"""
+    parts = [walk.get('summary') or walk.get('description') or '']
+    parts.extend(stage.get('description') or '' for stage in walk.get('stages') or [])
+    return ' '.join(parts)
+
+def walk_text(walk: Dict) -> str:
+    """Title, summary (or listing description) and stage text of a walk record"""
+    return f"{walk.get('title') or ''} {walk_body(walk)}"
+
+def shingles(text: str, size: int = 3, word_hashes: Optional[Dict[str, int]] = None) -> np.ndarray:
+    """Distinct 64-bit hashes of the overlapping word n-grams of a text (single words for very
+    short texts). word_hashes caches each word's hash across calls."""
+    if word_hashes is None:
+        word_hashes = {}
+    words = TOKEN_RE.findall(text.lower())
+    for word in set(words).difference(word_hashes):
+        word_hashes[word] = zlib.crc32(word.encode('utf-8'))
+    hashes = np.array([word_hashes[word] for word in words], dtype=np.uint64)
+    if len(words) < size:
+        return np.unique(hashes)
+
+    count = len(words) - size + 1
+    grams = hashes[:count].copy()
+    for offset in range(1, size):
+        grams = grams * SHINGLE_MULTIPLIER + hashes[offset:offset + count]
+    return np.unique(grams)
+
+class MinHasher:
+    """MinHash signatures under num_perm random multiply-shift hash functions of the shingles"""
+
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        # Odd multipliers; the top 32 bits of a * x + b are a universal hash of x
+        self.a = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self.b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+
+    def signatures(self, shingle_sets: List[np.ndarray], batch_size: int = 32) -> np.ndarray:
+        """One signature row per shingle set, computed a batch of sets at a time (small
+        batches keep the hashed block in cache)"""
+        result = np.full((len(shingle_sets), self.num_perm), 2 ** 32, dtype=np.uint64)
+        for start in range(0, len(shingle_sets), batch_size):
+            batch = shingle_sets[start:start + batch_size]
+            lengths = np.array([len(hashes) for hashes in batch])
+            nonempty = np.flatnonzero(lengths)
+            if not len(nonempty):
+                continue
+            values = np.concatenate([batch[i] for i in nonempty])
+            hashed = (self.a[:, None] * values[None, :] + self.b[:, None]) >> np.uint64(32)
+            offsets = np.concatenate(([0], np.cumsum(lengths[nonempty])[:-1]))
+            result[start + nonempty] = np.minimum.reduceat(hashed, offsets, axis=1).T
+        return result
+
+def similarity(first: np.ndarray, second: np.ndarray) -> float:
+    """Estimated Jaccard similarity of the shingle sets behind two signatures"""
+    return float(np.mean(first == second))
+
+class UnionFind:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, item: int) -> int:
+        root = item
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[item] != root:
+            self.parent[item], item = root, self.parent[item]
+        return root
+
+    def union(self, first: int, second: int):
+        """Join two sets, keeping the earlier root so each group is named by its first item"""
+        first, second = self.find(first), self.find(second)
+        if second < first:
+            first, second = second, first
+        self.parent[second] = first
+
+class WalkDeduplicator:
+    """Finds walks that are the same walk, by URL or by near-identical text"""
+
+    def __init__(self, threshold: float = 0.6, num_perm: int = 128, bands: int = 32, shingle_size: int = 3,
+                 min_shingles: int = 3):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.threshold = threshold
+        self.min_shingles = min_shingles  # fewer than this, and two walks' texts match by chance
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.hasher = MinHasher(num_perm)
+
+    def candidate_pairs(self, signatures: np.ndarray) -> Set[Tuple[int, int]]:
+        """Pairs of walks sharing a bucket in at least one band. Each bucket member is paired with the
+        bucket's first walk only, which keeps a bucket of many copies linear rather than quadratic."""
+        pairs = set()
+        for band in range(self.bands):
+            first_in_bucket: Dict[bytes, int] = {}
+            rows = signatures[:, band * self.rows:(band + 1) * self.rows]
+            for i, row in enumerate(rows):
+                first = first_in_bucket.setdefault(row.tobytes(), i)
+                if first != i:
+                    pairs.add((first, i))
+        return pairs
+
+    def find_duplicates(self, walks: List[Dict]) -> List[Dict]:
+        """Merge decisions: each duplicate walk and the earliest walk of its group, which is kept"""
+        word_hashes: Dict[str, int] = {}
+        shingle_sets = [shingles(walk_text(walk), self.shingle_size, word_hashes) for walk in walks]
+        signatures = self.hasher.signatures(shingle_sets)
+        # Empty or fallback texts ("Unknown Walk") give identical signatures, and a shared title
+        # alone does not make two walks the same, so only walks with enough body text are compared
+        comparable = np.array([len(hashes) >= self.min_shingles and bool(walk_body(walk).strip())
+                               for walk, hashes in zip(walks, shingle_sets)], dtype=bool)
+        compared = np.flatnonzero(comparable)
+        urls = [normalize_url(walk['source_url']) if walk.get('source_url') else None for walk in walks]
+        groups = UnionFind(len(walks))
+
+        # Listings and detail pages reached by different paths share a URL
+        first_with_url: Dict[str, int] = {}
+        for i, url in enumerate(urls):
+            if url:
+                groups.union(first_with_url.setdefault(url, i), i)
+
+        for first, second in self.candidate_pairs(signatures[compared]):
+            i, j = int(compared[first]), int(compared[second])
+            if similarity(signatures[i], signatures[j]) >= self.threshold:
+                groups.union(i, j)
+
+        merges = []
+        for i, walk in enumerate(walks):
+            kept = groups.find(i)
+            if kept == i:
+                continue
+            merges.append({
+                'position': i,
+                'source_url': walk.get('source_url'),
+                'title': walk.get('title'),
+                'merged_into_position': kept,
+                'merged_into': walks[kept].get('source_url'),
+                'merged_into_title': walks[kept].get('title'),
+                'similarity': round(similarity(signatures[i], signatures[kept]), 3),
+                'reason': 'same_url' if urls[i] and urls[i] == urls[kept] else 'near_duplicate'
+            })
+        return merges
+
+def dedupe_walks_file(input_file: str, output_file: str, merges_file: Optional[str] = None,
+                      deduplicator: Optional[WalkDeduplicator] = None) -> List[Dict]:
+    """Write the walks of input_file without duplicates, keeping the first of each group.
+    Returns the merge decisions, also written to merges_file when given."""
+    deduplicator = deduplicator or WalkDeduplicator()
+    walks = list(read_records(input_file))
+    print(f"Checking {len(walks)} walks for duplicates...")
+    merges = deduplicator.find_duplicates(walks)
+    duplicates = {merge['position'] for merge in merges}
+
+    with RecordWriter(output_file) as writer:
+        for i, walk in enumerate(walks):
+            if i not in duplicates:
+                writer.write(walk)
+
+    if merges_file:
+        with RecordWriter(merges_file) as merge_writer:
+            for merge in merges:
+                merge_writer.write(merge)
+
+    print(f"✓ Kept {writer.count} walks, merged {len(merges)} duplicates")
+    for merge in merges[:10]:
+        print(f"  = {merge['title']} → {merge['merged_into_title']} ({merge['reason']}, {merge['similarity']:.2f})")
+    return merges
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Merge near-duplicate scraped walks before conversion")
+    parser.add_argument('input_file', nargs='?', default='detailed_walks_all.json',
+                        help="Scraped walks (.json array or .jsonl)")
+    parser.add_argument('output_file', nargs='?', default='detailed_walks_unique.json',
+                        help="Walks without duplicates")
+    parser.add_argument('--merges', metavar='PATH', default='walk_merges.jsonl', help="Where merge decisions are written")
+    parser.add_argument('--threshold', type=float, default=0.6, help="Estimated Jaccard similarity to merge at")
+    parser.add_argument('--num-perm', type=int, default=128, help="MinHash permutations per signature")
+    parser.add_argument('--bands', type=int, default=32, help="LSH bands the signature is split into")
+    args = parser.parse_args()
+
+    deduplicator = WalkDeduplicator(threshold=args.threshold, num_perm=args.num_perm, bands=args.bands)
+    dedupe_walks_file(args.input_file, args.output_file, args.merges, deduplicator)
+
+if __name__ == "__main__":
+    main()
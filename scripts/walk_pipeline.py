@@ -0,0 +1,112 @@
+"""
+Producer/consumer pipeline for the detailed walk scraper.
+Fetcher threads put raw page bodies on a bounded queue, a process pool parses
+and extracts them on every core, and results are handed back to a single
+consumer in the calling thread. The bounded queue stops fetchers from running
+ahead of the parsers, so memory stays flat however many URLs are crawled.
+"""
+
+import os
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+
+from walk_records import DetailedWalk
+
+# Per-process scraper used by the parse workers
+_worker_scraper = None
+
+def init_parse_worker(parser_backend: str):
+    """Create the scraper each worker process extracts with"""
+    global _worker_scraper
+    from detailed_walk_scraper import DetailedWalkScraper
+    _worker_scraper = DetailedWalkScraper(concurrency=1, parser_backend=parser_backend)
+
+def parse_walk_page(walk_url: str, content: bytes) -> DetailedWalk:
+    """Parse a page body and extract its walk record (runs in a worker process)"""
+    from html_parsing import parse_html
+    soup = parse_html(content, _worker_scraper.parser_backend)
+    return _worker_scraper.extract_walk_details(soup, walk_url)
+
+class ScrapePipeline:
+    def __init__(self, scraper, parse_workers: Optional[int] = None, queue_size: int = 32):
+        self.scraper = scraper
+        self.parse_workers = parse_workers or os.cpu_count() or 1
+        self.queue_size = queue_size  # page bodies allowed to wait for a parser
+
+    def run(self, urls: List[str]) -> Iterator[Tuple[str, Optional[DetailedWalk], Optional[str]]]:
+        """Yield (url, walk_data, error) for every URL, in completion order"""
+        if not urls:
+            return
+
+        fetched = queue.Queue(maxsize=self.queue_size)
+        results = queue.Queue()
+        pending_urls = iter(urls)
+        url_lock = threading.Lock()
+        # Caps work handed to the pool, whose own queue is unbounded
+        in_flight = threading.BoundedSemaphore(self.parse_workers * 2)
+
+        def fetch_worker():
+            while True:
+                with url_lock:
+                    url = next(pending_urls, None)
+                if url is None:
+                    return
+                print(f"Scraping: {url}")
+                try:
+                    content = self.scraper.fetch_content(url)
+                    if not content:
+                        results.put((url, None, None))
+                        continue
+                    changed, fingerprint = self.scraper.page_changed(url, content)
+                    if not changed:
+                        results.put((url, None, None))
+                        continue
+                except Exception as e:
+                    results.put((url, None, str(e)))
+                    continue
+                # Blocks while the parsers are behind, which throttles fetching
+                fetched.put((url, content, fingerprint))
+
+        def parsed(future, url, fingerprint):
+            in_flight.release()
+            try:
+                walk_data = future.result()
+            except Exception as e:
+                results.put((url, None, str(e)))
+                return
+            if fingerprint:
+                self.scraper.fingerprints.update(url, fingerprint, walk_data.scraped_at)
+            results.put((url, walk_data, None))
+
+        def dispatch(pool):
+            while True:
+                item = fetched.get()
+                if item is None:
+                    return
+                url, content, fingerprint = item
+                in_flight.acquire()
+                future = pool.submit(parse_walk_page, url, content)
+                future.add_done_callback(lambda f, url=url, fingerprint=fingerprint: parsed(f, url, fingerprint))
+
+        with ProcessPoolExecutor(max_workers=self.parse_workers, initializer=init_parse_worker,
+                                 initargs=(self.scraper.parser_backend,)) as pool:
+            fetchers = [threading.Thread(target=fetch_worker, daemon=True)
+                        for _ in range(min(self.scraper.concurrency, len(urls)))]
+            dispatcher = threading.Thread(target=dispatch, args=(pool,), daemon=True)
+            for thread in fetchers:
+                thread.start()
+            dispatcher.start()
+
+            def close_queue():
+                for thread in fetchers:
+                    thread.join()
+                fetched.put(None)
+            threading.Thread(target=close_queue, daemon=True).start()
+
+            # Every URL produces exactly one result
+            for _ in range(len(urls)):
+                yield results.get()
+
+            dispatcher.join()
@@ -0,0 +1,163 @@
+"""
+Slotted record types for the walks passed between the scrapers, converter and formatter.
+Each record converts to and from the JSON object written to walk files; keys it does not
+declare are kept aside and written back, so reading and rewriting a file loses nothing.
+"""
+
+from dataclasses import dataclass, field, fields
+from typing import Any, ClassVar, Dict, List, Optional, Tuple
+
+from record_io import read_records
+
+class WalkRecord:
+    """JSON conversion shared by the record types"""
+    __slots__ = ()
+
+    FIELDS: ClassVar[Tuple[str, ...]] = ()
+    FIELD_NAMES: ClassVar[frozenset] = frozenset()
+    # Fields left out of the JSON object while they are None
+    OPTIONAL_FIELDS: ClassVar[frozenset] = frozenset()
+    # Fields holding a list of nested records, by record type
+    NESTED: ClassVar[Dict[str, type]] = {}
+
+    @classmethod
+    def from_dict(cls, data: Dict):
+        if cls.FIELD_NAMES.issuperset(data):
+            values, extra = dict(data), None
+        else:
+            values = {key: value for key, value in data.items() if key in cls.FIELD_NAMES}
+            extra = {key: value for key, value in data.items() if key not in cls.FIELD_NAMES}
+        for name, record_type in cls.NESTED.items():
+            if values.get(name) is not None:
+                values[name] = [record_type.from_dict(item) for item in values[name]]
+        return cls(**values, extra=extra)
+
+    def to_dict(self) -> Dict:
+        record = {}
+        for name in self.FIELDS:
+            value = getattr(self, name)
+            if value is None:
+                if name in self.OPTIONAL_FIELDS:
+                    continue
+            elif name in self.NESTED:
+                value = [item.to_dict() for item in value]
+            record[name] = value
+        if self.extra:
+            record.update(self.extra)
+        return record
+
+    def get(self, name: str, default: Any = None) -> Any:
+        """Field or undeclared key, or default when it is missing or None"""
+        if name in self.FIELD_NAMES:
+            value = getattr(self, name)
+        else:
+            value = self.extra.get(name) if self.extra else None
+        return default if value is None else value
+
+def walk_record(cls):
+    """Make cls a slotted dataclass and record its JSON field names"""
+    cls = dataclass(slots=True)(cls)
+    cls.FIELDS = tuple(f.name for f in fields(cls) if f.name != 'extra')
+    cls.FIELD_NAMES = frozenset(cls.FIELDS)
+    return cls
+
+@walk_record
+class Stage(WalkRecord):
+    stage: Optional[int] = None
+    description: Optional[str] = None
+    original_length: Optional[int] = None
+    extra: Optional[Dict] = field(default=None, repr=False)
+
+    OPTIONAL_FIELDS = frozenset({'original_length'})
+
+@walk_record
+class ScrapedWalk(WalkRecord):
+    """A walk from a region listing (scrape_walkhighlands.py)"""
+    title: Optional[str] = None
+    region: Optional[str] = None
+    difficulty: Optional[str] = None
+    difficulty_level: Optional[int] = None
+    distance_km: Optional[float] = None
+    duration_minutes: Optional[int] = None
+    source_url: Optional[str] = None
+    description: Optional[str] = None
+    extra: Optional[Dict] = field(default=None, repr=False)
+
+@walk_record
+class DetailedWalk(WalkRecord):
+    """A walk from its detail page (detailed_walk_scraper.py)"""
+    title: Optional[str] = None
+    summary: Optional[str] = None
+    source_url: Optional[str] = None
+    difficulty_rating: Optional[int] = None
+    bog_factor: Optional[int] = None
+    overall_rating: Optional[float] = None
+    distance_km: Optional[float] = None
+    estimated_hours: Optional[float] = None
+    ascent_m: Optional[int] = None
+    start_grid_ref: Optional[str] = None
+    terrain: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    gpx_url: Optional[str] = None
+    track_distance_km: Optional[float] = None
+    track_ascent_m: Optional[int] = None
+    track_descent_m: Optional[int] = None
+    track_max_elevation_m: Optional[int] = None
+    stages: List[Stage] = field(default_factory=list)
+    scraped_at: Optional[float] = None
+    extra: Optional[Dict] = field(default=None, repr=False)
+
+    # Only walks with a GPX route have these
+    OPTIONAL_FIELDS = frozenset({'gpx_url', 'track_distance_km', 'track_ascent_m', 'track_descent_m',
+                                 'track_max_elevation_m'})
+    NESTED = {'stages': Stage}
+
+@walk_record
+class ConvertedWalk(WalkRecord):
+    """A walk in the database shape, from the converter or the formatter.
+    Fields only one of them fills in are left out of the other's output."""
+    title: Optional[str] = None
+    slug: Optional[str] = None
+    description: Optional[str] = None
+    shortDescription: Optional[str] = None
+    regionSlug: Optional[str] = None
+    distance: Optional[float] = None
+    ascent: Optional[int] = None
+    difficulty: Optional[str] = None
+    estimatedTime: Optional[float] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    maxElevation: Optional[int] = None
+    routeType: Optional[str] = None
+    featuredImageUrl: Optional[str] = None
+    tags: List[str] = field(default_factory=list)
+    isPublished: bool = True
+    publishedAt: Optional[str] = None
+    viewCount: int = 0
+    likeCount: int = 0
+    reportCount: int = 0
+    averageRating: Optional[float] = None
+    terrain: Optional[str] = None
+    startGridRef: Optional[str] = None
+    bogFactor: Optional[int] = None
+    detailedDescription: Optional[str] = None
+    sourceUrl: Optional[str] = None
+    stages: Optional[List[Stage]] = None
+    scraped_at: Optional[float] = None
+    converted_at: Optional[float] = None
+    originalRegion: Optional[str] = None
+    routePolylines: Optional[Dict[str, List[str]]] = None
+    elevationProfile: Optional[List[int]] = None
+    extra: Optional[Dict] = field(default=None, repr=False)
+
+    # Optional in convex/schema.ts, so a missing value is left out rather than written as null
+    OPTIONAL_FIELDS = frozenset({'publishedAt', 'terrain', 'startGridRef', 'bogFactor', 'detailedDescription',
+                                 'stages', 'scraped_at', 'converted_at', 'originalRegion', 'routePolylines',
+                                 'elevationProfile'})
+    NESTED = {'stages': Stage}
+
+def read_walks(path: str, record_type: type, follow: bool = False):
+    """Yield each record of a walk file as record_type (see read_records)"""
+    for record in read_records(path, follow=follow):
+        yield record_type.from_dict(record)
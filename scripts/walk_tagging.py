@@ -0,0 +1,150 @@
+"""
+Keyword tagging shared by convert_detailed_walks.py and format_walks_for_db.py.
+Every keyword table is compiled once into a single lookup of word forms, so a
+walk's text is tokenised in one pass and matched against all tables together
+instead of being searched once per keyword. Keywords match whole words,
+optionally pluralised; a * allows the word to run on at that end, so 'glen*'
+matches Glencoe and '*wood*' matches Oakwoods.
+"""
+
+import re
+from typing import Dict, List, Pattern, Set, Tuple
+
+# Route type, judged from the title and stage descriptions of a detailed walk
+ROUTE_TYPE_KEYWORDS = {
+    'Circular': ['circuit', 'circular', 'loop', 'round', 'return to start'],
+    'Out and Back': ['out and back', 'there and back', 'return same way', 'retrace']
+}
+
+# Route type, judged from the title and description of a listing walk
+LISTING_ROUTE_TYPE_KEYWORDS = {
+    'Circular': ['circuit', 'circular', 'loop', 'round'],
+    'Out and Back': ['out and back', 'return', 'there and back']
+}
+
+# Main walk type; the first type that matches wins
+FEATURE_TYPE_KEYWORDS = {
+    'coastal': ['beach', 'bay', 'cliff', 'coast', 'lighthouse', 'headland', 'point'],
+    'mountain': ['ben', 'peak', 'summit', 'mountain', 'hill', 'ridge'],
+    'forest': ['forest', 'woods', 'woodland', 'trees', 'pine', 'oak'],
+    'historic': ['castle', 'fort', 'broch', 'dun*', 'ruins', 'historic', 'ancient'],
+    'waterfall': ['falls', 'waterfall', 'cascade', 'gorge'],
+    'loch': ['loch', 'lake', 'reservoir']
+}
+
+FEATURE_TAG_KEYWORDS = {
+    'wildlife': ['wildlife', 'birds', 'deer', 'eagles', 'otter', 'seals'],
+    'photography': ['views', 'scenic', 'panoramic', 'spectacular', 'dramatic'],
+    'family-friendly': ['easy', 'gentle', 'accessible', 'family'],
+    'challenging': ['steep', 'strenuous', 'demanding', 'difficult'],
+    'historic': ['castle', 'ruins', 'ancient', 'heritage', 'historic'],
+    'coastal': ['beach', 'cliff', 'sea', 'ocean', 'lighthouse'],
+    'forest': ['woodland', 'forest', 'trees', 'nature'],
+    'waterfall': ['waterfall', 'falls', 'cascade'],
+    'viewpoint': ['views', 'viewpoint', 'panorama', 'vista'],
+    'bridge': ['bridge', 'crossing'],
+    'island': ['island', 'isle']
+}
+
+# Tags implied by words in a listing walk's title
+TITLE_FEATURE_TAGS = {
+    'beach': ['beach', 'coastal'],
+    'bay': ['beach', 'coastal'],
+    'castle': ['historic', 'castle'],
+    'waterfall': ['waterfall'],
+    'falls': ['waterfall'],
+    'loch*': ['loch'],
+    'glen*': ['glen'],
+    'forest': ['forest'],
+    '*wood*': ['forest'],
+    'trail': ['trail'],
+    'island': ['island'],
+    'lighthouse': ['lighthouse'],
+    'quarry': ['historic', 'industrial'],
+    'bridge': ['bridge'],
+    'village': ['historic'],
+    'church': ['historic'],
+    'hide': ['wildlife'],
+    'reserve': ['wildlife'],
+    'hill': ['hill'],
+    'mountain': ['mountain'],
+}
+
+STAGE_KEYWORDS = {
+    'direction': ['follow', 'head', 'turn', 'continue', 'cross', 'climb', 'descend', 'bear', 'take'],
+    'landmark': ['gate', 'bridge', 'path', 'track', 'road', 'car park', 'viewpoint', 'summit', 'loch', 'river', 'forest']
+}
+
+WORD_RE = re.compile(r'[a-z]+')
+
+def word_forms(keyword: str) -> List[str]:
+    """A keyword and its plurals"""
+    forms = [keyword, keyword + 's', keyword + 'es']
+    if keyword.endswith('y'):
+        forms.append(keyword[:-1] + 'ies')
+    return forms
+
+class KeywordMatcher:
+    """Finds keywords from many labelled tables in one pass over a text"""
+
+    def __init__(self, tables: Dict[str, Dict[str, List[str]]]):
+        self.forms: Dict[str, Set[str]] = {}                     # word (or plural) -> keywords it matches
+        self.phrases: Dict[str, List[Tuple[str, Pattern]]] = {}  # first word -> phrases starting with it
+        self.partials: Dict[str, Tuple[str, Pattern]] = {}       # keywords with a * -> core and pattern
+        for table in tables.values():
+            for keywords in table.values():
+                for keyword in keywords:
+                    if '*' in keyword:
+                        core = keyword.strip('*')
+                        start = '' if keyword.startswith('*') else r'\b'
+                        end = '' if keyword.endswith('*') else r'(?:e?s)?\b'
+                        self.partials[keyword] = (core, re.compile(start + re.escape(core) + end))
+                    elif ' ' in keyword:
+                        words = keyword.split()
+                        pattern = re.compile(r'\b' + r'\W+'.join(map(re.escape, words)) + r'(?:e?s)?\b')
+                        self.phrases.setdefault(words[0], []).append((keyword, pattern))
+                    else:
+                        for form in word_forms(keyword):
+                            self.forms.setdefault(form, set()).add(keyword)
+        self.lookup = set(self.forms) | set(self.phrases)
+        self.label_keywords = {
+            name: [(label, frozenset(keywords)) for label, keywords in table.items()]
+            for name, table in tables.items()
+        }
+
+    def matches(self, text: str) -> Set[str]:
+        """Keywords found in text, spelt as in the tables"""
+        found: Set[str] = set()
+        if not text:
+            return found
+        text = text.lower()
+        words = set(WORD_RE.findall(text))
+
+        # Every keyword is looked up at once; phrases are only checked when their first word occurs
+        for word in words & self.lookup:
+            found.update(self.forms.get(word, ()))
+            for phrase, pattern in self.phrases.get(word, ()):
+                if pattern.search(text):
+                    found.add(phrase)
+        for keyword, (core, pattern) in self.partials.items():
+            if core in text and pattern.search(text):
+                found.add(keyword)
+        return found
+
+    def labels(self, found: Set[str], table: str) -> List[str]:
+        """Labels of a table with at least one matched keyword, in table order"""
+        return [label for label, keywords in self.label_keywords[table] if not keywords.isdisjoint(found)]
+
+WALK_MATCHER = KeywordMatcher({
+    'route_type': ROUTE_TYPE_KEYWORDS,
+    'listing_route_type': LISTING_ROUTE_TYPE_KEYWORDS,
+    'feature_type': FEATURE_TYPE_KEYWORDS,
+    'feature_tags': FEATURE_TAG_KEYWORDS,
+    'title_features': {keyword: [keyword] for keyword in TITLE_FEATURE_TAGS},
+    'stage': STAGE_KEYWORDS
+})
+
+def route_type(found: Set[str], table: str = 'route_type') -> str:
+    """Circular if any circular keyword matched, then Out and Back, otherwise Linear"""
+    labels = WALK_MATCHER.labels(found, table)
+    return labels[0] if labels else "Linear"